@@ -0,0 +1,265 @@
+"""
+Offline bulk rendering of decks whose slides already exist, without the API or the model.
+
+Reads JSONL (one deck per line) as a stream and renders the decks on a pool of
+worker processes, one per core by default. Each line is an object with the
+slides under "slides", in the same shape as POST /configure:
+
+    {"id": "intro-python", "title": "Intro to Python", "slides": [{"title": "...", "content": ["..."]}]}
+
+A deck-level "logo" applies to every slide without its own, as in /configure,
+and image paths are resolved under IMAGE_DIR. "id" names the output file.
+Without it, the id is a hash of the slides, so re-running the same input still
+skips finished decks. Output goes to a directory (one <id>.pptx per deck,
+each written to a temporary file and moved into place when complete) or, when
+--output ends in .zip, into a single zip archive. A zip is built from decks
+staged in <output>.parts/ when the run ends, and is only ever replaced whole,
+so it is never left truncated. Decks already present in the output (or staged
+by a run that was killed) are skipped, so an interrupted run resumes where it
+stopped.
+
+Usage:
+    python -m app.bulk_render decks.jsonl --output out/ [--workers 8] [--engine ooxml]
+    python -m app.bulk_render decks.jsonl --output decks.zip
+    cat decks.jsonl | python -m app.bulk_render - --output out/
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import hashlib
+import zipfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from app.services.slide_generator import RENDER_ENGINES, warm_up_renderer
+
+# Ids become file names, so they are limited to a safe character set
+_ID_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$")
+
+
+def deck_id(deck: dict) -> str:
+    """The deck's "id", or a stable hash of its slides when it has none."""
+    if deck.get("id") is not None:
+        return str(deck["id"])
+    encoded = json.dumps(deck["slides"], sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+def parse_line(line: str):
+    """Return (id, slides) for one JSONL line. Raises ValueError if it is not a deck."""
+    deck = json.loads(line)
+    if not isinstance(deck, dict) or not isinstance(deck.get("slides"), list):
+        raise ValueError('expected an object with a "slides" list')
+    if not all(isinstance(slide, dict) for slide in deck["slides"]):
+        raise ValueError("every slide must be an object")
+    if deck.get("logo"):
+        deck["slides"] = [slide if slide.get("logo") else dict(slide, logo=deck["logo"]) for slide in deck["slides"]]
+    presentation_id = deck_id(deck)
+    if not _ID_RE.match(presentation_id):
+        raise ValueError(f"id {presentation_id!r} is not usable as a file name")
+    return presentation_id, deck["slides"]
+
+
+def read_decks(stream):
+    """Yield (line_number, id, slides, error) for each non-blank line, reading lazily."""
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            presentation_id, slides = parse_line(line)
+        except ValueError as e:
+            yield line_number, None, None, str(e)
+            continue
+        yield line_number, presentation_id, slides, None
+
+
+def _init_worker():
+    warm_up_renderer()
+
+
+def render_batch(batch, output_dir, engine):
+    """
+    Render a batch of (id, slides) into output_dir in a worker process.
+    Returns (id, number of slides, error) per deck.
+    """
+    from app.services.ooxml_renderer import write_package
+
+    results = []
+    for presentation_id, slides in batch:
+        try:
+            path = os.path.join(output_dir, f"{presentation_id}.pptx")
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(temp_path, "wb") as fp:
+                    write_package(slides, fp, engine)
+                os.replace(temp_path, path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            results.append((presentation_id, len(slides), None))
+        except Exception as e:
+            results.append((presentation_id, len(slides), f"{type(e).__name__}: {e}"))
+    return results
+
+
+class Output:
+    """
+    Where rendered decks go, and which ids are already there. Workers always
+    write files into a directory: the output itself, or for a zip the staging
+    directory <output>.parts/, which close() packs into the zip.
+    """
+
+    def __init__(self, path: str):
+        self.is_zip = path.lower().endswith(".zip")
+        self.path = path
+        if self.is_zip:
+            self.output_dir = f"{path}.parts"
+            self._done = set(self._archived())
+        else:
+            self.output_dir = path
+            self._done = set()
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._done.update(self._staged())
+
+    def _staged(self):
+        return [name[:-len(".pptx")] for name in os.listdir(self.output_dir) if name.endswith(".pptx")]
+
+    def _archived(self):
+        """Ids in an existing zip. Raises ValueError unless it holds nothing but top-level .pptx files."""
+        if not os.path.exists(self.path):
+            return []
+        try:
+            with zipfile.ZipFile(self.path) as archive:
+                names = archive.namelist()
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"{self.path} is not a readable zip ({e}); remove it or choose another --output")
+        if any("/" in name or not name.endswith(".pptx") for name in names):
+            raise ValueError(
+                f"{self.path} holds more than bulk_render decks (a run of an older version may have been "
+                f"cut short); remove it or choose another --output"
+            )
+        return [name[:-len(".pptx")] for name in names]
+
+    def has(self, presentation_id: str) -> bool:
+        return presentation_id in self._done
+
+    def add(self, presentation_id: str):
+        self._done.add(presentation_id)
+
+    def close(self):
+        """For a zip, add the staged decks to it (through a temporary file) and drop the staging directory."""
+        if not self.is_zip:
+            return
+        staged = sorted(self._staged())
+        if staged:
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                # .pptx files are already deflated; storing them keeps packing cheap
+                with zipfile.ZipFile(temp_path, "w", compression=zipfile.ZIP_STORED) as archive:
+                    if os.path.exists(self.path):
+                        with zipfile.ZipFile(self.path) as previous:
+                            for info in previous.infolist():
+                                with previous.open(info) as source, archive.open(info, "w") as target:
+                                    shutil.copyfileobj(source, target, 1024 * 1024)
+                    for presentation_id in staged:
+                        name = f"{presentation_id}.pptx"
+                        archive.write(os.path.join(self.output_dir, name), name)
+                os.replace(temp_path, self.path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+
+def bulk_render(stream, output: Output, workers: int, engine: str, batch_size: int = 8,
+                progress_every: int = 500, log=sys.stderr) -> dict:
+    """
+    Render every deck read from stream into output and return run statistics.
+    At most 2 x workers batches are in flight, so memory stays bounded however
+    large the input is.
+    """
+    stats = {"rendered": 0, "skipped": 0, "failed": 0, "slides": 0}
+    start = time.perf_counter()
+    in_flight = set()
+    seen = set()
+
+    def collect(done):
+        for future in done:
+            for presentation_id, num_slides, error in future.result():
+                if error is not None:
+                    stats["failed"] += 1
+                    print(f"deck {presentation_id}: {error}", file=log)
+                    continue
+                output.add(presentation_id)
+                stats["rendered"] += 1
+                stats["slides"] += num_slides
+                if progress_every and stats["rendered"] % progress_every == 0:
+                    elapsed = time.perf_counter() - start
+                    print(f"{stats['rendered']} decks, {stats['rendered'] / elapsed:.1f} decks/s", file=log)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        batch = []
+        for line_number, presentation_id, slides, error in read_decks(stream):
+            if error is not None:
+                stats["failed"] += 1
+                print(f"line {line_number}: {error}", file=log)
+                continue
+            if output.has(presentation_id) or presentation_id in seen:
+                stats["skipped"] += 1
+                continue
+            seen.add(presentation_id)
+            batch.append((presentation_id, slides))
+            if len(batch) < batch_size:
+                continue
+            in_flight.add(pool.submit(render_batch, batch, output.output_dir, engine))
+            batch = []
+            if len(in_flight) >= 2 * workers:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+        if batch:
+            in_flight.add(pool.submit(render_batch, batch, output.output_dir, engine))
+        collect(wait(in_flight)[0])
+
+    elapsed = time.perf_counter() - start
+    stats.update({
+        "workers": workers,
+        "engine": engine,
+        "seconds": round(elapsed, 3),
+        "decks_per_second": round(stats["rendered"] / elapsed, 2) if elapsed else None,
+        "slides_per_second": round(stats["slides"] / elapsed, 1) if elapsed else None,
+    })
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help='JSONL file with one deck per line, or "-" for stdin')
+    parser.add_argument("--output", "-o", required=True, help="Output directory, or a .zip file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--engine", choices=RENDER_ENGINES, default="ooxml")
+    parser.add_argument("--batch-size", type=int, default=8, help="Decks sent to a worker at a time")
+    parser.add_argument("--progress-every", type=int, default=500, help="Decks between progress lines (0 = off)")
+    args = parser.parse_args(argv)
+
+    try:
+        output = Output(args.output)
+    except ValueError as e:
+        parser.error(str(e))
+    stream = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    try:
+        stats = bulk_render(
+            stream, output, max(1, args.workers), args.engine, max(1, args.batch_size), args.progress_every
+        )
+    finally:
+        output.close()
+        if stream is not sys.stdin:
+            stream.close()
+    print(json.dumps(stats, indent=2))
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,27 +1,122 @@
 import uuid
 import uvicorn
-from pydantic import BaseModel
+from pydantic import BaseModel, HttpUrl, field_validator
 from typing import List, Optional, Dict
-from fastapi.responses import FileResponse, JSONResponse
-from fastapi import FastAPI, HTTPException
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, Response
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.services.slide_generator import generate_slides
-from app.services.content_generator import generate_content
-from app.utils.storage import save_presentation, get_presentation, update_presentation
+from app.services.slide_generator import (
+    get_renderer, render_to_bytes, update_slides, compute_slide_hashes, RENDER_ENGINES,
+    warm_up_renderer, RENDER_ENGINE, check_images
+)
+from app.services.content_generator import generate_content, stream_content, llm_client, generation_limiter
+from app.services.llm_client import UpstreamUnavailable, DeadlineExceeded, CLOSED
+from app.services.content_cache import content_cache
+from app.services.render_cache import render_cache
+from app.services.image_cache import image_cache, ImageError
+from app.services.render_pool import render_pool, RenderQueueFull
+from app.services.job_scheduler import (
+    job_scheduler, JobQueueFull, CallbackURLError, check_callback_url, GENERATING, RENDERING
+)
+from contextlib import asynccontextmanager
+from app.utils.zip_stream import ZipStreamWriter
+from app.utils.metrics import registry, counter, gauge, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from app.utils.cancellation import CancelToken, RenderCancelled
+from app.utils.request_metrics import RequestMetricsMiddleware
+from app.utils.admission import AdmissionMiddleware, Overloaded, requests_shed
+from app.utils.tracing import span
+from app.utils.profiling import profile_request, profiled_submit, profile_store, is_admin
+from app.utils.http_cache import (
+    describe_bytes, describe_file, http_date, is_not_modified, if_range_matches,
+    parse_range, stream_bytes
+)
+from app.utils.storage import (
+    save_presentation, save_presentations, get_presentation, update_presentation,
+    presentation_file_path, temp_file_path, purge_expired, save_file_bytes, get_file_bytes,
+    STORAGE_TTL, STORAGE_PURGE_INTERVAL, PERSIST_FILES
+)
 import logging
+import io
+import asyncio
+import json
+import time
 import os
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Batch settings (override via environment)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# Cancellation settings (override via environment)
+DISCONNECT_POLL_INTERVAL = float(os.getenv("DISCONNECT_POLL_INTERVAL", "0.25"))  # seconds
+
+# Download settings (override via environment)
+DOWNLOAD_CACHE_CONTROL = os.getenv("DOWNLOAD_CACHE_CONTROL", "public, no-cache")
+
+PPTX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+
+async def purge_expired_periodically():
+    """Expire old presentations and their files in the background."""
+    while True:
+        try:
+            await asyncio.to_thread(purge_expired)
+            # Decks of purged presentations may now be held only by the render cache
+            await asyncio.to_thread(render_cache.evict)
+            await asyncio.to_thread(image_cache.evict)
+        except Exception as e:
+            logger.error(f"Error purging expired presentations: {str(e)}")
+        await asyncio.sleep(STORAGE_PURGE_INTERVAL)
+
+
+# Warm-up state reported by /ready
+readiness = {"ready": False, "warmup_seconds": None, "error": None}
+
+
+async def warm_up():
+    """
+    Start the render workers with their caches built and create the model
+    client (importing its SDK) in the background, so the server accepts
+    connections at once and the first request does not pay for either.
+    """
+    start = time.perf_counter()
+    try:
+        with span("warmup"):
+            await render_pool.start(warm_up_renderer)
+            await asyncio.to_thread(lambda: llm_client.model)
+    except Exception as e:
+        readiness["error"] = str(e)
+        logger.error(f"Warm-up failed: {str(e)}")
+        return
+    readiness["warmup_seconds"] = round(time.perf_counter() - start, 3)
+    readiness["ready"] = True
+    logger.info(f"Ready after {readiness['warmup_seconds']}s of warm-up")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    purge_task = asyncio.create_task(purge_expired_periodically()) if STORAGE_TTL > 0 else None
+    warmup_task = asyncio.create_task(warm_up())
+    yield
+    warmup_task.cancel()
+    if purge_task:
+        purge_task.cancel()
+    await job_scheduler.shutdown()
+    # Let in-flight renders finish before the worker exits
+    render_pool.shutdown()
+
+
 # Initialize FastAPI app with API metadata
 app = FastAPI(
     title="PowerPoint Generator API",
     description="A RESTful API for generating PowerPoint presentations using AI",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS middleware for API access
@@ -31,12 +126,49 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Added before the metrics middleware so shed requests still show up in request metrics
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(RequestMetricsMiddleware)
+
+# Pool and scheduler state, read when /metrics is scraped
+gauge("pptgen_render_in_flight", "Render jobs running on the render pool.",
+      callback=lambda: render_pool.stats()["in_flight"])
+gauge("pptgen_render_queue_depth", "Render jobs waiting for a free worker.",
+      callback=lambda: render_pool.queue_depth)
+gauge("pptgen_jobs_running", "Background presentation jobs running.",
+      callback=lambda: job_scheduler.running)
+gauge("pptgen_jobs_queued", "Background presentation jobs queued.",
+      callback=lambda: job_scheduler.queued)
+gauge("pptgen_ready", "1 once warm-up has finished and /ready answers 200, else 0.",
+      callback=lambda: int(readiness["ready"]))
+gauge("pptgen_admission_limit", "Create requests allowed in progress at once (adaptive).",
+      callback=lambda: generation_limiter.limit)
+gauge("pptgen_admission_in_flight", "Create requests in progress, counted against the adaptive limit.",
+      callback=lambda: generation_limiter.in_flight)
+gauge("pptgen_llm_circuit_open", "1 while the model circuit breaker is open or half-open, else 0.",
+      callback=lambda: int(llm_client.breaker.state != CLOSED))
+
+requests_cancelled = counter(
+    "pptgen_requests_cancelled_total",
+    "Create requests abandoned before finishing, by reason and the stage they stopped in.",
+    ["reason", "stage"]
+)
 
 # Request/Response Models
 class PresentationCreate(BaseModel):
     topic: str
     num_slides: int = 5
     custom_content: Optional[str] = None
+    callback_url: Optional[HttpUrl] = None
+    engine: Optional[str] = None
+
+    @field_validator("callback_url")
+    @classmethod
+    def check_callback_url(cls, url):
+        # Host names are resolved and checked again by the endpoint and before each delivery
+        if url is not None:
+            check_callback_url(str(url))
+        return url
     
     class Config:
         json_schema_extra = {
@@ -47,13 +179,30 @@ class PresentationCreate(BaseModel):
             }
         }
 
+class PresentationBatchCreate(BaseModel):
+    items: List[PresentationCreate]
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"topic": "Module 1: Variables", "num_slides": 5},
+                    {"topic": "Module 2: Control Flow", "num_slides": 5}
+                ]
+            }
+        }
+
 class SlideContent(BaseModel):
     title: str
     content: List[str]
+    # A path under IMAGE_DIR or a base64 data URI
+    image: Optional[str] = None
+    logo: Optional[str] = None
 
 class PresentationConfigure(BaseModel):
     title: str
     slides: List[SlideContent]
+    logo: Optional[str] = None  # shown on every slide that does not set its own
     
     class Config:
         json_schema_extra = {
@@ -62,9 +211,11 @@ class PresentationConfigure(BaseModel):
                 "slides": [
                     {
                         "title": "Slide 1",
-                        "content": ["Point 1", "Point 2"]
+                        "content": ["Point 1", "Point 2"],
+                        "image": "diagrams/architecture.png"
                     }
-                ]
+                ],
+                "logo": "logo.png"
             }
         }
 
@@ -78,9 +229,14 @@ async def root():
         "docs": "/docs",
         "endpoints": {
             "create_presentation": "POST /api/v1/presentations",
+            "stream_presentation": "POST /api/v1/presentations/stream",
+            "batch_presentations": "POST /api/v1/presentations/batch",
             "get_presentation": "GET /api/v1/presentations/{id}",
             "download_presentation": "GET /api/v1/presentations/{id}/download",
-            "configure_presentation": "POST /api/v1/presentations/{id}/configure"
+            "configure_presentation": "POST /api/v1/presentations/{id}/configure",
+            "get_job": "GET /api/v1/jobs/{id}",
+            "ready": "GET /ready",
+            "metrics": "GET /metrics"
         }
     }
 
@@ -88,42 +244,285 @@ async def root():
 @app.get("/health", tags=["Health"])
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "PowerPoint Generator API"}
+    return {
+        "status": "healthy",
+        "service": "PowerPoint Generator API",
+        "render_pool": render_pool.stats(),
+        "jobs": job_scheduler.stats(),
+        "content_cache": content_cache.stats(),
+        "admission": generation_limiter.stats()
+    }
+
+
+@app.get("/ready", tags=["Health"])
+async def readiness_check():
+    """Readiness probe: 200 once workers and the model client are warmed up, 503 until then"""
+    if readiness["ready"]:
+        return {"status": "ready", "warmup_seconds": readiness["warmup_seconds"]}
+    status = "failed" if readiness["error"] else "warming"
+    return JSONResponse(status_code=503, content={"status": status, "error": readiness["error"]})
+
+
+@app.get("/metrics", tags=["Health"])
+async def metrics():
+    """Prometheus metrics for each pipeline stage, in the text exposition format"""
+    return Response(registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+async def render_deck(content, presentation_id: str, engine: Optional[str] = None, wait: bool = False,
+                      cancel: Optional[CancelToken] = None):
+    """
+    Render a deck on the render pool and return its file metadata: a content-hash
+    ETag, size and modification time, stored with the record for conditional GETs.
+    With PERSIST_FILES off the deck is rendered into memory instead of presentations/.
+    `wait` queues for render capacity instead of raising RenderQueueFull.
+    `cancel` stops the render between slides when the request is cancelled or
+    its deadline passes (RenderCancelled). A deck whose slides were rendered
+    before is linked from the render cache without rendering.
+    """
+    submit = render_pool.submit_waiting if wait else render_pool.submit
+    if PERSIST_FILES:
+        key = await asyncio.to_thread(render_cache.key, content, engine)
+        file_path = presentation_file_path(presentation_id)
+        if not await asyncio.to_thread(render_cache.fetch, key, file_path):
+            file_path = await run_cancellable(
+                profiled_submit(submit, get_renderer(engine), content, presentation_id, cancel), cancel
+            )
+            await asyncio.to_thread(render_cache.store, key, file_path)
+        return await asyncio.to_thread(describe_file, file_path)
+    data = await run_cancellable(profiled_submit(submit, render_to_bytes, content, engine, cancel), cancel)
+    save_file_bytes(presentation_id, data)
+    return describe_bytes(data)
+
+
+async def run_cancellable(render, cancel: Optional[CancelToken]):
+    """
+    Await a render job. A pool worker cannot be interrupted mid-call, so when
+    this request is cancelled the token tells the worker to stop at the next
+    slide, and the job is still awaited so that a file it managed to finish is
+    removed rather than left behind.
+    """
+    job = asyncio.ensure_future(render)
+    try:
+        return await asyncio.shield(job)
+    except asyncio.CancelledError:
+        if cancel is not None:
+            cancel.cancel()
+        try:
+            result = await job
+        except Exception:
+            pass
+        else:
+            if isinstance(result, str):
+                await asyncio.to_thread(os.remove, result)
+        raise
+
+
+def open_streamed_deck(presentation_id: str, engine: Optional[str] = None):
+    """
+    Start the package of a deck whose slides arrive one by one. Returns the
+    output stream (a temporary file, or memory with PERSIST_FILES off) and the
+    PackageWriter that slides are added to as they come.
+    """
+    if PERSIST_FILES:
+        output_path = presentation_file_path(presentation_id)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        fp = open(temp_file_path(output_path), "wb")
+    else:
+        fp = io.BytesIO()
+    # Imported here so that importing the app does not load python-pptx and lxml
+    from app.services.ooxml_renderer import PackageWriter
+    return fp, PackageWriter(fp, engine or RENDER_ENGINE)
+
+
+def save_streamed_deck(fp, writer, presentation_id: str):
+    """Finish a streamed deck's package, move it into place and return its file metadata."""
+    writer.close()
+    if PERSIST_FILES:
+        fp.close()
+        output_path = presentation_file_path(presentation_id)
+        os.replace(fp.name, output_path)
+        return describe_file(output_path)
+    data = fp.getvalue()
+    save_file_bytes(presentation_id, data)
+    return describe_bytes(data)
+
+
+def discard_streamed_deck(fp):
+    """Drop the partial package of a streamed deck that failed."""
+    fp.close()
+    if PERSIST_FILES and os.path.exists(fp.name):
+        os.remove(fp.name)
+
+
+async def build_presentation(presentation_id: str, presentation: PresentationCreate, on_stage=None,
+                             cancel: Optional[CancelToken] = None):
+    """
+    Run the full create pipeline: generate content, render the deck and store metadata.
+    `on_stage` is called with the job state name as each stage starts. `cancel`
+    carries the request's deadline into the model call and the render.
+    """
+    if on_stage:
+        on_stage(GENERATING)
+    with span("generate_content", num_slides=presentation.num_slides):
+        content = await generate_content(
+            presentation.topic, 
+            presentation.num_slides, 
+            presentation.custom_content,
+            deadline=cancel.monotonic_deadline() if cancel else None
+        )
+    
+    # Generate PowerPoint file on the render pool so the event loop stays free
+    if on_stage:
+        on_stage(RENDERING)
+    with span("render", engine=presentation.engine or "default", slides=len(content)):
+        file_info = await render_deck(content, presentation_id, presentation.engine, cancel=cancel)
+    
+    # Save presentation metadata
+    with span("store"):
+        await asyncio.to_thread(
+            save_presentation,
+            presentation_id, content, slide_hashes=compute_slide_hashes(content),
+            engine=presentation.engine or RENDER_ENGINE, file=file_info
+        )
+    
+    return {
+        "id": presentation_id,
+        "message": "Presentation created successfully",
+        "topic": presentation.topic,
+        "num_slides": len(content),
+        "download_url": f"/api/v1/presentations/{presentation_id}/download"
+    }
+
+
+def validate_engine(presentation: PresentationCreate):
+    if presentation.engine is not None and presentation.engine not in RENDER_ENGINES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"engine must be one of: {', '.join(RENDER_ENGINES)}"
+        )
+
+
+def get_request_budget(request: Request) -> Optional[float]:
+    """Seconds the caller will wait, from the X-Request-Deadline header (None if absent)."""
+    value = request.headers.get("X-Request-Deadline")
+    if value is None:
+        return None
+    try:
+        budget = float(value.strip().rstrip("s"))
+    except ValueError:
+        budget = 0
+    if not budget > 0:
+        raise HTTPException(
+            status_code=400, detail="X-Request-Deadline must be a positive number of seconds"
+        )
+    return budget
+
+
+async def cancel_on_disconnect(request: Request, work: asyncio.Task, cancel: CancelToken):
+    """Cancel `work` once the client has gone away, e.g. after giving up on a slow response."""
+    while not work.done():
+        if await request.is_disconnected():
+            cancel.cancel()
+            work.cancel()
+            return
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+
+
+def get_client_id(request: Request) -> str:
+    """Identify the caller for per-client scheduling."""
+    client_id = request.headers.get("X-Client-Id")
+    if client_id:
+        return client_id
+    return request.client.host if request.client else "anonymous"
 
 
 @app.post("/api/v1/presentations", tags=["Presentations"], status_code=201)
-async def create_presentation(presentation: PresentationCreate):
+async def create_presentation(presentation: PresentationCreate, request: Request, response: Response,
+                              mode: str = "sync"):
     """
     Create a new PowerPoint presentation
     
     - **topic**: The main topic/subject of the presentation
     - **num_slides**: Number of slides to generate (default: 5)
     - **custom_content**: Optional custom content to include in the presentation
+    - **callback_url**: Optional http(s) URL that receives the job as JSON when it finishes
+      (async mode); it must be a public host, and one of `WEBHOOK_ALLOWED_HOSTS` when set
+    - **engine**: Optional render engine, `pptx` or `ooxml` (default from `RENDER_ENGINE`)
+    - **mode**: `sync` (default) waits for the deck; `async` returns 202 with a job id
+
+    A sync request stops its model call and render as soon as the client
+    disconnects, or when the optional `X-Request-Deadline` budget (seconds)
+    runs out, which answers 504. Nothing is stored for a stopped request.
+    When more requests are generating than the adaptive limit allows (it
+    shrinks while the model slows down), it answers 503 with Retry-After at once.
+    A profiled request (see /admin/profiles) answers with an `X-Profile-Id` header.
     """
+    validate_engine(presentation)
+    if presentation.callback_url:
+        try:
+            await asyncio.to_thread(check_callback_url, str(presentation.callback_url), True)
+        except CallbackURLError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    if mode == "async" or presentation.callback_url:
+        return submit_presentation_job(presentation, request)
+
+    cancel = CancelToken(get_request_budget(request))
+    stage = {"name": GENERATING}
+    presentation_id = str(uuid.uuid4())
     try:
-        presentation_id = str(uuid.uuid4())
         logger.info(f"Creating presentation: {presentation_id} for topic: {presentation.topic}")
-        
-        # Generate content using AI
-        content = await generate_content(
-            presentation.topic, 
-            presentation.num_slides, 
-            presentation.custom_content
-        )
-        
-        # Generate PowerPoint file
-        file_path = generate_slides(content, presentation_id)
-        
-        # Save presentation metadata
-        save_presentation(presentation_id, content)
-        
-        return {
-            "id": presentation_id,
-            "message": "Presentation created successfully",
-            "topic": presentation.topic,
-            "num_slides": len(content),
-            "download_url": f"/api/v1/presentations/{presentation_id}/download"
-        }
+        with generation_limiter.slot(), profile_request(request.headers, "create", presentation_id) as profile:
+            work = asyncio.ensure_future(build_presentation(
+                presentation_id, presentation, on_stage=lambda name: stage.update(name=name), cancel=cancel
+            ))
+            watcher = asyncio.ensure_future(cancel_on_disconnect(request, work, cancel))
+            if profile:
+                # The watcher only polls the connection; keep it out of the profile
+                profile.tasks.discard(watcher)
+                response.headers["X-Profile-Id"] = profile.id
+            try:
+                return await work
+            except asyncio.CancelledError:
+                work.cancel()
+                if not cancel.cancelled:
+                    raise
+                requests_cancelled.inc(reason="disconnect", stage=stage["name"])
+                logger.info(f"Client went away, cancelled presentation {presentation_id} while {stage['name']}")
+                # Nobody is left to read this; 499 is the conventional "client closed request" status
+                return Response(status_code=499)
+            finally:
+                watcher.cancel()
+    except Overloaded as e:
+        requests_shed.inc(reason="limit")
+        logger.warning(f"Shedding presentation {presentation_id}: {str(e)}")
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy generating other presentations. Please retry later.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except RenderQueueFull as e:
+        logger.warning(f"Rejecting presentation {presentation_id}: {str(e)}")
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy rendering other presentations. Please retry later.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except UpstreamUnavailable as e:
+        logger.warning(f"Rejecting presentation {presentation_id}: {str(e)}")
+        raise HTTPException(
+            status_code=503,
+            detail="The content model is unavailable. Please retry later.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except DeadlineExceeded as e:
+        requests_cancelled.inc(reason="deadline", stage=GENERATING)
+        logger.warning(f"Presentation {presentation_id} timed out: {str(e)}")
+        raise HTTPException(status_code=504, detail="The content model did not answer in time.")
+    except RenderCancelled as e:
+        requests_cancelled.inc(reason="deadline", stage=RENDERING)
+        logger.warning(f"Presentation {presentation_id} timed out: {str(e)}")
+        raise HTTPException(status_code=504, detail="The request deadline passed while rendering.")
     except Exception as e:
         logger.error(f"Error creating presentation: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -132,6 +531,308 @@ async def create_presentation(presentation: PresentationCreate):
         )
 
 
+def submit_presentation_job(presentation: PresentationCreate, request: Request):
+    """Queue a presentation on the background scheduler and return 202 with the job id."""
+    presentation_id = str(uuid.uuid4())
+
+    async def runner(job):
+        # Jobs count against the generation limit like sync creates, but wait for a slot
+        with await generation_limiter.wait_slot():
+            logger.info(f"Job {job.id} creating presentation: {presentation_id} for topic: {presentation.topic}")
+            return await build_presentation(presentation_id, presentation, on_stage=job.set_status)
+
+    try:
+        callback_url = str(presentation.callback_url) if presentation.callback_url else None
+        job = job_scheduler.submit(get_client_id(request), runner, callback_url)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/api/v1/jobs/{job.id}"
+        },
+        headers={"Location": f"/api/v1/jobs/{job.id}"}
+    )
+
+
+async def stream_presentation_events(presentation_id: str, presentation: PresentationCreate):
+    """
+    Generate and render a deck slide by slide, yielding a progress event per step.
+    Each slide is rendered on the render pool and written into the package as soon
+    as the model finishes emitting it.
+    """
+    start = time.perf_counter()
+    try:
+        slot = generation_limiter.slot()
+    except Overloaded as e:
+        # Another request took the last slot after the endpoint checked
+        requests_shed.inc(reason="limit")
+        yield {"event": "error", "id": presentation_id, "detail": str(e)}
+        return
+
+    # Imported here so that importing the app does not load python-pptx and lxml
+    from app.services.ooxml_renderer import render_pages
+
+    with slot:
+        yield {"event": "started", "id": presentation_id}
+
+        fp, writer = await asyncio.to_thread(open_streamed_deck, presentation_id, presentation.engine)
+        slides = []
+        saved = False
+        try:
+            async for slide_content in stream_content(
+                presentation.topic,
+                presentation.num_slides,
+                presentation.custom_content
+            ):
+                index = len(slides)
+                # Built on the render pool like any other render (overflowing content
+                # adds continuation slides), then written into the package in a thread.
+                # The slide is already generated, so a full queue is waited out
+                pages = await render_pool.submit_waiting(
+                    render_pages, slide_content, writer.num_slides, writer.engine
+                )
+                await asyncio.to_thread(writer.write_pages, pages)
+                slides.append(slide_content)
+                yield {
+                    "event": "slide",
+                    "index": index,
+                    "title": slide_content.get("title"),
+                    "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+                }
+
+            if not slides:
+                raise Exception("The model returned no slides.")
+
+            file_info = await asyncio.to_thread(save_streamed_deck, fp, writer, presentation_id)
+            saved = True
+            if PERSIST_FILES:
+                file_path = presentation_file_path(presentation_id)
+                key = await asyncio.to_thread(render_cache.key, slides, presentation.engine)
+                if await asyncio.to_thread(render_cache.store, key, file_path):
+                    file_info = await asyncio.to_thread(describe_file, file_path)
+            await asyncio.to_thread(
+                save_presentation,
+                presentation_id, slides, slide_hashes=compute_slide_hashes(slides),
+                engine=writer.engine, file=file_info
+            )
+            yield {
+                "event": "done",
+                "id": presentation_id,
+                "num_slides": len(slides),
+                "download_url": f"/api/v1/presentations/{presentation_id}/download",
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+            }
+        except (asyncio.CancelledError, GeneratorExit):
+            # The client closed the stream; the partial package is dropped below
+            if not saved:
+                requests_cancelled.inc(reason="disconnect", stage=GENERATING)
+            raise
+        except RenderQueueFull as e:
+            logger.warning(f"Abandoning streamed presentation {presentation_id}: {str(e)}")
+            yield {"event": "error", "id": presentation_id, "detail": str(e), "retry_after": e.retry_after}
+        except Exception as e:
+            logger.error(f"Error streaming presentation {presentation_id}: {str(e)}", exc_info=True)
+            yield {"event": "error", "id": presentation_id, "detail": str(e)}
+        finally:
+            if not saved:
+                discard_streamed_deck(fp)
+
+
+@app.post("/api/v1/presentations/stream", tags=["Presentations"])
+async def create_presentation_stream(presentation: PresentationCreate, request: Request):
+    """
+    Create a presentation and stream per-slide progress events
+    
+    Events are sent as NDJSON by default, or as Server-Sent Events when the
+    request has `Accept: text/event-stream`. The final event is `done` (with the
+    download URL) or `error`.
+    """
+    validate_engine(presentation)
+    if generation_limiter.full():
+        requests_shed.inc(reason="limit")
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy generating other presentations. Please retry later.",
+            headers={"Retry-After": str(generation_limiter.retry_after())}
+        )
+    if render_pool.full():
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy rendering other presentations. Please retry later.",
+            headers={"Retry-After": str(render_pool.retry_after())}
+        )
+    presentation_id = str(uuid.uuid4())
+    logger.info(f"Streaming presentation: {presentation_id} for topic: {presentation.topic}")
+    use_sse = "text/event-stream" in request.headers.get("accept", "")
+
+    async def body():
+        async for event in stream_presentation_events(presentation_id, presentation):
+            if use_sse:
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+            else:
+                yield json.dumps(event) + "\n"
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
+async def build_batch_item(index: int, presentation: PresentationCreate, semaphore: asyncio.Semaphore):
+    """
+    Generate and render one batch item. Metadata is saved by the caller in bulk.
+    Returns (index, presentation_id, content, file_info, error); either error is
+    set or content and file_info are.
+    """
+    presentation_id = str(uuid.uuid4())
+    try:
+        async with semaphore:
+            with await generation_limiter.wait_slot():
+                content = await generate_content(
+                    presentation.topic,
+                    presentation.num_slides,
+                    presentation.custom_content
+                )
+            # Batches wait for render capacity rather than failing on a full queue
+            file_info = await render_deck(content, presentation_id, presentation.engine, wait=True)
+        return index, presentation_id, content, file_info, None
+    except Exception as e:
+        logger.error(f"Batch item {index} ({presentation.topic}) failed: {str(e)}")
+        return index, presentation_id, None, None, str(e)
+
+
+def batch_item_result(presentation: PresentationCreate, presentation_id: str, content, error):
+    if error is not None:
+        return {"status": "error", "topic": presentation.topic, "error": error}
+    return {
+        "status": "ok",
+        "id": presentation_id,
+        "topic": presentation.topic,
+        "num_slides": len(content),
+        "download_url": f"/api/v1/presentations/{presentation_id}/download"
+    }
+
+
+@app.post("/api/v1/presentations/batch", tags=["Presentations"])
+async def create_presentation_batch(batch: PresentationBatchCreate, format: str = "json"):
+    """
+    Create many presentations in one request
+    
+    Items are generated concurrently (up to `BATCH_CONCURRENCY` at a time, within the
+    shared Gemini rate limit) and rendered on the worker pool. A failed item is reported
+    in its result and does not abort the rest of the batch.
+    
+    - **items**: List of presentations to create (same fields as a single create)
+    - **format**: `json` (default) returns per-item results; `zip` streams an archive
+      of all decks plus a `results.json` manifest
+    """
+    if not batch.items:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one item")
+    if len(batch.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch is limited to {BATCH_MAX_ITEMS} items"
+        )
+    if format not in ("json", "zip"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'zip'")
+    for item in batch.items:
+        validate_engine(item)
+
+    logger.info(f"Creating batch of {len(batch.items)} presentations")
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    tasks = [
+        asyncio.create_task(build_batch_item(index, item, semaphore))
+        for index, item in enumerate(batch.items)
+    ]
+
+    if format == "zip":
+        return StreamingResponse(
+            stream_batch_zip(batch.items, tasks),
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="presentations.zip"'}
+        )
+
+    outcomes = await asyncio.gather(*tasks)
+    await asyncio.to_thread(save_presentations, [
+        (presentation_id, content, {
+            "slide_hashes": compute_slide_hashes(content),
+            "engine": batch.items[index].engine or RENDER_ENGINE,
+            "file": file_info
+        })
+        for index, presentation_id, content, file_info, error in outcomes if error is None
+    ])
+    results = [
+        {"index": index, **batch_item_result(batch.items[index], presentation_id, content, error)}
+        for index, presentation_id, content, _, error in outcomes
+    ]
+    succeeded = sum(1 for result in results if result["status"] == "ok")
+    return {
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results
+    }
+
+
+async def stream_batch_zip(items, tasks):
+    """
+    Stream a zip of the batch as decks finish. Only one deck is buffered at a time,
+    and the archive ends with a results.json manifest covering failed items too.
+    """
+    writer = ZipStreamWriter()
+    results = [None] * len(items)
+    finished = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, presentation_id, content, file_info, error = await next_done
+            results[index] = {"index": index, **batch_item_result(items[index], presentation_id, content, error)}
+            if error is None:
+                finished.append((
+                    presentation_id, content,
+                    {
+                        "slide_hashes": compute_slide_hashes(content),
+                        "engine": items[index].engine or RENDER_ENGINE,
+                        "file": file_info
+                    }
+                ))
+                archive_name = f"{index:04d}_{presentation_id}.pptx"
+                if PERSIST_FILES:
+                    yield await asyncio.to_thread(
+                        writer.add_file, presentation_file_path(presentation_id), archive_name
+                    )
+                else:
+                    data = get_file_bytes(presentation_id) or await render_pool.submit_waiting(
+                        render_to_bytes, content, items[index].engine
+                    )
+                    yield writer.add_bytes(archive_name, data)
+        yield writer.add_bytes("results.json", json.dumps(results, indent=2).encode("utf-8"))
+        yield writer.close()
+    finally:
+        # Stop outstanding work if the client went away, but keep what finished
+        for task in tasks:
+            task.cancel()
+        if finished:
+            await asyncio.to_thread(save_presentations, finished)
+
+
+@app.get("/api/v1/jobs/{job_id}", tags=["Jobs"])
+async def get_job(job_id: str):
+    """
+    Get the status of a presentation job
+    
+    - **job_id**: The identifier returned by an async create
+    """
+    job = job_scheduler.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
 @app.get("/api/v1/presentations/{presentation_id}", tags=["Presentations"])
 async def get_presentation_details(presentation_id: str):
     """
@@ -139,58 +840,188 @@ async def get_presentation_details(presentation_id: str):
     
     - **presentation_id**: The unique identifier of the presentation
     """
-    presentation = get_presentation(presentation_id)
+    presentation = await asyncio.to_thread(get_presentation, presentation_id)
     if not presentation:
         raise HTTPException(status_code=404, detail="Presentation not found")
     return presentation
 
 
+def download_headers(file_info: dict) -> dict:
+    return {
+        "ETag": f'"{file_info["etag"]}"',
+        "Last-Modified": http_date(file_info["last_modified"]),
+        "Cache-Control": DOWNLOAD_CACHE_CONTROL,
+        "Accept-Ranges": "bytes"
+    }
+
+
+def bytes_response(data: bytes, request: Request, headers: dict, filename: str):
+    """Stream an in-memory deck, honouring a single-range Range header like FileResponse does."""
+    headers = {**headers, "Content-Disposition": f'attachment; filename="{filename}"'}
+    size = len(data)
+    start, end, status_code = 0, size - 1, 200
+
+    range_header = request.headers.get("range")
+    if range_header and if_range_matches(request.headers.get("if-range"), headers):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        stream_bytes(data, start, end + 1),
+        status_code=status_code,
+        media_type=PPTX_MEDIA_TYPE,
+        headers=headers
+    )
+
+
 @app.get("/api/v1/presentations/{presentation_id}/download", tags=["Presentations"])
-async def download_presentation(presentation_id: str):
+async def download_presentation(presentation_id: str, request: Request):
     """
     Download a presentation as a PowerPoint (.pptx) file
     
+    Responses carry a content-hash `ETag` and `Last-Modified`; `If-None-Match` /
+    `If-Modified-Since` get 304 Not Modified and `Range` requests are supported.
+    
     - **presentation_id**: The unique identifier of the presentation
     """
-    presentation = get_presentation(presentation_id)
+    presentation = await asyncio.to_thread(get_presentation, presentation_id)
     if not presentation:
         raise HTTPException(status_code=404, detail="Presentation not found")
     
-    file_path = os.path.join(os.getcwd(), "presentations", f"{presentation_id}.pptx")
+    filename = f"presentation_{presentation_id}.pptx"
+    file_info = presentation.get("file")
+    file_path = presentation_file_path(presentation_id)
     
-    if not os.path.exists(file_path):
+    if PERSIST_FILES and not os.path.exists(file_path):
         raise HTTPException(
             status_code=404, 
             detail="Presentation file not found. The presentation may not have been generated successfully."
         )
     
-    return FileResponse(
-        file_path, 
-        filename=f"presentation_{presentation_id}.pptx",
-        media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation"
-    )
+    if file_info and is_not_modified(request.headers, file_info["etag"], file_info["last_modified"]):
+        return Response(status_code=304, headers=download_headers(file_info))
+    
+    if PERSIST_FILES:
+        if not file_info:
+            # Records saved before ETags were stored: hash the file once and keep the result
+            file_info = await asyncio.to_thread(describe_file, file_path)
+            await asyncio.to_thread(update_presentation, presentation_id, {"file": file_info})
+        # FileResponse handles Range/If-Range and uses zero-copy pathsend when the server supports it
+        return FileResponse(
+            file_path, 
+            filename=filename,
+            media_type=PPTX_MEDIA_TYPE,
+            headers=download_headers(file_info)
+        )
+    
+    data = get_file_bytes(presentation_id)
+    if data is None or not file_info:
+        # Evicted from memory or rendered by another worker: render it again
+        try:
+            data = await render_pool.submit(
+                render_to_bytes, presentation["slides"], presentation.get("engine")
+            )
+        except RenderQueueFull as e:
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy rendering other presentations. Please retry later.",
+                headers={"Retry-After": str(e.retry_after)}
+            )
+        save_file_bytes(presentation_id, data)
+        file_info = describe_bytes(data)
+        await asyncio.to_thread(update_presentation, presentation_id, {"file": file_info})
+    return bytes_response(data, request, download_headers(file_info), filename)
 
 
 @app.post("/api/v1/presentations/{presentation_id}/configure", tags=["Presentations"])
-async def configure_presentation(presentation_id: str, config: PresentationConfigure):
+async def configure_presentation(presentation_id: str, config: PresentationConfigure, request: Request,
+                                 response: Response):
     """
-    Update/configure an existing presentation
+    Update/configure an existing presentation and re-render its file
+    
+    The deck is rendered with the engine it was created with. With the pptx engine,
+    only slides whose title, content, images or position-based palette changed are rebuilt.
     
     - **presentation_id**: The unique identifier of the presentation
     - **title**: New title for the presentation
-    - **slides**: List of slides with title and content
+    - **slides**: List of slides with title and content, and optionally an `image`
+      shown beside the content and a `logo`, each a path under IMAGE_DIR or a
+      base64 data URI
+    - **logo**: Logo for every slide that does not set its own
+
+    Images are scaled to their size on the slide through an on-disk cache, and
+    an image used on many slides is stored once in the file.
+
+    Like create, a profiled request answers with an `X-Profile-Id` header.
     """
-    presentation = get_presentation(presentation_id)
+    presentation = await asyncio.to_thread(get_presentation, presentation_id)
     if not presentation:
         raise HTTPException(status_code=404, detail="Presentation not found")
     
     # Convert slides to the format expected by storage
-    slides_data = [{"title": slide.title, "content": slide.content} for slide in config.slides]
+    slides_data = []
+    for slide in config.slides:
+        slide_data = {"title": slide.title, "content": slide.content}
+        for kind, ref in (("image", slide.image), ("logo", slide.logo or config.logo)):
+            if ref:
+                slide_data[kind] = ref
+        slides_data.append(slide_data)
+    try:
+        await asyncio.to_thread(check_images, slides_data)
+    except ImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Re-render the deck with the engine that made it. The pptx engine reuses unchanged
+    # slides from the previous file; the ooxml engine renders in full, which is about as quick
+    engine = presentation.get("engine") or RENDER_ENGINE
+    try:
+        with profile_request(request.headers, "configure", presentation_id) as profile:
+            if profile:
+                response.headers["X-Profile-Id"] = profile.id
+            if PERSIST_FILES and engine == "pptx":
+                # update_slides edits the previous file with python-pptx, so this is a pptx render
+                key = await asyncio.to_thread(render_cache.key, slides_data, engine)
+                file_path = presentation_file_path(presentation_id)
+                if not await asyncio.to_thread(render_cache.fetch, key, file_path):
+                    file_path = await profiled_submit(
+                        render_pool.submit, update_slides, slides_data, presentation_id,
+                        presentation.get("slide_hashes")
+                    )
+                    await asyncio.to_thread(render_cache.store, key, file_path)
+                file_info = await asyncio.to_thread(describe_file, file_path)
+            else:
+                file_info = await render_deck(slides_data, presentation_id, engine)
+    except RenderQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy rendering other presentations. Please retry later.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except Exception as e:
+        logger.error(f"Error re-rendering presentation {presentation_id}: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"An error occurred while rendering the presentation: {str(e)}"
+        )
     
     # Update the presentation
-    updated_presentation = update_presentation(
-        presentation_id, 
-        {"title": config.title, "slides": slides_data}
+    updated_presentation = await asyncio.to_thread(
+        update_presentation,
+        presentation_id,
+        {
+            "title": config.title,
+            "slides": slides_data,
+            "slide_hashes": compute_slide_hashes(slides_data),
+            "engine": engine,
+            "file": file_info
+        }
     )
     
     if not updated_presentation:
@@ -202,5 +1033,40 @@ async def configure_presentation(presentation_id: str, config: PresentationConfi
     }
 
 
+def require_admin(request: Request):
+    if not is_admin(request.headers):
+        # Look like any unknown path to callers without the token
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@app.get("/admin/profiles", tags=["Admin"])
+async def list_profiles(request: Request):
+    """Recent request profiles, newest first (requires the `X-Admin-Token` header)"""
+    require_admin(request)
+    return {"profiles": profile_store.list()}
+
+
+@app.get("/admin/profiles/{profile_id}", tags=["Admin"])
+async def get_profile(profile_id: str, request: Request, format: str = "json", kind: str = "wall"):
+    """
+    One request profile (requires the `X-Admin-Token` header)
+
+    - **format**: `json` (default) for timings, top frames and memory, or
+      `collapsed` for "frame;frame;frame count" lines to feed a flamegraph tool
+    - **kind**: `wall` (default, waiting included) or `cpu` stacks for `collapsed`
+    """
+    require_admin(request)
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "collapsed":
+        if kind not in ("wall", "cpu"):
+            raise HTTPException(status_code=400, detail="kind must be wall or cpu")
+        return Response(profile.collapsed(kind), media_type="text/plain; charset=utf-8")
+    if format != "json":
+        raise HTTPException(status_code=400, detail="format must be json or collapsed")
+    return profile.to_dict()
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
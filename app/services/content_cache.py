@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from app.services.llm_client import DeadlineExceeded
+
+# Content cache settings (override via environment)
+CONTENT_CACHE_BACKEND = os.getenv("CONTENT_CACHE_BACKEND", "memory")  # "memory", "sqlite" or "none"
+CONTENT_CACHE_TTL = float(os.getenv("CONTENT_CACHE_TTL", "3600"))
+CONTENT_CACHE_MAX_ENTRIES = int(os.getenv("CONTENT_CACHE_MAX_ENTRIES", "1024"))
+CONTENT_CACHE_PATH = os.getenv(
+    "CONTENT_CACHE_PATH", os.path.join(os.getcwd(), "cache", "content_cache.sqlite3")
+)
+
+
+def make_cache_key(*parts) -> str:
+    """Content-addressed key: whitespace and case are normalized before hashing."""
+    normalized = "\x1f".join(" ".join(str(part).split()).lower() for part in parts)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with per-entry TTL."""
+
+    blocking = False  # cheap enough to call on the event loop
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.time() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        self._entries[key] = (time.time(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SqliteCacheBackend:
+    """On-disk LRU cache with per-entry TTL that survives restarts."""
+
+    blocking = True  # disk I/O, so called in a thread
+
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS content_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_content_cache_accessed ON content_cache (accessed_at)"
+        )
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM content_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, stored_at = row
+            if now - stored_at > self.ttl:
+                self._conn.execute("DELETE FROM content_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                "UPDATE content_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            return value
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO content_cache (key, value, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            # Evict the least recently used rows beyond the size limit
+            self._conn.execute(
+                "DELETE FROM content_cache WHERE key IN ("
+                "SELECT key FROM content_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM content_cache").fetchone()[0]
+
+
+class ContentCache:
+    """
+    Caches generated slide content and coalesces concurrent identical requests.
+
+    Values are stored as JSON text so every caller gets its own copy of the slides.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._inflight = {}
+
+    async def _call(self, method, *args):
+        """Call a backend method, in a thread when the backend blocks on I/O."""
+        if self.backend.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def lookup(self, key: str):
+        """Return the cached value for key (counting a hit or miss), or None."""
+        cached = await self._call(self.backend.get, key) if self.backend is not None else None
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(cached)
+
+    async def store(self, key: str, value):
+        """Store a value produced outside get_or_generate."""
+        if self.backend is None:
+            return
+        try:
+            await self._call(self.backend.set, key, json.dumps(value))
+        except Exception as e:
+            logging.warning(f"Failed to store content in cache: {e}")
+
+    async def get_or_generate(self, key: str, generate):
+        """
+        Return the cached value for key, or await generate() to produce it.
+        Concurrent callers with the same key share a single generate() call.
+        """
+        if self.backend is None:
+            self.misses += 1
+            return await generate()
+
+        cached = await self._call(self.backend.get, key)
+        if cached is not None:
+            self.hits += 1
+            return json.loads(cached)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            try:
+                return json.loads(await asyncio.shield(inflight))
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The call we were sharing was cancelled or ran out of its caller's deadline,
+                # not ours; generate it ourselves, under our own budget
+                return await self.get_or_generate(key, generate)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await generate()
+            encoded = json.dumps(value)
+            # Waiters get the value before it is written to the backend
+            future.set_result(encoded)
+            try:
+                await self._call(self.backend.set, key, encoded)
+            except Exception as e:
+                logging.warning(f"Failed to store content in cache: {e}")
+            return value
+        except (asyncio.CancelledError, DeadlineExceeded):
+            # Both belong to this caller alone, so waiters are not failed with them
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "entries": len(self.backend) if self.backend is not None else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+
+def create_backend(kind: str = CONTENT_CACHE_BACKEND):
+    if kind == "none":
+        return None
+    if kind == "sqlite":
+        return SqliteCacheBackend(CONTENT_CACHE_PATH, CONTENT_CACHE_TTL, CONTENT_CACHE_MAX_ENTRIES)
+    if kind == "memory":
+        return MemoryCacheBackend(CONTENT_CACHE_TTL, CONTENT_CACHE_MAX_ENTRIES)
+    raise ValueError(f"Unknown content cache backend: {kind}")
+
+
+content_cache = ContentCache(create_backend())
@@ -1,86 +1,500 @@
 import os
 import json
 from dotenv import load_dotenv
-import google.generativeai as genai
+import time
 import logging
 import asyncio
+from typing import NamedTuple
+from app.services.content_cache import content_cache, make_cache_key
+from app.services.llm_client import LLMClient, UpstreamUnavailable, DeadlineExceeded
+from app.utils.json_stream import IncrementalArrayParser, SalvagedArray, salvage_array
+from app.utils.rate_limit import TokenBucket
+from app.utils.admission import AdaptiveLimiter
+from app.utils.metrics import counter, gauge, histogram, FAST_BUCKETS
+from app.utils.tracing import span
 
 # Load environment variables
 load_dotenv()
 
-# Configure the Generative AI client
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+MODEL_NAME = 'models/gemini-2.5-flash'
 
-async def generate_content(topic: str, num_slides: int, custom_content: str = None):
+# "google" calls the Gemini API; "fake" uses the local stand-in from fake_gemini
+GEMINI_BACKEND = os.getenv("GEMINI_BACKEND", "google")
+
+# Requests per second allowed to the model across the process (0 = unlimited)
+GEMINI_RATE_LIMIT = float(os.getenv("GEMINI_RATE_LIMIT", "0"))
+GEMINI_RATE_BURST = int(os.getenv("GEMINI_RATE_BURST", "5"))
+upstream_limiter = TokenBucket(GEMINI_RATE_LIMIT, GEMINI_RATE_BURST)
+
+# Adaptive limit on requests generating at once, moved by model latency and errors (see utils/admission)
+ADMISSION_LIMIT = os.getenv("ADMISSION_LIMIT", "true").lower() not in ("0", "false", "no")
+ADMISSION_INITIAL_LIMIT = int(os.getenv("ADMISSION_INITIAL_LIMIT", "32"))
+ADMISSION_MIN_LIMIT = int(os.getenv("ADMISSION_MIN_LIMIT", "4"))
+ADMISSION_MAX_LIMIT = int(os.getenv("ADMISSION_MAX_LIMIT", "256"))
+ADMISSION_LATENCY_TOLERANCE = float(os.getenv("ADMISSION_LATENCY_TOLERANCE", "2.0"))  # x baseline latency
+ADMISSION_BACKOFF = float(os.getenv("ADMISSION_BACKOFF", "0.75"))
+generation_limiter = AdaptiveLimiter(
+    ADMISSION_INITIAL_LIMIT, ADMISSION_MIN_LIMIT, ADMISSION_MAX_LIMIT,
+    ADMISSION_LATENCY_TOLERANCE, ADMISSION_BACKOFF, enabled=ADMISSION_LIMIT
+)
+
+# Decks of at least this many slides are generated as an outline plus concurrent chunks (0 = never)
+CHUNKED_GENERATION_THRESHOLD = int(os.getenv("CHUNKED_GENERATION_THRESHOLD", "16"))
+GENERATION_CHUNK_SIZE = int(os.getenv("GENERATION_CHUNK_SIZE", "5"))
+GENERATION_CHUNK_CONCURRENCY = int(os.getenv("GENERATION_CHUNK_CONCURRENCY", "4"))
+GENERATION_CHUNK_RETRIES = int(os.getenv("GENERATION_CHUNK_RETRIES", "2"))
+
+# Output settings: ask for JSON matching a schema, and re-ask only for slides that came back broken
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "true").lower() not in ("0", "false", "no")
+CONTENT_REPAIR_ROUNDS = int(os.getenv("CONTENT_REPAIR_ROUNDS", "2"))
+
+llm_latency = histogram(
+    "pptgen_llm_request_seconds", "Latency of model calls, including streamed responses.", ["mode"]
+)
+parse_latency = histogram(
+    "pptgen_content_parse_seconds", "Time to clean, parse and validate model output.", buckets=FAST_BUCKETS
+)
+llm_in_flight = gauge("pptgen_llm_requests_in_flight", "Model calls currently waiting on the upstream.")
+upstream_errors = counter(
+    "pptgen_upstream_errors_total", "Failed model calls by kind of failure.", ["kind"]
+)
+chunk_retries = counter(
+    "pptgen_generation_chunk_retries_total", "Slide chunks requested again after invalid output."
+)
+content_outputs = counter(
+    "pptgen_content_outputs_total",
+    "Slide arrays from the model by how they were recovered: clean, parsed (syntax fixed "
+    "locally), reasked (some slides requested again) or failed.",
+    ["outcome"]
+)
+repaired_slides = counter(
+    "pptgen_content_reasked_slides_total", "Slides requested again because they were invalid or missing."
+)
+
+SLIDES_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string"},
+            "content": {"type": "array", "items": {"type": "string"}},
+        },
+        "required": ["title", "content"],
+    },
+}
+TITLES_SCHEMA = {"type": "array", "items": {"type": "string"}}
+
+_genai = None
+
+def get_genai():
+    """
+    Imports and configures the Generative AI SDK on first use. The import alone
+    takes most of a second, so it is kept off the module import path and done
+    by the startup warm-up instead.
+    """
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        _genai = genai
+    return _genai
+
+def create_model():
+    """Returns the model client for the configured GEMINI_BACKEND."""
+    if GEMINI_BACKEND == "fake":
+        from app.services.fake_gemini import FakeGenerativeModel
+        return FakeGenerativeModel(MODEL_NAME)
+    return get_genai().GenerativeModel(MODEL_NAME)
+
+# One client (and model instance) shared by every request
+llm_client = LLMClient(create_model, upstream_limiter)
+
+def generation_config(schema):
+    """Generation settings constraining the output to JSON of the given schema (None when off)."""
+    if not LLM_STRUCTURED_OUTPUT:
+        return None
+    return {"response_mime_type": "application/json", "response_schema": schema}
+
+def build_prompt(topic: str, num_slides: int, custom_content: str = None):
+    """Builds the prompt sent to the model for a presentation request."""
+    prompt = (
+        f"Generate content for a {num_slides}-slide presentation on the topic: '{topic}'. "
+        "Each slide should include a 'title' and 'content'. "
+    )
+    if custom_content:
+        prompt += f"Include this custom content: {custom_content}. "
+    prompt += "Format the output as a valid JSON array where each element is a dictionary "
+    prompt += "with 'title' as a string and 'content' as a list of strings."
+    return prompt
+
+def build_outline_prompt(topic: str, num_slides: int, custom_content: str = None):
+    """Builds the prompt asking only for the slide titles of a deck."""
+    prompt = (
+        f"Write the outline of a {num_slides}-slide presentation on the topic: '{topic}'. "
+    )
+    if custom_content:
+        prompt += f"It should cover this custom content: {custom_content}. "
+    prompt += f"Format the output as a valid JSON array of exactly {num_slides} strings, one slide title each."
+    return prompt
+
+def build_chunk_prompt(topic: str, titles: list, first: int, num_slides: int, custom_content: str = None):
+    """Builds the prompt for the content of a run of slides from the outline."""
+    prompt = (
+        f"Generate content for slides {first + 1} to {first + len(titles)} of a {num_slides}-slide "
+        f"presentation on the topic: '{topic}'. "
+        "Each slide should include a 'title' and 'content'. "
+    )
+    if custom_content:
+        prompt += f"Include this custom content where it fits: {custom_content}. "
+    prompt += f"Format the output as a valid JSON array of exactly {len(titles)} dictionaries "
+    prompt += "with 'title' as a string and 'content' as a list of strings, "
+    prompt += "in the order of these slide titles.\nSlide titles: " + json.dumps(titles)
+    return prompt
+
+def build_repair_prompt(topic: str, numbers: list, titles: list, num_slides: int, custom_content: str = None):
+    """Builds the prompt asking again for only the slides that came back invalid or missing."""
+    listed = ", ".join(str(number) for number in numbers)
+    prompt = (
+        f"Generate content for slide{'s' if len(numbers) > 1 else ''} {listed} of a {num_slides}-slide "
+        f"presentation on the topic: '{topic}'. "
+        "Each slide should include a 'title' and 'content'. "
+    )
+    if custom_content:
+        prompt += f"Include this custom content where it fits: {custom_content}. "
+    prompt += f"Format the output as a valid JSON array of exactly {len(numbers)} dictionaries "
+    prompt += "with 'title' as a string and 'content' as a list of strings, "
+    prompt += "in the order of these slide titles; write a fitting title where one is empty."
+    prompt += "\nSlide titles: " + json.dumps(titles)
+    return prompt
+
+async def generate_content(topic: str, num_slides: int, custom_content: str = None, deadline: float = None):
     """
     Generates content for a slide presentation using Google's Generative AI.
 
+    Results are cached by normalized prompt, and concurrent identical requests
+    share a single model call. Model calls go through llm_client, which adds
+    timeouts, retries, hedging and a circuit breaker.
+
     Args:
         topic (str): The topic for the presentation.
         num_slides (int): The number of slides to generate.
         custom_content (str, optional): Custom content to include in the presentation.
+        deadline (float, optional): time.monotonic() by which the model must answer
+            (default LLM_DEADLINE seconds from now).
 
     Returns:
         list: A list of dictionaries, each representing a slide with a title and content.
 
     Raises:
+        UpstreamUnavailable: If the circuit breaker is open.
         Exception: If there are issues with content generation or validation.
     """
-    model = genai.GenerativeModel('models/gemini-2.5-flash')
-
-    # Create the prompt for the AI model
-    prompt = (
-        f"Generate content for a {num_slides}-slide presentation on the topic: '{topic}'. "
-        "Each slide should include a 'title' and 'content'. "
-    )
+    # Collapse stray whitespace so equivalent requests share a cache entry
+    topic = " ".join(topic.split())
     if custom_content:
-        prompt += f"Include this custom content: {custom_content}. "
-    prompt += "Format the output as a valid JSON array where each element is a dictionary "
-    prompt += "with 'title' as a string and 'content' as a list of strings."
+        custom_content = " ".join(custom_content.split())
 
-    try:
-        # Generate content asynchronously
-        response = await model.generate_content_async(prompt)
+    prompt = build_prompt(topic, num_slides, custom_content)
+    key = make_cache_key(MODEL_NAME, prompt)
+    if CHUNKED_GENERATION_THRESHOLD and num_slides >= CHUNKED_GENERATION_THRESHOLD:
+        return await content_cache.get_or_generate(
+            key, lambda: _generate_chunked(topic, num_slides, custom_content, deadline)
+        )
+    return await content_cache.get_or_generate(
+        key, lambda: _request_slides(prompt, topic, num_slides, 0, num_slides, custom_content, deadline)
+    )
 
-        if not response.text:
-            raise ValueError("Received empty response from the model.")
+def validate_slide(item):
+    """Raises ValueError unless item is a slide dict with a title and a list of strings."""
+    if not isinstance(item, dict):
+        raise ValueError("Each item in the array must be a dictionary.")
+    if 'title' not in item or 'content' not in item:
+        raise ValueError("Each dictionary must have 'title' and 'content' keys.")
+    if not isinstance(item['content'], list) or not all(isinstance(line, str) for line in item['content']):
+        raise ValueError("'content' must be a list of strings.")
 
-        raw_content = response.text.strip()
-        logging.debug(f"Raw response content: {raw_content}")
+class ParsedSlides(NamedTuple):
+    slides: list     # one entry per slide, None where it was invalid or missing
+    titles: list     # the title each slide had, even a broken one ("" if none)
+    complete: bool   # False when the output was cut off or had no array
+    repaired: bool   # True when the JSON itself needed fixing
 
-        # Clean the response to extract valid JSON
-        cleaned_content = raw_content.replace("```json", "").replace("```", "").strip()
-        logging.debug(f"Cleaned response content: {cleaned_content}")
+def parse_slides(text: str, num_slides: int = None):
+    """
+    Leniently parses the model's slide array (see json_stream.salvage_array).
+    Slides that do not validate become None rather than failing the whole
+    response. With num_slides the result is cut or padded with None (missing
+    slides) to exactly that many.
+    """
+    logging.debug(f"Raw response content: {text}")
+    try:
+        salvaged = salvage_array(text)
+    except ValueError as e:
+        logging.error(f"JSON decoding error: {e}")
+        upstream_errors.inc(kind="invalid_json")
+        salvaged = SalvagedArray([], False, True)
 
-        # Validate and parse the JSON response
+    slides, titles = [], []
+    for item in salvaged.items:
         try:
-            json_content = json.loads(cleaned_content)
-
-            # Ensure the JSON is a list of dictionaries with required keys
-            if not isinstance(json_content, list):
-                raise ValueError("Generated content is not a JSON array.")
-            for item in json_content:
-                if not isinstance(item, dict):
-                    raise ValueError("Each item in the array must be a dictionary.")
-                if 'title' not in item or 'content' not in item:
-                    raise ValueError("Each dictionary must have 'title' and 'content' keys.")
-                if not isinstance(item['content'], list) or not all(isinstance(line, str) for line in item['content']):
-                    raise ValueError("'content' must be a list of strings.")
-
-            return json_content
-
-        except json.JSONDecodeError as e:
-            logging.error(f"JSON decoding error: {e}")
-            logging.error(f"Invalid response content: {cleaned_content}")
-            raise Exception("Invalid JSON format from the model.")
+            validate_slide(item)
+            slides.append(item)
         except ValueError as ve:
-            logging.error(f"Validation error: {ve}")
-            raise Exception("Invalid content structure.")
+            logging.warning(f"Validation error: {ve}")
+            slides.append(None)
+        title = item.get('title') if isinstance(item, dict) else None
+        titles.append(title if isinstance(title, str) else "")
+    if num_slides is not None:
+        missing = max(0, num_slides - len(slides))
+        slides = slides[:num_slides] + [None] * missing
+        titles = titles[:num_slides] + [""] * missing
+    return ParsedSlides(slides, titles, salvaged.complete, salvaged.repaired)
+
+def parse_content(text: str):
+    """Cleans the model's response text and returns the validated slide list."""
+    parsed = parse_slides(text)
+    if not parsed.slides and not parsed.complete:
+        raise Exception("Invalid JSON format from the model.")
+    if None in parsed.slides or not parsed.complete:
+        upstream_errors.inc(kind="invalid_structure")
+        raise Exception("Invalid content structure.")
+    return parsed.slides
+
+def parse_outline(text: str):
+    """Parses the outline response into a list of slide titles."""
+    try:
+        items = salvage_array(text).items
+    except ValueError as e:
+        logging.error(f"JSON decoding error in outline: {e}")
+        upstream_errors.inc(kind="invalid_json")
+        raise Exception("Invalid JSON format from the model.")
+    titles = [title for title in items if isinstance(title, str)]
+    if not titles:
+        upstream_errors.inc(kind="invalid_structure")
+        raise Exception("Invalid outline structure.")
+    return titles
+
+async def _request_content(prompt: str, deadline: float = None, parse=parse_content, schema=None):
+    """Sends the prompt to the model and returns the parsed, validated response."""
+    try:
+        # Generate content asynchronously, within the shared upstream quota
+        with span("llm.request", model=MODEL_NAME):
+            llm_in_flight.inc()
+            start = time.perf_counter()
+            try:
+                response = await llm_client.generate(prompt, deadline, generation_config(schema))
+            except UpstreamUnavailable:
+                upstream_errors.inc(kind="circuit_open")
+                generation_limiter.record(time.perf_counter() - start, ok=False)
+                raise
+            except Exception:
+                upstream_errors.inc(kind="request")
+                generation_limiter.record(time.perf_counter() - start, ok=False)
+                raise
+            finally:
+                llm_in_flight.dec()
+                llm_latency.observe(time.perf_counter() - start, mode="request")
+            generation_limiter.record(time.perf_counter() - start)
+
+        if not response.text:
+            upstream_errors.inc(kind="empty")
+            raise ValueError("Received empty response from the model.")
+
+        with span("content.parse"):
+            parse_start = time.perf_counter()
+            try:
+                return parse(response.text)
+            finally:
+                parse_latency.observe(time.perf_counter() - parse_start)
 
+    except (UpstreamUnavailable, DeadlineExceeded):
+        raise
     except Exception as e:
         logging.error(f"Error generating content: {e}")
         raise Exception(f"Error generating content: {e}")
 
+async def _request_slides(prompt: str, topic: str, count: int, first: int, num_slides: int,
+                          custom_content: str = None, deadline: float = None, titles: list = None):
+    """
+    Requests `count` slides (deck positions first+1.. of num_slides) and returns
+    them all valid. Slides that come back invalid or missing, for example after
+    the output was cut off, are asked for again on their own, up to
+    CONTENT_REPAIR_ROUNDS times, and merged back in place; a broken slide's
+    title (or the outline's, when given as titles) is kept for the re-ask.
+    """
+    parsed = await _request_content(prompt, deadline, lambda text: parse_slides(text, count), SLIDES_SCHEMA)
+    slides = parsed.slides
+    hints = titles or parsed.titles
+    outcome = "parsed" if parsed.repaired else "clean"
+
+    for repair_round in range(CONTENT_REPAIR_ROUNDS):
+        missing = [i for i, slide in enumerate(slides) if slide is None]
+        if not missing:
+            break
+        if outcome != "reasked":
+            upstream_errors.inc(kind="invalid_structure")
+            outcome = "reasked"
+        repaired_slides.inc(len(missing))
+        numbers = [first + i + 1 for i in missing]
+        logging.warning(f"Asking again for {len(missing)} of {count} slides: {numbers}")
+        repair_prompt = build_repair_prompt(
+            topic, numbers, [hints[i] for i in missing], num_slides, custom_content
+        )
+        try:
+            with span("content.repair", slides=len(missing), round=repair_round):
+                fixed = await _request_content(
+                    repair_prompt, deadline, lambda text: parse_slides(text, len(missing)), SLIDES_SCHEMA
+                )
+        except (UpstreamUnavailable, DeadlineExceeded):
+            raise
+        except Exception as e:
+            logging.warning(f"Slide repair failed: {e}")
+            continue
+        for i, slide in zip(missing, fixed.slides):
+            if slide is not None:
+                slides[i] = slide
+
+    if None in slides:
+        content_outputs.inc(outcome="failed")
+        raise Exception("Invalid content structure.")
+    content_outputs.inc(outcome=outcome)
+    return slides
+
+async def _generate_chunk(topic, titles, first, num_slides, custom_content, deadline, semaphore):
+    """Generates one run of slides, asking again (for this chunk only) when the request fails."""
+    prompt = build_chunk_prompt(topic, titles, first, num_slides, custom_content)
+
+    async with semaphore:
+        for attempt in range(GENERATION_CHUNK_RETRIES + 1):
+            try:
+                with span("content.chunk", first=first, slides=len(titles), attempt=attempt):
+                    return await _request_slides(
+                        prompt, topic, len(titles), first, num_slides, custom_content, deadline, titles
+                    )
+            except (UpstreamUnavailable, DeadlineExceeded):
+                raise
+            except Exception as e:
+                if attempt == GENERATION_CHUNK_RETRIES:
+                    raise
+                chunk_retries.inc()
+                logging.warning(f"Retrying slides {first + 1}-{first + len(titles)}: {e}")
+
+async def _generate_chunked(topic: str, num_slides: int, custom_content: str = None, deadline: float = None):
+    """
+    Generates a large deck in two phases: one outline call for the slide titles,
+    then concurrent calls for GENERATION_CHUNK_SIZE slides each (at most
+    GENERATION_CHUNK_CONCURRENCY at a time), merged in outline order. Shorter
+    outputs per call finish sooner and stay clear of output limits, and a chunk
+    with invalid output is retried on its own.
+    """
+    with span("content.outline", num_slides=num_slides):
+        titles = await _request_content(
+            build_outline_prompt(topic, num_slides, custom_content), deadline, parse_outline, TITLES_SCHEMA
+        )
+    if len(titles) != num_slides:
+        logging.warning(f"Outline has {len(titles)} titles for a {num_slides}-slide deck")
+        titles = titles[:num_slides]
+
+    semaphore = asyncio.Semaphore(max(1, GENERATION_CHUNK_CONCURRENCY))
+    size = max(1, GENERATION_CHUNK_SIZE)
+    tasks = [
+        asyncio.ensure_future(_generate_chunk(
+            topic, titles[first:first + size], first, len(titles), custom_content, deadline, semaphore
+        ))
+        for first in range(0, len(titles), size)
+    ]
+    try:
+        chunks = await asyncio.gather(*tasks)
+    except BaseException:
+        # One chunk failed for good: stop spending model calls on the others
+        for task in tasks:
+            task.cancel()
+        raise
+    return [slide for chunk in chunks for slide in chunk]
+
+async def stream_content(topic: str, num_slides: int, custom_content: str = None):
+    """
+    Streams slides for a presentation as the model produces them.
+
+    Uses the model's streaming API and an incremental JSON array parser, so each
+    slide is yielded as soon as its closing brace arrives. Cached content is
+    replayed directly, and a fully streamed deck is stored in the content cache.
+
+    Args:
+        topic (str): The topic for the presentation.
+        num_slides (int): The number of slides to generate.
+        custom_content (str, optional): Custom content to include in the presentation.
+
+    Yields:
+        dict: One validated slide with a title and content.
+
+    Raises:
+        Exception: If the stream fails or a slide does not validate.
+    """
+    topic = " ".join(topic.split())
+    if custom_content:
+        custom_content = " ".join(custom_content.split())
+
+    prompt = build_prompt(topic, num_slides, custom_content)
+    key = make_cache_key(MODEL_NAME, prompt)
+
+    cached = await content_cache.lookup(key)
+    if cached is not None:
+        for item in cached:
+            yield item
+        return
+
+    # Streams are not retried or hedged, but share the model and the circuit breaker
+    trial = llm_client.breaker.before_call()
+    parser = IncrementalArrayParser()
+    slides = []
+
+    await upstream_limiter.acquire()
+    llm_in_flight.inc()
+    start = time.perf_counter()
+    try:
+        config = generation_config(SLIDES_SCHEMA)
+        if config:
+            response = await llm_client.model.generate_content_async(prompt, stream=True, generation_config=config)
+        else:
+            response = await llm_client.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            for item in parser.feed(chunk.text or ""):
+                validate_slide(item)
+                slides.append(item)
+                yield item
+            if parser.finished:
+                break
+    except json.JSONDecodeError as e:
+        llm_client.breaker.record_success()
+        logging.error(f"JSON decoding error in stream: {e}")
+        upstream_errors.inc(kind="invalid_json")
+        raise Exception("Invalid JSON format from the model.")
+    except ValueError as ve:
+        llm_client.breaker.record_success()
+        logging.error(f"Validation error in stream: {ve}")
+        upstream_errors.inc(kind="invalid_structure")
+        raise Exception("Invalid content structure.")
+    except Exception:
+        llm_client.breaker.record_failure()
+        upstream_errors.inc(kind="request")
+        raise
+    finally:
+        if trial:
+            # Closed early by the consumer: no verdict on the upstream
+            llm_client.breaker.release()
+        llm_in_flight.dec()
+        llm_latency.observe(time.perf_counter() - start, mode="stream")
+
+    llm_client.breaker.record_success()
+    if not parser.started:
+        upstream_errors.inc(kind="invalid_json")
+        raise Exception("Invalid JSON format from the model.")
+    if not parser.finished:
+        logging.warning(f"Model stream ended before the JSON array closed ({len(slides)} slides)")
+    else:
+        await content_cache.store(key, slides)
+
 # Example usage (within an async context)
 async def main():
     topic = "Introduction to Python"
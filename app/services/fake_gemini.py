@@ -0,0 +1,163 @@
+"""
+Local stand-in for the Gemini model, used by benchmarks and load tests.
+
+Selected with GEMINI_BACKEND=fake. It answers generate_content_async (plain or
+stream=True) with a well-formed slide array for the requested topic and slide
+count after a configurable delay, fails a configurable share of calls and
+makes another share straggle, to exercise retries and hedging. It can also
+serve only so many calls at once (the rest queue, as an overloaded upstream
+would) and slow down periodically, to exercise admission control. Another share
+of answers can come back damaged (a trailing comma, cut off, one slide missing
+its content, or prose around the array) to exercise content repair. With a
+response_schema in generation_config the array is returned without a fence.
+"""
+import os
+import re
+import json
+import time
+import random
+import asyncio
+
+# Fake model settings (override via environment)
+FAKE_GEMINI_LATENCY = float(os.getenv("FAKE_GEMINI_LATENCY", "0.5"))  # seconds per call
+FAKE_GEMINI_JITTER = float(os.getenv("FAKE_GEMINI_JITTER", "0.2"))  # extra uniform 0..jitter seconds
+FAKE_GEMINI_ERROR_RATE = float(os.getenv("FAKE_GEMINI_ERROR_RATE", "0"))  # 0..1
+FAKE_GEMINI_SLOW_RATE = float(os.getenv("FAKE_GEMINI_SLOW_RATE", "0"))  # 0..1 share of straggling calls
+FAKE_GEMINI_SLOW_LATENCY = float(os.getenv("FAKE_GEMINI_SLOW_LATENCY", "5"))  # seconds added to a straggler
+FAKE_GEMINI_SLIDE_LATENCY = float(os.getenv("FAKE_GEMINI_SLIDE_LATENCY", "0"))  # seconds per generated slide
+FAKE_GEMINI_MALFORMED_RATE = float(os.getenv("FAKE_GEMINI_MALFORMED_RATE", "0"))  # 0..1 share of damaged answers
+FAKE_GEMINI_STREAM_CHUNKS = int(os.getenv("FAKE_GEMINI_STREAM_CHUNKS", "20"))
+FAKE_GEMINI_CAPACITY = int(os.getenv("FAKE_GEMINI_CAPACITY", "0"))  # calls served at once, the rest queue (0 = no cap)
+FAKE_GEMINI_SPIKE_PERIOD = float(os.getenv("FAKE_GEMINI_SPIKE_PERIOD", "0"))  # seconds between latency spikes (0 = none)
+FAKE_GEMINI_SPIKE_DURATION = float(os.getenv("FAKE_GEMINI_SPIKE_DURATION", "5"))  # seconds, at the end of each period
+FAKE_GEMINI_SPIKE_LATENCY = float(os.getenv("FAKE_GEMINI_SPIKE_LATENCY", "2"))  # seconds added during a spike
+FAKE_GEMINI_SEED = os.getenv("FAKE_GEMINI_SEED")
+
+_NUM_SLIDES_RE = re.compile(r"(\d+)-slide")
+_TOPIC_RE = re.compile(r"topic: '(.*?)'\. ")
+_SLIDE_TITLES = "\nSlide titles: "
+
+_random = random.Random(FAKE_GEMINI_SEED)
+_started = time.monotonic()
+
+
+class FakeUpstreamError(Exception):
+    """Raised for the injected share of failed calls."""
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class _StreamResponse:
+    def __init__(self, text, chunks, delay):
+        self._text = text
+        self._chunks = max(1, chunks)
+        self._delay = delay
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        size = max(1, -(-len(self._text) // self._chunks))
+        for start in range(0, len(self._text), size):
+            await asyncio.sleep(self._delay / self._chunks)
+            yield _Response(self._text[start:start + size])
+
+
+def fake_titles(topic, num_slides):
+    return [f"{topic}: Part {i + 1}" for i in range(num_slides)]
+
+
+def fake_slides(topic, num_slides, titles=None):
+    return [
+        {
+            "title": title or f"{topic}: Part {i + 1}",
+            "content": [
+                f"**Key idea {j + 1}:** how {topic} works in *practice*" for j in range(4)
+            ],
+        }
+        for i, title in enumerate(titles or fake_titles(topic, num_slides))
+    ]
+
+
+def damage(slides):
+    """Return the slides as JSON text with one kind of mistake models make."""
+    kind = _random.choice(("trailing_comma", "truncated", "invalid_slide", "prose"))
+    if kind == "invalid_slide":
+        slides = [dict(slide) for slide in slides]
+        del slides[_random.randrange(len(slides))]["content"]
+    text = json.dumps(slides, indent=2)
+    if kind == "trailing_comma":
+        return text[:-2] + ",\n]"
+    if kind == "truncated":
+        return text[:_random.randrange(len(text) // 2, len(text) - 1)]
+    if kind == "prose":
+        return "Here is the presentation you asked for:\n" + text + "\nLet me know if you need changes."
+    return text
+
+
+class FakeGenerativeModel:
+    """Drop-in for genai.GenerativeModel with configurable latency and error rate."""
+
+    def __init__(self, model_name, latency=None, jitter=None, error_rate=None, slow_rate=None):
+        self.model_name = model_name
+        self.latency = FAKE_GEMINI_LATENCY if latency is None else latency
+        self.jitter = FAKE_GEMINI_JITTER if jitter is None else jitter
+        self.error_rate = FAKE_GEMINI_ERROR_RATE if error_rate is None else error_rate
+        self.slow_rate = FAKE_GEMINI_SLOW_RATE if slow_rate is None else slow_rate
+        self.malformed_rate = FAKE_GEMINI_MALFORMED_RATE
+        self._capacity = None
+
+    def _delay(self, slides=0):
+        # Output is generated serially, so longer answers take longer
+        delay = self.latency + _random.uniform(0, self.jitter) + slides * FAKE_GEMINI_SLIDE_LATENCY
+        if _random.random() < self.slow_rate:
+            delay += FAKE_GEMINI_SLOW_LATENCY
+        if FAKE_GEMINI_SPIKE_PERIOD > 0:
+            phase = (time.monotonic() - _started) % FAKE_GEMINI_SPIKE_PERIOD
+            if phase >= FAKE_GEMINI_SPIKE_PERIOD - FAKE_GEMINI_SPIKE_DURATION:
+                delay += FAKE_GEMINI_SPIKE_LATENCY
+        return delay
+
+    async def _serve(self, delay):
+        """Take `delay` seconds, queueing first when FAKE_GEMINI_CAPACITY calls are already served."""
+        if FAKE_GEMINI_CAPACITY <= 0:
+            await asyncio.sleep(delay)
+            return
+        if self._capacity is None:
+            self._capacity = asyncio.Semaphore(FAKE_GEMINI_CAPACITY)
+        async with self._capacity:
+            await asyncio.sleep(delay)
+
+    def _answer(self, prompt, structured=False, damaged=False):
+        """Return (response text, slides generated) for a deck, outline or chunk prompt."""
+        num_slides = _NUM_SLIDES_RE.search(prompt)
+        num_slides = int(num_slides.group(1)) if num_slides else 5
+        topic = _TOPIC_RE.search(prompt)
+        topic = topic.group(1) if topic else "Topic"
+        if prompt.startswith("Write the outline"):
+            # Titles only: about a tenth of the output of full slides
+            return json.dumps(fake_titles(topic, num_slides)), num_slides / 10
+        if _SLIDE_TITLES in prompt:
+            titles = json.loads(prompt.rsplit(_SLIDE_TITLES, 1)[1])
+            slides = fake_slides(topic, len(titles), titles)
+        else:
+            slides = fake_slides(topic, num_slides)
+        text = damage(slides) if damaged and slides else json.dumps(slides, indent=2)
+        return (text if structured else "```json\n" + text + "\n```"), len(slides)
+
+    async def generate_content_async(self, prompt, stream=False, generation_config=None, **kwargs):
+        structured = bool(generation_config and generation_config.get("response_schema"))
+        # Streams are validated as they arrive, so only whole answers are damaged
+        damaged = not stream and _random.random() < self.malformed_rate
+        text, slides = self._answer(prompt, structured, damaged)
+        delay = self._delay(slides)
+        if _random.random() < self.error_rate:
+            await self._serve(delay)
+            raise FakeUpstreamError("503 The model is overloaded. Please try again later.")
+        if stream:
+            return _StreamResponse(text, FAKE_GEMINI_STREAM_CHUNKS, delay)
+        await self._serve(delay)
+        return _Response(text)
@@ -0,0 +1,317 @@
+"""
+Slide images: resolving references, and an on-disk cache of images already
+scaled to the size they are shown at.
+
+A slide names an image as a path under IMAGE_DIR or as a base64 data URI
+("data:image/png;base64,..."). Sources are hashed by streaming them in chunks
+(file digests are remembered by path, size and mtime, those of small data
+URIs by the string itself), so the decoded original is never held in memory
+just to identify it. prepare() scales a source to fit a box in pixels (the
+slide box at IMAGE_DPI) and re-encodes it, PNG for lossless or transparent
+sources and JPEG for the rest, into cache/images/ named by source hash and
+target size. A later deck showing the same image at the same size reads that
+file and skips decoding altogether. Sources already
+small enough, in PNG or JPEG, are kept byte for byte.
+
+Entries are evicted least recently used first (by mtime, which a hit
+refreshes) once they total more than IMAGE_CACHE_MAX_BYTES.
+"""
+import io
+import os
+import re
+import time
+import base64
+import shutil
+import hashlib
+import logging
+import binascii
+import tempfile
+import threading
+from functools import lru_cache
+from typing import NamedTuple
+
+from app.utils.metrics import counter, gauge
+
+# Image settings (override via environment)
+IMAGE_DIR = os.getenv("IMAGE_DIR", os.path.join(os.getcwd(), "images"))
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(os.getcwd(), "cache", "images"))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+IMAGE_CACHE_SCAN_INTERVAL = float(os.getenv("IMAGE_CACHE_SCAN_INTERVAL", "60"))  # seconds
+IMAGE_DPI = int(os.getenv("IMAGE_DPI", "150"))  # pixels per inch of slide the cached copies get
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(20 * 1024 * 1024)))  # largest source accepted
+
+CHUNK_SIZE = 1024 * 1024
+# Sources kept lossless; anything else without transparency becomes a JPEG
+LOSSLESS_FORMATS = ("PNG", "GIF", "BMP", "TIFF")
+MEDIA_CONTENT_TYPES = {"png": "image/png", "jpeg": "image/jpeg"}
+DATA_DIGEST_MEMO_BYTES = 256 * 1024  # data URIs up to this long have their digest remembered
+
+_DATA_URI_RE = re.compile(r"data:image/[\w.+-]+;base64,", re.IGNORECASE)
+# EXIF orientation -> the transpose that shows the image upright
+_ORIENTATIONS = {2: "FLIP_LEFT_RIGHT", 3: "ROTATE_180", 4: "FLIP_TOP_BOTTOM",
+                 5: "TRANSPOSE", 6: "ROTATE_270", 7: "TRANSVERSE", 8: "ROTATE_90"}
+
+image_cache_lookups = counter(
+    "pptgen_image_cache_lookups_total", "Scaled image cache lookups by result (hit or miss).", ["result"]
+)
+image_cache_evictions = counter(
+    "pptgen_image_cache_evictions_total", "Scaled images evicted from the image cache."
+)
+
+
+class ImageError(ValueError):
+    """An image reference that cannot be used: missing, outside IMAGE_DIR, too large or not an image."""
+
+
+class PreparedImage(NamedTuple):
+    key: str     # source hash, target size and quality; identical keys share one media part
+    path: str    # the scaled file in the cache
+    ext: str     # "png" or "jpeg"
+    width: int   # pixels
+    height: int
+
+
+def is_data_uri(ref: str) -> bool:
+    return bool(_DATA_URI_RE.match(ref))
+
+
+def resolve_path(ref: str) -> str:
+    """The file a path reference names, which must be inside IMAGE_DIR."""
+    root = os.path.realpath(IMAGE_DIR)
+    path = os.path.realpath(os.path.join(root, ref))
+    if os.path.commonpath([root, path]) != root:
+        raise ImageError(f"Image path is outside the image directory: {ref}")
+    return path
+
+
+def _data_chunks(ref: str):
+    """Decoded bytes of a base64 data URI, a chunk at a time."""
+    start = _DATA_URI_RE.match(ref).end()
+    if (len(ref) - start) * 3 // 4 > IMAGE_MAX_BYTES:
+        raise ImageError(f"Image is larger than {IMAGE_MAX_BYTES} bytes")
+    step = CHUNK_SIZE // 3 * 4  # whole base64 quanta
+    for offset in range(start, len(ref), step):
+        try:
+            yield base64.b64decode(ref[offset:offset + step], validate=True)
+        except binascii.Error as e:
+            raise ImageError(f"Invalid base64 image data: {e}")
+
+
+@lru_cache(maxsize=1024)
+def _file_digest(path: str, size: int, mtime_ns: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _hash_data(ref: str) -> str:
+    digest = hashlib.sha256()
+    for chunk in _data_chunks(ref):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Keyed by the whole string, so only small URIs (logos, icons) are remembered
+_small_data_digest = lru_cache(maxsize=64)(_hash_data)
+
+
+def _data_digest(ref: str) -> str:
+    # A logo repeated on every slide is the same string each time, so it is hashed once.
+    # Larger images are hashed on every use rather than kept alive by the memo
+    if len(ref) <= DATA_DIGEST_MEMO_BYTES:
+        return _small_data_digest(ref)
+    return _hash_data(ref)
+
+
+def source_digest(ref: str) -> str:
+    """SHA-256 of the image bytes a reference names, streamed rather than read whole."""
+    if not isinstance(ref, str) or not ref:
+        raise ImageError("Image reference must be a non-empty string")
+    if is_data_uri(ref):
+        return _data_digest(ref)
+    path = resolve_path(ref)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise ImageError(f"Image not found: {ref}")
+    if stat.st_size > IMAGE_MAX_BYTES:
+        raise ImageError(f"Image is larger than {IMAGE_MAX_BYTES} bytes: {ref}")
+    return _file_digest(path, stat.st_size, stat.st_mtime_ns)
+
+
+class ImageCache:
+    """Images scaled to a target size, keyed by source hash and size."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> PreparedImage, so hits skip reading the image header
+        self._last_scan = 0.0
+        self._stats = {"images": 0, "bytes": 0}
+
+    def _entry_path(self, key: str, ext: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.{ext}")
+
+    def _lookup(self, key: str):
+        entry = self._entries.get(key)
+        if entry is not None:
+            try:
+                os.utime(entry.path)  # mark as used for LRU
+                return entry
+            except FileNotFoundError:
+                self._entries.pop(key, None)
+        for ext in MEDIA_CONTENT_TYPES:
+            path = self._entry_path(key, ext)
+            if os.path.exists(path):
+                from PIL import Image
+
+                try:
+                    # Opening reads the header only
+                    with Image.open(path) as image:
+                        width, height = image.size
+                    os.utime(path)
+                except (OSError, ValueError):
+                    continue
+                return self._remember(PreparedImage(key, path, ext, width, height))
+        return None
+
+    def _remember(self, entry: PreparedImage) -> PreparedImage:
+        if len(self._entries) >= 4096:
+            self._entries.clear()
+        self._entries[entry.key] = entry
+        return entry
+
+    def prepare(self, ref: str, width: int, height: int) -> PreparedImage:
+        """The image a reference names, scaled to fit width x height pixels, from the cache or made now."""
+        key = f"{source_digest(ref)}-{width}x{height}-q{IMAGE_JPEG_QUALITY}"
+        entry = self._lookup(key)
+        if entry is not None:
+            image_cache_lookups.inc(result="hit")
+            return entry
+        image_cache_lookups.inc(result="miss")
+        entry = self._remember(self._scale(ref, key, width, height))
+        self.maybe_evict()
+        return entry
+
+    def _scale(self, ref: str, key: str, width: int, height: int) -> PreparedImage:
+        from PIL import Image
+
+        os.makedirs(os.path.join(self.directory, key[:2]), exist_ok=True)
+        source = None
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            if is_data_uri(ref):
+                # Decode to a file so Pillow reads it like any other source
+                fd, source = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in _data_chunks(ref):
+                        f.write(chunk)
+                source_path = source
+            else:
+                source_path = resolve_path(ref)
+
+            try:
+                with Image.open(source_path) as image:
+                    source_format = image.format
+                    orientation = image.getexif().get(0x0112, 1)
+                    transparent = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+                    ext = "png" if transparent or source_format in LOSSLESS_FORMATS else "jpeg"
+                    rotated = orientation in (5, 6, 7, 8)
+                    box = (height, width) if rotated else (width, height)
+                    if (image.width <= box[0] and image.height <= box[1] and orientation == 1
+                            and source_format == ext.upper()):
+                        shutil.copyfile(source_path, temp_path)
+                    else:
+                        # Decodes JPEGs at a reduced scale (draft mode) before resampling
+                        image.thumbnail(box, Image.Resampling.LANCZOS)
+                        if orientation in _ORIENTATIONS:
+                            image = image.transpose(getattr(Image.Transpose, _ORIENTATIONS[orientation]))
+                        if ext == "png":
+                            if image.mode not in ("1", "L", "LA", "P", "RGB", "RGBA"):
+                                image = image.convert("RGBA")
+                            image.save(temp_path, "PNG")
+                        else:
+                            if image.mode not in ("L", "RGB"):
+                                image = image.convert("RGB")
+                            image.save(temp_path, "JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True)
+            except ImageError:
+                raise
+            except (OSError, ValueError, Image.DecompressionBombError) as e:
+                raise ImageError(f"Cannot read image: {e}")
+
+            with Image.open(temp_path) as scaled:
+                size = scaled.size
+            path = self._entry_path(key, ext)
+            os.replace(temp_path, path)
+        finally:
+            for leftover in (temp_path, source):
+                if leftover and os.path.exists(leftover):
+                    os.remove(leftover)
+        return PreparedImage(key, path, ext, *size)
+
+    def check(self, ref: str):
+        """Raise ImageError unless ref names a readable image; reads the header only."""
+        source_digest(ref)
+        from PIL import Image
+
+        try:
+            # The first chunk of a data URI holds the header
+            source = io.BytesIO(next(_data_chunks(ref), b"")) if is_data_uri(ref) else resolve_path(ref)
+            with Image.open(source):
+                pass
+        except (OSError, ValueError) as e:
+            raise ImageError(f"Cannot read image {ref}: {e}")
+
+    def maybe_evict(self):
+        if time.monotonic() - self._last_scan >= IMAGE_CACHE_SCAN_INTERVAL:
+            self.evict()
+
+    def evict(self) -> int:
+        """Remove the least recently used images until the cache fits max_bytes. Returns how many."""
+        with self._lock:
+            entries = []
+            total = 0
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if name.endswith(".tmp"):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    total += stat.st_size
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            evicted = 0
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                evicted += 1
+
+            self._stats = {"images": len(entries) - evicted, "bytes": total}
+            self._last_scan = time.monotonic()
+        if evicted:
+            image_cache_evictions.inc(evicted)
+            logging.info(f"Evicted {evicted} images from the image cache")
+        return evicted
+
+    def stats(self) -> dict:
+        """Totals from the latest scan, plus the budget."""
+        return {**self._stats, "max_bytes": self.max_bytes}
+
+
+image_cache = ImageCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES)
+
+gauge("pptgen_image_cache_bytes", "Bytes of scaled images in the image cache at the last scan.",
+      callback=lambda: image_cache.stats()["bytes"])
@@ -0,0 +1,285 @@
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import logging
+import ipaddress
+import http.client
+import urllib.parse
+from collections import OrderedDict, deque
+
+# Job scheduler settings (override via environment)
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "8"))
+JOB_PER_CLIENT_CONCURRENCY = int(os.getenv("JOB_PER_CLIENT_CONCURRENCY", "2"))
+JOB_MAX_QUEUED_PER_CLIENT = int(os.getenv("JOB_MAX_QUEUED_PER_CLIENT", "100"))
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", "1000"))
+WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", "5"))
+WEBHOOK_RETRIES = int(os.getenv("WEBHOOK_RETRIES", "3"))
+# Comma-separated hosts callbacks may go to ("*.example.com" matches subdomains); empty allows any
+WEBHOOK_ALLOWED_HOSTS = [
+    host.strip().lower() for host in os.getenv("WEBHOOK_ALLOWED_HOSTS", "").split(",") if host.strip()
+]
+WEBHOOK_ALLOW_PRIVATE = os.getenv("WEBHOOK_ALLOW_PRIVATE", "false").lower() not in ("0", "false", "no")
+
+# Job lifecycle states
+QUEUED = "queued"
+GENERATING = "generating"
+RENDERING = "rendering"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    """Raised when a client already has too many queued jobs."""
+
+
+class Job:
+    def __init__(self, client_id: str, runner, callback_url: str = None):
+        self.id = str(uuid.uuid4())
+        self.client_id = client_id
+        self.callback_url = callback_url
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self._runner = runner
+
+    def set_status(self, status: str):
+        self.status = status
+        self.updated_at = time.time()
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "client_id": self.client_id,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class CallbackURLError(ValueError):
+    """A callback URL the server will not call."""
+
+
+def _is_public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])  # drop an IPv6 scope id
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def check_callback_url(url: str, resolve: bool = False) -> list:
+    """
+    Raise CallbackURLError unless url is an http(s) URL on a host listed in
+    WEBHOOK_ALLOWED_HOSTS (when set) that is not a loopback, private,
+    link-local or other non-public address (unless WEBHOOK_ALLOW_PRIVATE).
+    Host names are only looked up with `resolve`, since that blocks.
+    Returns the addresses that were checked (none for an unresolved name).
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise CallbackURLError("callback_url must be an http or https URL")
+    host = parts.hostname
+    if WEBHOOK_ALLOWED_HOSTS and not any(
+        host == allowed or (allowed.startswith("*.") and host.endswith(allowed[1:]))
+        for allowed in WEBHOOK_ALLOWED_HOSTS
+    ):
+        raise CallbackURLError(f"callback_url host is not allowed: {host}")
+
+    try:
+        addresses = [str(ipaddress.ip_address(host))]
+    except ValueError:
+        if not resolve:
+            return []
+        try:
+            infos = socket.getaddrinfo(host, parts.port or 80, proto=socket.IPPROTO_TCP)
+        except (socket.gaierror, UnicodeError) as e:
+            raise CallbackURLError(f"Cannot resolve callback_url host {host}: {e}")
+        addresses = [info[4][0] for info in infos]
+    if not WEBHOOK_ALLOW_PRIVATE:
+        for address in addresses:
+            if not _is_public(address):
+                raise CallbackURLError(f"callback_url host {host} is not a public address")
+    return addresses
+
+
+def _post_json(url: str, payload: dict):
+    """
+    POST a JSON body to url (blocking). The host is resolved and checked here,
+    and the connection goes to the checked address, so a second DNS answer
+    cannot point it elsewhere. The Host header and TLS name stay the URL's.
+    Redirects are not followed, since they could lead to another host.
+    """
+    address = check_callback_url(url, resolve=True)[0]
+    parts = urllib.parse.urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    connection = connection_class(parts.hostname, parts.port, timeout=WEBHOOK_TIMEOUT)
+    connection._create_connection = (
+        lambda target, *args: socket.create_connection((address, target[1]), *args)
+    )
+    path = parts.path or "/"
+    if parts.query:
+        path = f"{path}?{parts.query}"
+    try:
+        connection.request(
+            "POST", path, body=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}
+        )
+        response = connection.getresponse()
+        response.read()
+    finally:
+        connection.close()
+    if response.status >= 300:
+        raise OSError(f"HTTP {response.status} {response.reason}")
+    return response.status
+
+
+async def send_webhook(url: str, payload: dict):
+    """Deliver a job callback, retrying with exponential backoff."""
+    for attempt in range(WEBHOOK_RETRIES):
+        try:
+            await asyncio.to_thread(_post_json, url, payload)
+            return True
+        except CallbackURLError as e:
+            logging.warning(f"Not delivering webhook to {url}: {e}")
+            return False
+        except Exception as e:
+            logging.warning(f"Webhook to {url} failed (attempt {attempt + 1}): {e}")
+            await asyncio.sleep(0.5 * (2 ** attempt))
+    return False
+
+
+class JobScheduler:
+    """
+    Runs presentation jobs in the background with fair queuing between clients.
+
+    Each client has its own FIFO queue. Free slots are handed out round-robin
+    across clients, and no client may run more than `per_client_limit` jobs
+    at once, so a single tenant submitting hundreds of jobs cannot starve others.
+    """
+
+    def __init__(self, max_concurrency: int = 8, per_client_limit: int = 2,
+                 max_queued_per_client: int = 100, retention: int = 1000):
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_client_limit = max(1, per_client_limit)
+        self.max_queued_per_client = max_queued_per_client
+        self.retention = retention
+        self.jobs = OrderedDict()
+        self._queues = OrderedDict()
+        self._running = {}
+        self._tasks = set()
+        self._closing = False
+
+    @property
+    def running(self) -> int:
+        return sum(self._running.values())
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def submit(self, client_id: str, runner, callback_url: str = None) -> Job:
+        """
+        Queue a job. `runner` is an async callable taking the Job; it may call
+        job.set_status() to report progress and its return value becomes job.result.
+        """
+        queue = self._queues.setdefault(client_id, deque())
+        if len(queue) >= self.max_queued_per_client:
+            raise JobQueueFull(f"Client {client_id} has too many queued jobs")
+
+        job = Job(client_id, runner, callback_url)
+        self.jobs[job.id] = job
+        queue.append(job)
+        self._evict()
+        self._dispatch()
+        return job
+
+    def get(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    def _evict(self):
+        # Drop the oldest finished jobs once we exceed the retention limit
+        if len(self.jobs) <= self.retention:
+            return
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.retention:
+                break
+            if self.jobs[job_id].status in (DONE, FAILED):
+                del self.jobs[job_id]
+
+    def _next_job(self):
+        for client_id in list(self._queues):
+            queue = self._queues[client_id]
+            if not queue:
+                del self._queues[client_id]
+                continue
+            if self._running.get(client_id, 0) >= self.per_client_limit:
+                continue
+            # Rotate this client to the back so others get the next slot
+            self._queues.move_to_end(client_id)
+            return queue.popleft()
+        return None
+
+    def _dispatch(self):
+        if self._closing:
+            return
+        while self.running < self.max_concurrency:
+            job = self._next_job()
+            if job is None:
+                return
+            self._running[job.client_id] = self._running.get(job.client_id, 0) + 1
+            task = asyncio.create_task(self._run(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: Job):
+        try:
+            job.result = await job._runner(job)
+            job.set_status(DONE)
+        except asyncio.CancelledError:
+            job.error = "Server shutting down"
+            job.set_status(FAILED)
+            raise
+        except Exception as e:
+            logging.error(f"Job {job.id} failed: {e}")
+            job.error = str(e)
+            job.set_status(FAILED)
+        finally:
+            self._running[job.client_id] -= 1
+            if not self._running[job.client_id]:
+                del self._running[job.client_id]
+            self._dispatch()
+
+        if job.callback_url:
+            await send_webhook(job.callback_url, job.to_dict())
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "clients": len(self._queues),
+            "tracked_jobs": len(self.jobs),
+        }
+
+    async def shutdown(self):
+        """Stop dispatching, fail the queued jobs and cancel the running ones."""
+        self._closing = True
+        for queue in self._queues.values():
+            for job in queue:
+                job.error = "Server shutting down"
+                job.set_status(FAILED)
+        self._queues.clear()
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+job_scheduler = JobScheduler(
+    JOB_CONCURRENCY, JOB_PER_CLIENT_CONCURRENCY, JOB_MAX_QUEUED_PER_CLIENT, JOB_RETENTION
+)
@@ -0,0 +1,268 @@
+"""
+Resilient client for model calls.
+
+Wraps a single shared model instance (and so the underlying connection pool)
+with per-request deadlines, per-attempt timeouts, retries with jittered
+exponential backoff, request hedging and a circuit breaker:
+
+  hedging   when an attempt has not answered by the recent p90 latency, a
+            second identical call is started and the first success wins;
+            the loser is cancelled
+  breaker   after LLM_BREAKER_THRESHOLD consecutive failed attempts, calls
+            fail fast with UpstreamUnavailable for LLM_BREAKER_COOLDOWN
+            seconds; then one trial call decides whether it closes again
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+
+from app.utils.metrics import counter
+
+# LLM client settings (override via environment)
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "120"))  # seconds per request, retries included
+LLM_ATTEMPT_TIMEOUT = float(os.getenv("LLM_ATTEMPT_TIMEOUT", "60"))  # seconds per attempt
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "true").lower() not in ("0", "false", "no")
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.9"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+llm_attempts = counter(
+    "pptgen_llm_attempts_total", "Individual model calls by outcome, hedges and retries included.", ["outcome"]
+)
+llm_retries = counter("pptgen_llm_retries_total", "Model requests retried after a failed attempt.")
+llm_hedges = counter("pptgen_llm_hedges_total", "Hedged model calls by which call answered first.", ["winner"])
+llm_rejected = counter("pptgen_llm_circuit_rejections_total", "Model requests failed fast by the open circuit.")
+
+# Breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class UpstreamUnavailable(Exception):
+    """Raised without calling the model while the circuit breaker is open."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"The model is unavailable, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's deadline passes before the model answers."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Timeouts, connection problems and the upstream's 429/5xx are worth another attempt."""
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    # Only look the SDK's error types up once the SDK is loaded; importing it here would be slow
+    api_exceptions = sys.modules.get("google.api_core.exceptions")
+    if api_exceptions is not None and isinstance(exc, (
+        api_exceptions.TooManyRequests, api_exceptions.InternalServerError,
+        api_exceptions.ServiceUnavailable, api_exceptions.GatewayTimeout,
+        api_exceptions.DeadlineExceeded,
+    )):
+        return True
+    # The fake backend's injected failures, and errors that only carry a status in the message
+    message = str(exc)
+    return message.startswith(("429", "500", "502", "503", "504"))
+
+
+class LatencyWindow:
+    """Recent successful call latencies, for picking the hedge delay."""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def quantile(self, q: float) -> float:
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open trial call."""
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+
+    def retry_after(self) -> int:
+        return max(1, int(self._opened_at + self.cooldown - time.monotonic() + 0.999))
+
+    def before_call(self) -> bool:
+        """
+        Raise UpstreamUnavailable unless a call may go to the model now. Returns
+        True when the caller makes the half-open trial call.
+        """
+        if self.threshold <= 0 or self.state == CLOSED:
+            return False
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self._trial_running:
+            self._trial_running = True
+            return True
+        llm_rejected.inc()
+        raise UpstreamUnavailable(self.retry_after())
+
+    def record_success(self):
+        if self.state != CLOSED:
+            logging.info("Model circuit breaker closed")
+        self.state = CLOSED
+        self.failures = 0
+        self._trial_running = False
+
+    def release(self):
+        """Forget a trial call that ended without an outcome, e.g. because it was cancelled."""
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_running = False
+        if self.state == HALF_OPEN or (self.threshold > 0 and self.failures >= self.threshold):
+            if self.state != OPEN:
+                logging.warning(f"Model circuit breaker opened after {self.failures} failed calls")
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+
+
+class LLMClient:
+    """Shared, deadline-aware access to the model (content_generator.llm_client)."""
+
+    def __init__(self, model_factory, limiter=None):
+        self._model_factory = model_factory
+        self._model = None
+        self._limiter = limiter
+        self.latencies = LatencyWindow()
+        self.breaker = CircuitBreaker(LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN)
+
+    @property
+    def model(self):
+        """The model instance, created once and reused by every request."""
+        if self._model is None:
+            self._model = self._model_factory()
+        return self._model
+
+    def hedge_delay(self):
+        """Seconds to wait before hedging, or None while hedging is off or unwarmed."""
+        if not LLM_HEDGE or len(self.latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return self.latencies.quantile(LLM_HEDGE_QUANTILE)
+
+    async def _call(self, prompt: str, generation_config=None):
+        if self._limiter is not None:
+            await self._limiter.acquire()
+        kwargs = {"generation_config": generation_config} if generation_config else {}
+        start = time.perf_counter()
+        try:
+            response = await self.model.generate_content_async(prompt, **kwargs)
+        except asyncio.CancelledError:
+            # A hedged-out call was at least this slow; keep the tail in the window
+            self.latencies.add(time.perf_counter() - start)
+            raise
+        self.latencies.add(time.perf_counter() - start)
+        return response
+
+    async def _attempt(self, prompt: str, timeout: float, generation_config=None):
+        """One attempt, hedged when the first call is slower than usual."""
+        loop = asyncio.get_running_loop()
+        ends_at = loop.time() + timeout
+        calls = [asyncio.ensure_future(self._call(prompt, generation_config))]
+        try:
+            hedge_delay = self.hedge_delay()
+            if hedge_delay is not None and hedge_delay < timeout:
+                done, _ = await asyncio.wait(calls, timeout=hedge_delay)
+                if not done:
+                    calls.append(asyncio.ensure_future(self._call(prompt, generation_config)))
+
+            error = None
+            pending = set(calls)
+            while pending:
+                remaining = ends_at - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for call in done:
+                    if call.exception() is None:
+                        if len(calls) > 1:
+                            llm_hedges.inc(winner="hedge" if call is calls[1] else "first")
+                        llm_attempts.inc(outcome="ok")
+                        return call.result()
+                    error = call.exception()
+                    llm_attempts.inc(outcome="error")
+            if error is not None and not pending:
+                raise error
+            llm_attempts.inc(outcome="timeout")
+            raise asyncio.TimeoutError(f"No model response within {timeout:.1f}s")
+        finally:
+            for call in calls:
+                if not call.done():
+                    call.cancel()
+                elif not call.cancelled():
+                    call.exception()  # a losing call's error is not worth a warning
+
+    async def generate(self, prompt: str, deadline: float = None, generation_config=None):
+        """
+        Return the model response for prompt, retrying retryable failures with
+        jittered backoff until `deadline` (a time.monotonic() value, default
+        LLM_DEADLINE seconds from now). `generation_config` is passed through
+        to the model, e.g. to constrain the output to a JSON schema.
+
+        Raises:
+            UpstreamUnavailable: The circuit breaker is open.
+            DeadlineExceeded: The deadline passed without a response.
+        """
+        if deadline is None:
+            deadline = time.monotonic() + LLM_DEADLINE
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded("Deadline exceeded before the model answered")
+            trial = self.breaker.before_call()
+            timeout = min(LLM_ATTEMPT_TIMEOUT, remaining)
+            try:
+                response = await self._attempt(prompt, timeout, generation_config)
+            except asyncio.CancelledError:
+                if trial:
+                    self.breaker.release()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    # The upstream answered, it just refused this request
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if isinstance(e, asyncio.TimeoutError) and timeout == remaining:
+                    raise DeadlineExceeded("Deadline exceeded before the model answered") from e
+                if attempt >= LLM_RETRIES:
+                    raise
+                # Full jitter keeps retries from many requests from synchronizing
+                backoff = random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * 2 ** attempt))
+                if time.monotonic() + backoff >= deadline:
+                    raise
+                attempt += 1
+                llm_retries.inc()
+                logging.warning(f"Model call failed ({e}), retry {attempt} of {LLM_RETRIES} in {backoff:.2f}s")
+                await asyncio.sleep(backoff)
+                continue
+            self.breaker.record_success()
+            return response
+
@@ -0,0 +1,486 @@
+"""
+Direct-to-OOXML render engine.
+
+Produces the same slides as slide_generator.generate_slides, but instead of
+driving python-pptx proxy objects for every run it concatenates precompiled
+XML string fragments and writes the .pptx zip package itself. The fragments
+are captured once per process from the python-pptx engine, so both engines
+emit identical slide markup. Slides the fast path cannot express (multi-line
+or empty titles, string content, non-string bullets) are rendered through
+python-pptx and serialized.
+
+Slide images are scaled through the image cache and each distinct one is
+written once per package as a media part under ppt/media/, streamed from the
+cached file; every slide showing it links that same part.
+
+write_package is also the package writer of the python-pptx engine: it takes
+slides one at a time, writes each slide part into the zip as soon as it is
+built and drops it, and writes the package-level parts (presentation.xml, its
+rels and the content types) last, so memory does not grow with the deck.
+"""
+import io
+import os
+import re
+import json
+import time
+import shutil
+import zipfile
+import logging
+import threading
+
+from app.services.slide_generator import (
+    COLOR_PALETTES, create_presentation_object, add_slide,
+    is_single_line_title, _add_chrome_slide, _get_text_templates,
+    slide_render_latency, save_latency, fit_slide, layout_slide,
+    has_image, slide_pictures, picture_target, picture_element,
+    TITLE_FONT_SIZE, BULLET_FONT_SIZE, BULLET_SYMBOL_SCALE
+)
+from app.services.image_cache import image_cache, MEDIA_CONTENT_TYPES
+from app.utils.storage import presentation_file_path, temp_file_path
+from app.utils.markdown import tokenize_markdown
+
+SLIDE_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.slide+xml"
+SLIDE_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide"
+LAYOUT_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideLayout"
+IMAGE_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+XML_HEADER = "<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n"
+# Every zip entry gets this timestamp, so the same slides always give the same bytes (and ETag)
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+_NSDECL_RE = re.compile(r' xmlns:\w+="[^"]*"')
+_CTRL_CHARS_RE = re.compile(r"[\x00-\x08\x0B-\x1F]")
+_NOT_XML_RE = re.compile(r"[\ud800-\udfff\ufffe\uffff]")
+_OVERRIDE_RE = re.compile(r'<Override PartName="([^"]+)" ContentType="([^"]+)"/>')
+_DEFAULT_RE = re.compile(r'<Default Extension="([^"]+)"')
+_REL_ID_RE = re.compile(r'Id="rId(\d+)"')
+
+_templates = None
+_templates_lock = threading.Lock()
+
+
+def _escape_text(text):
+    """Escape run text exactly as python-pptx plus lxml would serialize it."""
+    text = _CTRL_CHARS_RE.sub(lambda match: "_x%04X_" % ord(match.group()), text)
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _fragment(element):
+    """Serialize an element as it appears inside a slide (namespaces declared on the root)."""
+    from lxml import etree
+
+    return _NSDECL_RE.sub("", etree.tostring(element, encoding="unicode"))
+
+
+def _split_run(element, placeholder):
+    markup = _fragment(element)
+    prefix, _, suffix = markup.partition(f"<a:t>{placeholder}</a:t>")
+    return prefix, suffix
+
+
+class _Templates:
+    """Per-process precompiled fragments for slides and package-level parts."""
+
+    def __init__(self):
+        from pptx.opc.oxml import serialize_part_xml
+
+        prs = create_presentation_object()
+
+        # Package parts of the empty base presentation
+        with zipfile.ZipFile(_base_package_stream(prs)) as base:
+            self.part_names = base.namelist()
+            self.parts = {name: base.read(name) for name in self.part_names}
+
+        layout_name = os.path.basename(prs.slide_layouts[6].part.partname)
+        self.slide_rels = (
+            XML_HEADER
+            + '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + f'<Relationship Id="rId1" Type="{LAYOUT_REL_TYPE}" Target="../slideLayouts/{layout_name}"/>'
+            + "</Relationships>"
+        ).encode("utf-8")
+
+        # Slide chrome per palette, split around the empty title and content paragraphs,
+        # with the full-width content box and with the one narrowed for a slide image
+        self.chrome = []
+        self.narrow_chrome = []
+        for palette_index in range(len(COLOR_PALETTES)):
+            for narrow, chrome in ((False, self.chrome), (True, self.narrow_chrome)):
+                slide = _add_chrome_slide(prs, palette_index, narrow)
+                markup = serialize_part_xml(slide._element).decode("utf-8")
+                pieces = markup.split("<a:p/>")
+                if len(pieces) != 3 or "</p:spTree>" not in pieces[2]:
+                    raise RuntimeError("Unexpected slide skeleton markup")
+                chrome.append(pieces)
+        self.first_picture_id = slide.shapes._next_shape_id
+
+        text = _get_text_templates()
+        self.title_prefix, self.title_suffix = _split_run(text["title_p"], "title")
+        bullet = _fragment(text["bullet_p"])
+        self.bullet_prefix = bullet[:-len("</a:p>")]
+        self.runs = {key: _split_run(run, "text") for key, run in text["runs"].items()}
+        self._sized = {}
+
+    def sized(self, title_size, content_size):
+        """Title and bullet fragments with the font sizes chosen by text fitting."""
+        key = (title_size, content_size)
+        fragments = self._sized.get(key)
+        if fragments is None:
+            title_sz = f' sz="{title_size * 100}"'
+            bullet_sz = f' sz="{round(content_size * BULLET_SYMBOL_SCALE) * 100}"'
+            run_sz = f' sz="{content_size * 100}"'
+            fragments = (
+                self.title_prefix.replace(f' sz="{TITLE_FONT_SIZE * 100}"', title_sz, 1),
+                self.bullet_prefix.replace(f' sz="{round(BULLET_FONT_SIZE * BULLET_SYMBOL_SCALE) * 100}"', bullet_sz, 1),
+                {
+                    style: (prefix.replace(f' sz="{BULLET_FONT_SIZE * 100}"', run_sz, 1), suffix)
+                    for style, (prefix, suffix) in self.runs.items()
+                },
+            )
+            self._sized[key] = fragments
+        return fragments
+
+
+def _base_package_stream(prs):
+    stream = io.BytesIO()
+    prs.save(stream)
+    stream.seek(0)
+    return stream
+
+
+def _get_templates():
+    global _templates
+    if _templates is None:
+        with _templates_lock:
+            if _templates is None:
+                _templates = _Templates()
+    return _templates
+
+
+def _run_markup(prefix, suffix, text):
+    return f"{prefix}<a:t>{_escape_text(text)}</a:t>{suffix}"
+
+
+def _can_use_fast_path(title_text, content_text):
+    if not is_single_line_title(title_text) or _NOT_XML_RE.search(title_text):
+        return False
+    if not isinstance(content_text, list):
+        return False
+    return all(isinstance(point, str) and not _NOT_XML_RE.search(point) for point in content_text)
+
+
+def render_slide_xml(slide_content, i, pictures=()):
+    """
+    Return the slide part XML (bytes) for slide index i. `pictures` lists
+    (kind, rId, PreparedImage) for the images the slide's rels link.
+    """
+    start = time.perf_counter()
+    t = _get_templates()
+    title_text = slide_content.get("title", f"Slide {i+1}")
+    content_text = slide_content.get("content", [])
+
+    if not _can_use_fast_path(title_text, content_text):
+        # Rare shapes of content: let python-pptx build this one slide
+        from pptx.opc.oxml import serialize_part_xml
+
+        prs = create_presentation_object()
+        slide = add_slide(prs, slide_content, i, pictures)
+        return serialize_part_xml(slide._element)
+
+    title_prefix, bullet_prefix, runs = t.sized(*fit_slide(slide_content, i))
+    chrome = t.narrow_chrome if has_image(slide_content) else t.chrome
+    head, middle, tail = chrome[i % len(chrome)]
+    parts = [head, _run_markup(title_prefix, t.title_suffix, title_text), middle]
+
+    if content_text:
+        for point in content_text:
+            parts.append(bullet_prefix)
+            for segment in tokenize_markdown(point):
+                prefix, suffix = runs[segment.style]
+                parts.append(_run_markup(prefix, suffix, segment.text))
+            parts.append("</a:p>")
+    else:
+        parts.append("<a:p/>")
+
+    if pictures:
+        pics = "".join(
+            _fragment(picture_element(shape_id, kind, r_id, prepared))
+            for shape_id, (kind, r_id, prepared) in enumerate(pictures, start=t.first_picture_id)
+        )
+        tail = tail.replace("</p:spTree>", pics + "</p:spTree>", 1)
+    parts.append(tail)
+    markup = "".join(parts).encode("utf-8")
+    slide_render_latency.observe(time.perf_counter() - start, engine="ooxml")
+    return markup
+
+
+def _content_types(base: bytes, num_slides: int, media_extensions=()) -> bytes:
+    markup = base.decode("utf-8")
+    overrides = _OVERRIDE_RE.findall(markup)
+    overrides += [
+        (f"/ppt/slides/slide{n}.xml", SLIDE_CONTENT_TYPE) for n in range(1, num_slides + 1)
+    ]
+    head = markup[:markup.index("<Override ")]
+    defaults = set(_DEFAULT_RE.findall(head))
+    head += "".join(
+        f'<Default Extension="{ext}" ContentType="{MEDIA_CONTENT_TYPES[ext]}"/>'
+        for ext in sorted(media_extensions) if ext not in defaults
+    )
+    body = "".join(
+        f'<Override PartName="{name}" ContentType="{content_type}"/>'
+        for name, content_type in sorted(overrides)
+    )
+    return (head + body + "</Types>").encode("utf-8")
+
+
+def _slide_rel_ids(base_rels: bytes, num_slides: int) -> list:
+    used = set(int(n) for n in _REL_ID_RE.findall(base_rels.decode("utf-8")))
+    rel_ids = []
+    candidate = 1
+    while len(rel_ids) < num_slides:
+        if candidate not in used:
+            rel_ids.append(f"rId{candidate}")
+        candidate += 1
+    return rel_ids
+
+
+def _presentation_rels(base: bytes, rel_ids: list) -> bytes:
+    markup = base.decode("utf-8")
+    rels = "".join(
+        f'<Relationship Id="{rel_id}" Type="{SLIDE_REL_TYPE}" Target="slides/slide{n}.xml"/>'
+        for n, rel_id in enumerate(rel_ids, start=1)
+    )
+    return markup.replace("</Relationships>", rels + "</Relationships>").encode("utf-8")
+
+
+def _presentation_xml(base: bytes, rel_ids: list) -> bytes:
+    markup = base.decode("utf-8")
+    if not rel_ids:
+        return base
+    sld_id_lst = "<p:sldIdLst>" + "".join(
+        f'<p:sldId id="{256 + n}" r:id="{rel_id}"/>' for n, rel_id in enumerate(rel_ids)
+    ) + "</p:sldIdLst>"
+    # sldIdLst follows the master, notes-master and handout-master lists
+    insert_at = 0
+    for closing in ("</p:sldMasterIdLst>", "</p:notesMasterIdLst>", "</p:handoutMasterIdLst>"):
+        position = markup.find(closing)
+        if position != -1:
+            insert_at = max(insert_at, position + len(closing))
+    return (markup[:insert_at] + sld_id_lst + markup[insert_at:]).encode("utf-8")
+
+
+def _zip_info(name, compress_type=zipfile.ZIP_DEFLATED):
+    info = zipfile.ZipInfo(name, ZIP_DATE_TIME)
+    info.compress_type = compress_type
+    info.external_attr = 0o600 << 16
+    return info
+
+
+class _PptxSlideBuilder:
+    """
+    Slide XML built by the python-pptx engine on one scratch presentation. Each
+    slide is removed again once serialized, so the object graph holds one slide.
+    """
+
+    def __init__(self):
+        self._prs = create_presentation_object()
+
+    def __call__(self, slide_content, i, pictures=()):
+        from pptx.opc.oxml import serialize_part_xml
+
+        slide = add_slide(self._prs, slide_content, i, pictures)
+        markup = serialize_part_xml(slide._element)
+        sld_id_lst = self._prs.slides._sldIdLst
+        sld_id = sld_id_lst[-1]
+        sld_id_lst.remove(sld_id)
+        self._prs.part.drop_rel(sld_id.rId)
+        return markup
+
+
+_builders = threading.local()
+
+
+def _slide_builder(engine):
+    """The slide XML builder for an engine; python-pptx ones are kept per thread."""
+    if engine == "ooxml":
+        return render_slide_xml
+    builder = getattr(_builders, "pptx", None)
+    if builder is None:
+        builder = _builders.pptx = _PptxSlideBuilder()
+    return builder
+
+
+def render_page(page, i, engine="ooxml"):
+    """
+    Build one laid-out slide: its XML and the (rId, PreparedImage) list of the
+    images it links. Images are scaled through the image cache; an image that
+    cannot be used is logged and left out.
+    """
+    pictures = []
+    links = {}
+    for kind, ref in slide_pictures(page):
+        try:
+            prepared = image_cache.prepare(ref, *picture_target(kind))
+        except Exception as e:
+            logging.warning(f"Error adding {kind} to slide {i + 1}: {e}")
+            continue
+        r_id = links.setdefault(prepared.key, (f"rId{len(links) + 2}", prepared))[0]
+        pictures.append((kind, r_id, prepared))
+    return _slide_builder(engine)(page, i, pictures), list(links.values())
+
+
+def render_pages(slide_content, first_index, engine="ooxml"):
+    """
+    Lay out one slide and build every resulting page (continuation slides
+    included) with render_page, numbering them from first_index. Needs no
+    package, so it can run on a render pool worker; PackageWriter.write_pages
+    writes the result.
+    """
+    return [render_page(page, first_index + n, engine) for n, page in enumerate(layout_slide(slide_content))]
+
+
+class PackageWriter:
+    """
+    Incremental .pptx writer. add() lays out a slide and writes its parts into
+    the zip straight away; close() writes the package-level parts, which list
+    every slide and so go last. Memory holds one slide at a time however long
+    the deck is. The engine ("ooxml" or "pptx") picks how slide XML is built;
+    both produce the same parts. An optional CancelToken is checked before
+    each slide, so a cancelled or expired request stops mid-deck.
+
+    Slides can also be built elsewhere with render_pages and handed to
+    write_pages, which is how the streaming endpoint renders on the pool.
+
+    Each distinct scaled image is written once, as soon as a slide first shows
+    it, copied from the image cache file in chunks; later slides link the same
+    media part.
+    """
+
+    def __init__(self, fp, engine="ooxml", cancel=None):
+        self.engine = engine
+        self._cancel = cancel
+        self.num_slides = 0
+        self._templates = _get_templates()
+        self._package = zipfile.ZipFile(fp, "w", compression=zipfile.ZIP_DEFLATED)
+        self._write_seconds = 0.0
+        self._media = {}  # PreparedImage.key -> media part name
+
+    def _media_part(self, prepared):
+        """The media part holding a prepared image, writing it into the package on first use."""
+        name = self._media.get(prepared.key)
+        if name is None:
+            name = f"ppt/media/image{len(self._media) + 1}.{prepared.ext}"
+            # Already compressed, so stored as is
+            with open(prepared.path, "rb") as source, \
+                    self._package.open(_zip_info(name, zipfile.ZIP_STORED), "w") as target:
+                shutil.copyfileobj(source, target, 1024 * 1024)
+            self._media[prepared.key] = name
+        return name
+
+    def _slide_rels(self, links):
+        """The rels XML of a slide linking these images, writing any new media parts."""
+        if not links:
+            return self._templates.slide_rels
+        rels = "".join(
+            f'<Relationship Id="{r_id}" Type="{IMAGE_REL_TYPE}" '
+            f'Target="../media/{os.path.basename(self._media_part(prepared))}"/>'
+            for r_id, prepared in links
+        )
+        slide_rels = self._templates.slide_rels.decode("utf-8")
+        return slide_rels.replace("</Relationships>", rels + "</Relationships>").encode("utf-8")
+
+    def write_page(self, slide_xml, links):
+        """Write a slide built by render_page as the next slide of the deck."""
+        start = time.perf_counter()
+        slide_rels = self._slide_rels(links)
+        self.num_slides += 1
+        self._package.writestr(_zip_info(f"ppt/slides/slide{self.num_slides}.xml"), slide_xml)
+        self._package.writestr(_zip_info(f"ppt/slides/_rels/slide{self.num_slides}.xml.rels"), slide_rels)
+        self._write_seconds += time.perf_counter() - start
+
+    def write_pages(self, pages):
+        """Write the pages render_pages built for one slide."""
+        for slide_xml, links in pages:
+            self.write_page(slide_xml, links)
+
+    def add(self, slide_content):
+        """Write one slide, plus its continuation slides if the content overflows."""
+        for page in layout_slide(slide_content):
+            if self._cancel is not None:
+                self._cancel.check()
+            self.write_page(*render_page(page, self.num_slides, self.engine))
+
+    def close(self):
+        """Write the package-level parts and finish the zip."""
+        start = time.perf_counter()
+        t = self._templates
+        rel_ids = _slide_rel_ids(t.parts["ppt/_rels/presentation.xml.rels"], self.num_slides)
+        for name in t.part_names:
+            data = t.parts[name]
+            if name == "[Content_Types].xml":
+                media_extensions = set(part.rsplit(".", 1)[1] for part in self._media.values())
+                data = _content_types(data, self.num_slides, media_extensions)
+            elif name == "ppt/presentation.xml":
+                data = _presentation_xml(data, rel_ids)
+            elif name == "ppt/_rels/presentation.xml.rels":
+                data = _presentation_rels(data, rel_ids)
+            self._package.writestr(_zip_info(name), data)
+        self._package.close()
+        save_latency.observe(self._write_seconds + time.perf_counter() - start, engine=self.engine)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # An incomplete package is never used; just release the zip
+            self._package.close()
+
+
+def write_package(content_json, fp, engine="ooxml", cancel=None):
+    """
+    Write a complete .pptx package for the slides to a binary file object.
+    content_json may be any iterable of slides, including a generator.
+    """
+    with PackageWriter(fp, engine, cancel) as writer:
+        for slide_content in content_json:
+            writer.add(slide_content)
+
+
+def save_package(content, presentation_id="presentation", engine="ooxml", cancel=None):
+    """
+    Stream the deck to its file under presentations/ and return the path. The
+    package is written to a temporary file and moved into place when complete,
+    so a failed or cancelled render (RenderCancelled) leaves no file behind.
+    """
+    # Parse content if it is a JSON string
+    if isinstance(content, str):
+        try:
+            content_json = json.loads(content)
+        except json.JSONDecodeError as e:
+            logging.error(f"Invalid JSON format: {e}")
+            return None
+    else:
+        content_json = content
+
+    output_path = presentation_file_path(presentation_id)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    temp_path = temp_file_path(output_path)
+    try:
+        with open(temp_path, "wb") as fp:
+            write_package(content_json, fp, engine, cancel)
+        if cancel is not None:
+            cancel.check()
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    logging.info(f"Presentation saved at '{output_path}'")
+    return output_path
+
+
+def render_ooxml(content, presentation_id="presentation", cancel=None):
+    """
+    Drop-in alternative to generate_slides that writes the package directly.
+    """
+    return save_package(content, presentation_id, engine="ooxml", cancel=cancel)
@@ -0,0 +1,196 @@
+"""
+Content-addressed cache of rendered decks.
+
+A rendered .pptx is stored once under cache/renders/, named by a hash of its
+slides plus the renderer fingerprint (RENDERER_VERSION, engine, text fitting and
+image settings) and the digests of any image files the slides name. A presentation whose slides hash the same gets a hard link to that
+file instead of a new render, so identical decks share one copy on disk.
+
+The file system's link count is the reference count: a blob linked from one or
+more presentations stays put, and once they are all replaced or purged it is
+held by the cache alone. Those unreferenced blobs are evicted least recently
+used first (by ctime, which linking updates) when they total more than
+RENDER_CACHE_MAX_BYTES, so the budget bounds only the disk the cache adds. When
+hard links are not possible (presentations/ on another file system) the cache
+copies instead; that still skips rendering but no longer saves space.
+"""
+import os
+import json
+import time
+import errno
+import shutil
+import hashlib
+import logging
+import threading
+
+from app.services.slide_generator import render_fingerprint, image_fingerprints
+from app.utils.metrics import counter, gauge
+
+# Render cache settings (override via environment)
+RENDER_CACHE = os.getenv("RENDER_CACHE", "true").lower() not in ("0", "false", "no")
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", os.path.join(os.getcwd(), "cache", "renders"))
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+RENDER_CACHE_SCAN_INTERVAL = float(os.getenv("RENDER_CACHE_SCAN_INTERVAL", "60"))  # seconds
+
+render_cache_lookups = counter(
+    "pptgen_render_cache_lookups_total", "Render cache lookups by result (hit or miss).", ["result"]
+)
+render_cache_evictions = counter(
+    "pptgen_render_cache_evictions_total", "Rendered decks evicted from the render cache."
+)
+
+
+class RenderCache:
+    """Rendered decks by content key, hard linked into presentations/."""
+
+    def __init__(self, directory: str, max_bytes: int, enabled: bool = True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hardlinks = True
+        self._lock = threading.Lock()
+        self._last_scan = 0.0
+        self._added_bytes = 0
+        self._stats = {"blobs": 0, "bytes": 0, "unreferenced_bytes": 0}
+
+    def key(self, content, engine=None) -> str:
+        """
+        Canonical hash of the slides and everything else that decides the rendered
+        file. Slide images are hashed from their sources, so call it off the event loop.
+        """
+        key = [render_fingerprint(engine), content]
+        images = image_fingerprints(content)
+        if images:
+            key.append(images)
+        encoded = json.dumps(key, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def blob_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.pptx")
+
+    def _place(self, source: str, target: str):
+        """Hard link source at target, or copy it where linking is not possible."""
+        if self.hardlinks:
+            try:
+                os.link(source, target)
+                return
+            except FileNotFoundError:
+                raise
+            except OSError as e:
+                if e.errno != errno.EMLINK:
+                    logging.warning(f"Render cache cannot hard link ({e}), copying decks instead")
+                    self.hardlinks = False
+        shutil.copyfile(source, target)
+        # Copies do not touch the blob, so mark it as used for LRU
+        os.utime(source)
+
+    def fetch(self, key: str, path: str) -> bool:
+        """Put the cached deck for key at path. Returns False on a miss."""
+        if not self.enabled:
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.link"
+        try:
+            self._place(self.blob_path(key), temp_path)
+            os.replace(temp_path, path)
+        except FileNotFoundError:
+            render_cache_lookups.inc(result="miss")
+            return False
+        finally:
+            # rename() leaves both names when path already links to the same file
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        render_cache_lookups.inc(result="hit")
+        return True
+
+    def store(self, key: str, path: str) -> bool:
+        """
+        Add a freshly rendered deck at path to the cache under key. Returns True
+        when another render of the same slides got there first and path now
+        links to that file instead (so its ETag changed).
+        """
+        if not self.enabled:
+            return False
+        blob = self.blob_path(key)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        temp_path = f"{blob}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if os.path.exists(blob):
+                # Rendered twice at once: point path at the stored copy so only one stays on disk
+                if self.hardlinks and not os.path.samefile(blob, path):
+                    self._place(blob, temp_path)
+                    os.replace(temp_path, path)
+                    return True
+                return False
+            self._place(path, temp_path)
+            os.replace(temp_path, blob)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        if not self.hardlinks:
+            self._added_bytes += os.path.getsize(blob)
+        self.maybe_evict()
+        return False
+
+    def maybe_evict(self):
+        """Evict when a scan is due, or sooner once copies may have outgrown the budget."""
+        if (time.monotonic() - self._last_scan >= RENDER_CACHE_SCAN_INTERVAL
+                or self._stats["unreferenced_bytes"] + self._added_bytes > self.max_bytes):
+            self.evict()
+
+    def evict(self) -> int:
+        """Remove unreferenced blobs, least recently used first, down to max_bytes. Returns how many."""
+        if not self.enabled:
+            return 0
+        with self._lock:
+            blobs = []
+            total = 0
+            count = 0
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if not name.endswith(".pptx"):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    total += stat.st_size
+                    count += 1
+                    # A link count above one means presentations still use the file
+                    if stat.st_nlink == 1:
+                        blobs.append((stat.st_ctime, stat.st_size, path))
+
+            unreferenced = sum(size for _, size, _ in blobs)
+            evicted = 0
+            for _, size, path in sorted(blobs):
+                if unreferenced <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                unreferenced -= size
+                total -= size
+                evicted += 1
+
+            self._stats = {"blobs": count - evicted, "bytes": total, "unreferenced_bytes": unreferenced}
+            self._added_bytes = 0
+            self._last_scan = time.monotonic()
+        if evicted:
+            render_cache_evictions.inc(evicted)
+            logging.info(f"Evicted {evicted} decks from the render cache")
+        return evicted
+
+    def stats(self) -> dict:
+        """Totals from the latest scan, plus the settings."""
+        return {**self._stats, "max_bytes": self.max_bytes, "hardlinks": self.hardlinks}
+
+
+render_cache = RenderCache(RENDER_CACHE_DIR, RENDER_CACHE_MAX_BYTES, RENDER_CACHE)
+
+gauge("pptgen_render_cache_bytes", "Bytes of rendered decks in the render cache at the last scan.",
+      callback=lambda: render_cache.stats()["bytes"])
+gauge("pptgen_render_cache_unreferenced_bytes",
+      "Bytes of cached decks no presentation links to (evictable), at the last scan.",
+      callback=lambda: render_cache.stats()["unreferenced_bytes"])
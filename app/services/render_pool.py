@@ -0,0 +1,171 @@
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from app.utils.metrics import histogram
+
+# Render pool settings (override via environment)
+RENDER_EXECUTOR = os.getenv("RENDER_EXECUTOR", "thread")  # "thread" or "process"
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+RENDER_QUEUE_SIZE = int(os.getenv("RENDER_QUEUE_SIZE", "32"))
+
+render_latency = histogram(
+    "pptgen_render_seconds", "Time a render job spent running on the render pool.", ["job"]
+)
+render_wait = histogram("pptgen_render_wait_seconds", "Time a render job waited for a free worker.")
+
+
+class RenderQueueFull(Exception):
+    """Raised when the render pool cannot accept more work."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Render queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _timed_call(fn, args):
+    """Run fn(*args) in the worker and report how long the call itself took."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class RenderPool:
+    """
+    Runs blocking render work (python-pptx building and saving) off the event loop.
+
+    At most `max_workers` jobs run at once and at most `max_queue` more may wait.
+    Anything beyond that is rejected with RenderQueueFull so callers can shed load.
+    """
+
+    def __init__(self, kind: str = "thread", max_workers: int = 4, max_queue: int = 32):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown render executor: {kind}")
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = None
+
+        # Counters are only touched from the event loop thread
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._render_seconds = 0.0
+        self._wait_seconds = 0.0
+        self._max_render_seconds = 0.0
+
+    def _get_executor(self, initializer=None):
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=initializer)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="render"
+                )
+            logging.info(f"Started {self.kind} render pool with {self.max_workers} workers")
+        return self._executor
+
+    async def start(self, initializer=None):
+        """
+        Create the executor ahead of the first request and run `initializer` so
+        workers do not pay for imports and template building on a user's render.
+        Process workers are spawned now and each runs the initializer once; thread
+        workers share the process, so the initializer runs once for all of them.
+        """
+        loop = asyncio.get_running_loop()
+        if self.kind == "process":
+            executor = self._get_executor(initializer)
+            # ProcessPoolExecutor spawns workers lazily; one trivial job per worker starts them all
+            await asyncio.gather(*(
+                loop.run_in_executor(executor, time.sleep, 0.01) for _ in range(self.max_workers)
+            ))
+        else:
+            executor = self._get_executor()
+            if initializer is not None:
+                await loop.run_in_executor(executor, initializer)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a free worker."""
+        return max(0, self._pending - self.max_workers)
+
+    def full(self) -> bool:
+        """True when submit() would raise RenderQueueFull."""
+        return self._pending >= self.max_workers + self.max_queue
+
+    def retry_after(self) -> int:
+        """Rough number of seconds until a slot frees up."""
+        if self._completed:
+            avg = self._render_seconds / self._completed
+        else:
+            avg = 1.0
+        waves = (self.queue_depth // self.max_workers) + 1
+        return max(1, int(avg * waves + 0.999))
+
+    async def submit(self, fn, *args):
+        """Run fn(*args) on the pool and return its result."""
+        if self.full():
+            self._rejected += 1
+            raise RenderQueueFull(self.retry_after())
+
+        self._pending += 1
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            result, elapsed = await loop.run_in_executor(
+                self._get_executor(), _timed_call, fn, args
+            )
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._pending -= 1
+
+        waited = max(0.0, time.perf_counter() - start - elapsed)
+        self._completed += 1
+        self._render_seconds += elapsed
+        self._wait_seconds += waited
+        render_latency.observe(elapsed, job=getattr(fn, "__name__", "render"))
+        render_wait.observe(waited)
+        self._max_render_seconds = max(self._max_render_seconds, elapsed)
+        return result
+
+    async def submit_waiting(self, fn, *args, max_attempts: int = 10):
+        """
+        Like submit(), but when the queue is full wait for the suggested
+        Retry-After and try again instead of failing straight away.
+        """
+        for attempt in range(max_attempts):
+            try:
+                return await self.submit(fn, *args)
+            except RenderQueueFull as e:
+                if attempt == max_attempts - 1:
+                    raise
+                await asyncio.sleep(e.retry_after)
+
+    def stats(self) -> dict:
+        """Snapshot of pool metrics."""
+        completed = self._completed or 1
+        return {
+            "executor": self.kind,
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": min(self._pending, self.max_workers),
+            "queue_depth": self.queue_depth,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "avg_render_seconds": round(self._render_seconds / completed, 4),
+            "max_render_seconds": round(self._max_render_seconds, 4),
+            "avg_wait_seconds": round(self._wait_seconds / completed, 4),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+render_pool = RenderPool(RENDER_EXECUTOR, RENDER_WORKERS, RENDER_QUEUE_SIZE)
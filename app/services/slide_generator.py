@@ -1,12 +1,45 @@
-from pptx import Presentation
-from pptx.util import Pt, Inches
-from pptx.dml.color import RGBColor
-from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
-from pptx.enum.shapes import MSO_SHAPE
 import json
 import os
 import logging
 import re
+import io
+import copy
+import time
+import itertools
+import hashlib
+import threading
+from functools import lru_cache
+from app.utils.storage import presentation_file_path, temp_file_path
+from app.utils.markdown import Segment, tokenize_markdown
+from app.utils.metrics import histogram, FAST_BUCKETS
+from app.utils.text_layout import (
+    ParagraphStyle, text_width, fits, paragraph_heights, largest_fitting_size, split_text
+)
+from app.services.image_cache import (
+    image_cache, source_digest, is_data_uri, ImageError, IMAGE_DPI, IMAGE_JPEG_QUALITY
+)
+
+# Render engine used when a request does not pick one: "pptx" (python-pptx) or "ooxml" (direct XML)
+RENDER_ENGINE = os.getenv("RENDER_ENGINE", "pptx")
+RENDER_ENGINES = ("pptx", "ooxml")
+# Bump whenever a change alters the file rendered from the same slides (it keys the render cache)
+RENDERER_VERSION = "1"
+
+# Text fitting settings (override via environment)
+TEXT_FIT = os.getenv("TEXT_FIT", "true").lower() not in ("0", "false", "no")
+TITLE_FONT_MAX = int(os.getenv("TITLE_FONT_MAX", "38"))
+TITLE_FONT_MIN = int(os.getenv("TITLE_FONT_MIN", "24"))
+CONTENT_FONT_MAX = int(os.getenv("CONTENT_FONT_MAX", "24"))
+CONTENT_FONT_MIN = int(os.getenv("CONTENT_FONT_MIN", "14"))
+CONTINUATION_SUFFIX = " (cont.)"
+
+# Recorded in the process doing the render, so not collected with RENDER_EXECUTOR=process
+slide_render_latency = histogram(
+    "pptgen_slide_render_seconds", "Time to build one slide.", ["engine"], buckets=FAST_BUCKETS
+)
+save_latency = histogram(
+    "pptgen_save_seconds", "Time to write a deck's .pptx package, excluding slide building.", ["engine"]
+)
 
 # Beautiful color palettes for slides
 COLOR_PALETTES = [
@@ -28,91 +61,61 @@ COLOR_PALETTES = [
     [(6, 182, 212), (59, 130, 246)],
 ]
 
+CODE_FONT_NAME = "Consolas"
+
+# Font sizes (pt) of the slide design, used as-is when TEXT_FIT is off
+TITLE_FONT_SIZE = 38
+BULLET_FONT_SIZE = 20
+PARAGRAPH_FONT_SIZE = 22
+BULLET_SYMBOL_SCALE = 1.2  # the bullet symbol run is 24pt next to 20pt text
+
 def parse_markdown_text(text):
     """
     Parse markdown-style formatting (**bold**, *italic*) and return segments with formatting info.
     Returns a list of tuples: (text, is_bold, is_italic)
     Handles cases like: "**Django:** A framework" or "text **bold** more text"
+    Renderers use tokenize_markdown directly, which also reports code and strike.
     """
-    if not text:
-        return [("", False, False)]
-    
-    segments = []
-    i = 0
-    
-    while i < len(text):
-        # Check for bold **text**
-        if i < len(text) - 3 and text[i:i+2] == '**':
-            # Find closing **
-            end = text.find('**', i + 2)
-            if end != -1:
-                # Extract bold text
-                bold_text = text[i+2:end]
-                if bold_text:  # Only add if not empty
-                    segments.append((bold_text, True, False))
-                i = end + 2
-                continue
-        
-        # Check for italic *text* (but not **)
-        if i < len(text) - 1 and text[i] == '*' and (i == 0 or text[i-1] != '*') and (i == len(text) - 1 or text[i+1] != '*'):
-            # Find closing *
-            end = text.find('*', i + 1)
-            if end != -1 and (end == len(text) - 1 or text[end+1] != '*'):  # Not part of **
-                # Extract italic text
-                italic_text = text[i+1:end]
-                if italic_text:  # Only add if not empty
-                    segments.append((italic_text, False, True))
-                i = end + 1
-                continue
-        
-        # Regular text - collect until we hit a formatting marker
-        start = i
-        while i < len(text):
-            if text[i] == '*':
-                # Check if it's start of ** or *
-                if i < len(text) - 1 and text[i+1] == '*':
-                    break  # Start of bold
-                elif (i == 0 or text[i-1] != '*') and (i == len(text) - 1 or text[i+1] != '*'):
-                    break  # Start of italic
-            i += 1
-        
-        # Add regular text segment
-        regular_text = text[start:i]
-        if regular_text:
-            segments.append((regular_text, False, False))
-    
-    return segments if segments else [(text, False, False)]
+    return [(segment.text, segment.bold, segment.italic) for segment in tokenize_markdown(text)]
+
+def style_run(run, segment, font_size, font_color, font_name="Arial"):
+    """Apply size, color and the segment's markdown formatting to a run."""
+    run.font.size = font_size
+    run.font.color.rgb = font_color
+    run.font.name = CODE_FONT_NAME if segment.code else font_name
+    run.font.bold = segment.bold
+    run.font.italic = segment.italic
+    if segment.strike:
+        run.font._rPr.set("strike", "sngStrike")
 
 def add_formatted_text_to_paragraph(paragraph, text, font_size, font_color, font_name="Arial"):
     """
     Add text to a paragraph with markdown formatting support.
-    Handles **bold** and *italic* formatting.
+    Handles **bold**, *italic*, ~~strike~~ and `code` formatting.
     """
-    segments = parse_markdown_text(text)
+    segments = tokenize_markdown(text)
     
-    for idx, (segment_text, is_bold, is_italic) in enumerate(segments):
+    for idx, segment in enumerate(segments):
         if idx == 0:
             # Use the first run if paragraph already has text
             if paragraph.runs:
                 run = paragraph.runs[0]
-                run.text = segment_text
+                run.text = segment.text
             else:
                 run = paragraph.add_run()
-                run.text = segment_text
+                run.text = segment.text
         else:
             run = paragraph.add_run()
-            run.text = segment_text
+            run.text = segment.text
         
-        run.font.size = font_size
-        run.font.color.rgb = font_color
-        run.font.name = font_name
-        run.font.bold = is_bold
-        run.font.italic = is_italic
+        style_run(run, segment, font_size, font_color, font_name)
 
 def set_gradient_background(slide, color1, color2):
     """
     Apply a beautiful gradient background to a slide with two colors.
     """
+    from pptx.dml.color import RGBColor
+
     background = slide.background
     fill = background.fill
     fill.gradient()
@@ -137,182 +140,664 @@ def set_gradient_background(slide, color1, color2):
         fill.solid()
         fill.fore_color.rgb = RGBColor(*color1)
 
-def generate_slides(content, presentation_id="presentation"):
-    prs = Presentation()
+# python-pptx is imported where it is used, so importing this module (and the
+# app) stays fast; geometry is plain EMU integers, exactly what Inches() returns
+EMU_PER_INCH = 914400
+
+def Inches(inches):
+    return int(inches * EMU_PER_INCH)
+
+# Slide geometry (16:9); identical for every slide, so computed once
+SLIDE_WIDTH = Inches(10)
+SLIDE_HEIGHT = Inches(7.5)
+
+# Define safe margins to keep everything inside
+MARGIN_LEFT = Inches(0.75)
+MARGIN_RIGHT = Inches(0.75)
+MARGIN_TOP = Inches(0.75)
+MARGIN_BOTTOM = Inches(0.75)
+
+# Calculate available width and height
+AVAILABLE_WIDTH = SLIDE_WIDTH - MARGIN_LEFT - MARGIN_RIGHT
+AVAILABLE_HEIGHT = SLIDE_HEIGHT - MARGIN_TOP - MARGIN_BOTTOM
+
+# Title section - fixed height
+TITLE_HEIGHT = Inches(1.2)
+TITLE_TOP = MARGIN_TOP + Inches(0.2)
+
+# Content section - remaining space
+CONTENT_TOP = TITLE_TOP + TITLE_HEIGHT + Inches(0.3)
+CONTENT_HEIGHT = AVAILABLE_HEIGHT - TITLE_HEIGHT - Inches(0.5)
+
+# Title text box with proper padding inside the title background
+TITLE_PADDING = Inches(0.3)
+TITLE_BOX = (
+    MARGIN_LEFT + TITLE_PADDING,
+    TITLE_TOP + Inches(0.1),
+    AVAILABLE_WIDTH - (TITLE_PADDING * 2),
+    TITLE_HEIGHT - Inches(0.2),
+)
+
+# Content text box, leaving some bottom margin
+CONTENT_PADDING = Inches(0.3)
+CONTENT_BOX = (
+    MARGIN_LEFT + CONTENT_PADDING,
+    CONTENT_TOP,
+    AVAILABLE_WIDTH - (CONTENT_PADDING * 2),
+    CONTENT_HEIGHT - Inches(0.2),
+)
+
+# Decorative accent bar within margins
+ACCENT_BOX = (
+    MARGIN_LEFT + Inches(0.1),
+    CONTENT_TOP,
+    Inches(0.12),
+    min(CONTENT_BOX[3], SLIDE_HEIGHT - CONTENT_TOP - MARGIN_BOTTOM),
+)
+
+# Slide image to the right of the content, which narrows to make room for it
+IMAGE_WIDTH = Inches(3.4)
+IMAGE_GAP = Inches(0.2)
+NARROW_CONTENT_WIDTH = CONTENT_BOX[2] - IMAGE_WIDTH - IMAGE_GAP
+IMAGE_BOX = (
+    CONTENT_BOX[0] + CONTENT_BOX[2] - IMAGE_WIDTH,
+    CONTENT_TOP + Inches(0.1),
+    IMAGE_WIDTH,
+    CONTENT_BOX[3] - Inches(0.2),
+)
+
+# Logo in the bottom right corner, below the content
+LOGO_BOX = (
+    SLIDE_WIDTH - MARGIN_RIGHT - Inches(1.5),
+    SLIDE_HEIGHT - MARGIN_BOTTOM + Inches(0.1),
+    Inches(1.5),
+    Inches(0.55),
+)
+
+# Pictures a slide may have, in drawing order, and the boxes they are fitted into
+PICTURE_BOXES = {"image": IMAGE_BOX, "logo": LOGO_BOX}
+
+# Text areas inside the boxes (default 0.1" x 0.05" insets for the title, custom for content), in points
+TITLE_AREA = ((TITLE_BOX[2] - Inches(0.2)) / 12700, (TITLE_BOX[3] - Inches(0.1)) / 12700)
+CONTENT_AREA = ((CONTENT_BOX[2] - Inches(0.4)) / 12700, (CONTENT_BOX[3] - Inches(0.2)) / 12700)
+NARROW_CONTENT_AREA = ((NARROW_CONTENT_WIDTH - Inches(0.4)) / 12700, CONTENT_AREA[1])
+
+TITLE_STYLE = ParagraphStyle(markdown=False, bold=True)
+BULLET_STYLE = ParagraphStyle(
+    space_before=4, space_after=14,
+    indent=text_width("•  ", bold=True) * BULLET_SYMBOL_SCALE, first_line=BULLET_SYMBOL_SCALE
+)
+PARAGRAPH_STYLE = ParagraphStyle(space_after=12)
+
+# Per-process caches: the empty base package and the per-palette slide chrome
+_template_bytes = None
+_skeletons = {}
+_cache_lock = threading.Lock()
+
+def create_presentation_object():
+    """
+    Create an empty 16:9 presentation ready for slides.
+    The default template is loaded once per process and reused from memory.
+    """
+    from pptx import Presentation
+
+    global _template_bytes
+    if _template_bytes is None:
+        with _cache_lock:
+            if _template_bytes is None:
+                prs = Presentation()
+                prs.slide_width = SLIDE_WIDTH
+                prs.slide_height = SLIDE_HEIGHT
+                buffer = io.BytesIO()
+                prs.save(buffer)
+                _template_bytes = buffer.getvalue()
+    return Presentation(io.BytesIO(_template_bytes))
+
+def _build_chrome(slide, palette_index):
+    """
+    Add the text-independent parts of a slide: gradient background, title
+    backdrop, the (empty) title and content text boxes, and the accent bar.
+    """
+    from pptx.dml.color import RGBColor
+    from pptx.enum.text import MSO_ANCHOR
+    from pptx.enum.shapes import MSO_SHAPE
+
+    # Apply beautiful gradient background
+    bg_color1, bg_color2 = COLOR_PALETTES[palette_index]
+    set_gradient_background(slide, bg_color1, bg_color2)
+
+    # Add a semi-transparent rectangle for title background with proper margins
+    title_bg = slide.shapes.add_shape(
+        MSO_SHAPE.ROUNDED_RECTANGLE, 
+        MARGIN_LEFT, TITLE_TOP, AVAILABLE_WIDTH, TITLE_HEIGHT
+    )
+    title_bg.fill.solid()
+    title_bg.fill.fore_color.rgb = RGBColor(0, 0, 0)
+    title_bg.fill.transparency = 0.3  # Semi-transparent
+    title_bg.line.fill.background()  # No border
+
+    title_frame = slide.shapes.add_textbox(*TITLE_BOX).text_frame
+    title_frame.word_wrap = True
+    title_frame.vertical_anchor = MSO_ANCHOR.MIDDLE
+    title_frame.auto_size = None  # Disable auto-size to prevent overflow
+
+    content_frame = slide.shapes.add_textbox(*CONTENT_BOX).text_frame
+    content_frame.word_wrap = True
+    content_frame.vertical_anchor = MSO_ANCHOR.TOP
+    content_frame.auto_size = None  # Disable auto-size to prevent overflow
+    content_frame.margin_left = Inches(0.2)
+    content_frame.margin_right = Inches(0.2)
+    content_frame.margin_top = Inches(0.1)
+    content_frame.margin_bottom = Inches(0.1)
+
+    accent = slide.shapes.add_shape(MSO_SHAPE.ROUNDED_RECTANGLE, *ACCENT_BOX)
+    accent.fill.solid()
+    accent.fill.fore_color.rgb = RGBColor(255, 255, 255)
+    accent.fill.transparency = 0.2
+    accent.line.fill.background()
+
+def _get_skeleton(palette_index):
+    """
+    Return the precompiled (background, shapes) XML for a palette, building it
+    on a scratch presentation the first time it is needed.
+    """
+    skeleton = _skeletons.get(palette_index)
+    if skeleton is None:
+        from pptx import Presentation
+
+        with _cache_lock:
+            prs = Presentation()
+            slide = prs.slides.add_slide(prs.slide_layouts[6])
+            _build_chrome(slide, palette_index)
+            c_sld = slide._element.cSld
+            skeleton = (c_sld.bg, list(c_sld.spTree.iter_shape_elms()))
+            _skeletons[palette_index] = skeleton
+    return skeleton
+
+def _get_text_templates():
+    """
+    Return precompiled paragraph and run XML for the title and bullet styles.
+    They are built once with the regular python-pptx calls, so cloning them
+    produces exactly the same markup as styling every run by hand.
+    """
+    templates = _skeletons.get("text")
+    if templates is not None:
+        return templates
+
+    from pptx import Presentation
+    from pptx.util import Pt
+    from pptx.dml.color import RGBColor
+    from pptx.enum.text import PP_ALIGN
+
+    with _cache_lock:
+        prs = Presentation()
+        slide = prs.slides.add_slide(prs.slide_layouts[6])
+        frame = slide.shapes.add_textbox(0, 0, 1, 1).text_frame
+
+        # Title: one left-aligned paragraph with a single styled run
+        frame.text = "title"
+        title_paragraph = frame.paragraphs[0]
+        title_paragraph.alignment = PP_ALIGN.LEFT
+        title_run = title_paragraph.runs[0]
+        title_run.font.size = Pt(TITLE_FONT_SIZE)
+        title_run.font.bold = True
+        title_run.font.color.rgb = RGBColor(255, 255, 255)  # White text
+        title_run.font.name = "Arial"
+
+        # Bullet paragraph: spacing plus the bullet symbol (•) run
+        p = frame.add_paragraph()
+        bullet_run = p.add_run()
+        bullet_run.text = "•  "
+        bullet_run.font.size = Pt(round(BULLET_FONT_SIZE * BULLET_SYMBOL_SCALE))
+        bullet_run.font.color.rgb = RGBColor(255, 255, 255)
+        bullet_run.font.name = "Arial"
+        bullet_run.font.bold = True
+        p.alignment = PP_ALIGN.LEFT
+        p.space_after = Pt(14)  # Reduced spacing
+        p.space_before = Pt(4)
+        p.level = 0
+
+        # Text runs for every bold/italic/code/strike combination, keyed by Segment.style
+        runs = {}
+        run_paragraph = frame.add_paragraph()
+        for style in itertools.product((False, True), repeat=4):
+            text_run = run_paragraph.add_run()
+            text_run.text = "text"
+            style_run(text_run, Segment("text", *style), Pt(BULLET_FONT_SIZE), RGBColor(255, 255, 255))
+            runs[style] = text_run._r
+
+        templates = {"title_p": title_paragraph._p, "bullet_p": p._p, "runs": runs}
+        _skeletons["text"] = templates
+    return templates
+
+def warm_up_renderer():
+    """
+    Import python-pptx and build the per-process caches (base package, palette
+    chrome, text templates and, for the ooxml engine, its fragments) so the
+    first real render is as fast as the rest. Safe to call more than once.
+    """
+    start = time.perf_counter()
+    create_presentation_object()
+    _get_text_templates()
+    for palette_index in range(len(COLOR_PALETTES)):
+        _get_skeleton(palette_index)
+    if RENDER_ENGINE == "ooxml":
+        from app.services.ooxml_renderer import _get_templates
+        _get_templates()
+    logging.info(f"Renderer warmed up in {time.perf_counter() - start:.2f}s")
+
+def _add_chrome_slide(prs, i, narrow=False):
+    """
+    Add a blank slide with the cached background and shapes for slide index i.
+    `narrow` leaves room for a slide image beside the content box.
+    """
+    # Use blank layout for more design control
+    slide = prs.slides.add_slide(prs.slide_layouts[6])  # Blank layout
     
-    # Set slide dimensions (16:9 aspect ratio)
-    prs.slide_width = Inches(10)
-    prs.slide_height = Inches(7.5)
+    # Clone the background and shapes for this slide's palette (cycle through palettes)
+    background, shapes = _get_skeleton(i % len(COLOR_PALETTES))
+    c_sld = slide._element.cSld
+    c_sld.insert(0, copy.deepcopy(background))
+    for shape in shapes:
+        c_sld.spTree.append(copy.deepcopy(shape))
+    if narrow:
+        slide.shapes[2].width = NARROW_CONTENT_WIDTH
+    return slide
 
-    # Parse content if it is a JSON string
-    if isinstance(content, str):
-        try:
-            content_json = json.loads(content)
-        except json.JSONDecodeError as e:
-            logging.error(f"Invalid JSON format: {e}")
-            return None
+def is_single_line_title(title_text):
+    """True when the title renders as one pre-styled run (no line breaks, not empty)."""
+    return isinstance(title_text, str) and bool(title_text) and "\n" not in title_text and "\v" not in title_text
+
+def _is_bullet_list(content_text):
+    return isinstance(content_text, list) and all(isinstance(point, str) for point in content_text)
+
+def slide_pictures(slide_content):
+    """(kind, reference) for each picture on a slide, in drawing order: its image, then the logo."""
+    if not isinstance(slide_content, dict):
+        return []
+    return [
+        (kind, slide_content[kind]) for kind in PICTURE_BOXES
+        if isinstance(slide_content.get(kind), str) and slide_content[kind]
+    ]
+
+def has_image(slide_content):
+    """True when the slide shows an image beside its content (a logo alone takes no content space)."""
+    return any(kind == "image" for kind, _ in slide_pictures(slide_content))
+
+def picture_target(kind):
+    """Pixel size an image is scaled to for a picture box, at IMAGE_DPI."""
+    _, _, width, height = PICTURE_BOXES[kind]
+    return max(1, round(width / EMU_PER_INCH * IMAGE_DPI)), max(1, round(height / EMU_PER_INCH * IMAGE_DPI))
+
+def fit_picture(kind, width, height):
+    """
+    Position (x, y, cx, cy) of a width x height pixel image scaled to fit its
+    box with its aspect ratio kept: centred for the slide image, against the
+    right edge for the logo.
+    """
+    left, top, box_width, box_height = PICTURE_BOXES[kind]
+    scale = min(box_width / width, box_height / height)
+    cx, cy = int(width * scale), int(height * scale)
+    x = left + box_width - cx if kind == "logo" else left + (box_width - cx) // 2
+    return x, top + (box_height - cy) // 2, cx, cy
+
+def picture_element(shape_id, kind, r_id, prepared):
+    """The <p:pic> element showing a prepared image, whose media part the slide links as r_id."""
+    from pptx.oxml.shapes.picture import CT_Picture
+
+    return CT_Picture.new_pic(
+        shape_id, f"{kind.title()} {shape_id - 1}", "", r_id,
+        *fit_picture(kind, prepared.width, prepared.height)
+    )
+
+def check_images(content):
+    """Raise ImageError for the first picture in the deck that cannot be used."""
+    for slide_content in content:
+        for _, ref in slide_pictures(slide_content):
+            image_cache.check(ref)
+
+def _picture_source(ref):
+    try:
+        return source_digest(ref)
+    except ImageError:
+        return ref
+
+def image_fingerprints(content):
+    """
+    Digests of the image files a deck uses, for keying the render cache: a
+    file can change under the same path, unlike a data URI, which is already
+    part of the content.
+    """
+    return [
+        _picture_source(ref) for slide_content in content
+        for _, ref in slide_pictures(slide_content) if not is_data_uri(ref)
+    ]
+
+@lru_cache(maxsize=4096)
+def _fit_sizes(title_text, content_text, narrow=False):
+    title_size = TITLE_FONT_SIZE
+    if isinstance(title_text, str) and title_text:
+        title_size = largest_fitting_size(
+            title_text.splitlines() or [title_text], *TITLE_AREA, TITLE_FONT_MIN, TITLE_FONT_MAX, TITLE_STYLE
+        ) or TITLE_FONT_MIN
+
+    if isinstance(content_text, str):
+        paragraphs, style, default = [content_text], PARAGRAPH_STYLE, PARAGRAPH_FONT_SIZE
     else:
-        content_json = content
+        paragraphs, style, default = list(content_text), BULLET_STYLE, BULLET_FONT_SIZE
+    content_size = default
+    if paragraphs:
+        content_size = largest_fitting_size(
+            paragraphs, *(NARROW_CONTENT_AREA if narrow else CONTENT_AREA), CONTENT_FONT_MIN, CONTENT_FONT_MAX, style
+        ) or CONTENT_FONT_MIN
+    return title_size, content_size
 
-    for i, slide_content in enumerate(content_json):
-        # Use blank layout for more design control
-        slide = prs.slides.add_slide(prs.slide_layouts[6])  # Blank layout
-        
-        # Select color palette (cycle through palettes)
-        color_palette = COLOR_PALETTES[i % len(COLOR_PALETTES)]
-        bg_color1, bg_color2 = color_palette
-        
-        # Apply beautiful gradient background
-        set_gradient_background(slide, bg_color1, bg_color2)
-        
-        title_text = slide_content.get("title", f"Slide {i+1}")
-        content_text = slide_content.get("content", [])
-        
-        # Define safe margins to keep everything inside
-        MARGIN_LEFT = Inches(0.75)
-        MARGIN_RIGHT = Inches(0.75)
-        MARGIN_TOP = Inches(0.75)
-        MARGIN_BOTTOM = Inches(0.75)
-        
-        # Calculate available width and height
-        available_width = prs.slide_width - MARGIN_LEFT - MARGIN_RIGHT
-        available_height = prs.slide_height - MARGIN_TOP - MARGIN_BOTTOM
-        
-        # Title section - fixed height
-        TITLE_HEIGHT = Inches(1.2)
-        TITLE_TOP = MARGIN_TOP + Inches(0.2)
-        
-        # Content section - remaining space
-        CONTENT_TOP = TITLE_TOP + TITLE_HEIGHT + Inches(0.3)
-        CONTENT_HEIGHT = available_height - TITLE_HEIGHT - Inches(0.5)
-        
+def fit_slide(slide_content, i):
+    """
+    Return (title_size, content_size) in points: the largest sizes within the
+    configured ranges at which the title and content fit their boxes, measured
+    with font metrics rather than by rendering. Results are cached per text.
+    The fixed design sizes are used when TEXT_FIT is off or the content is not text.
+    """
+    title_text = slide_content.get("title", f"Slide {i+1}")
+    content_text = slide_content.get("content", [])
+    default_content = PARAGRAPH_FONT_SIZE if isinstance(content_text, str) else BULLET_FONT_SIZE
+    if not TEXT_FIT:
+        return TITLE_FONT_SIZE, default_content
+    if not isinstance(content_text, str):
+        content_text = tuple(content_text) if _is_bullet_list(content_text) else ()
+    title_size, content_size = _fit_sizes(
+        title_text if isinstance(title_text, str) else None, content_text, has_image(slide_content)
+    )
+    return title_size, content_size if content_text else default_content
+
+def layout_slide(slide_content):
+    """
+    Return the slides needed to show slide_content: itself when its bullets fit
+    at CONTENT_FONT_MIN, otherwise continuation slides (title + CONTINUATION_SUFFIX)
+    that each fit. A bullet too tall for a whole slide is split between words.
+    Continuation slides keep the slide's image and logo.
+    """
+    content_text = slide_content.get("content") if isinstance(slide_content, dict) else None
+    if not TEXT_FIT or not content_text or not _is_bullet_list(content_text):
+        return [slide_content]
+    area = NARROW_CONTENT_AREA if has_image(slide_content) else CONTENT_AREA
+    if fits(content_text, *area, CONTENT_FONT_MIN, BULLET_STYLE):
+        return [slide_content]
+
+    # Paragraph heights add up, so pack bullets by their height at the minimum size
+    width, height = area
+    pages = [[]]
+    used = 0.0
+    for point, point_height in zip(
+        content_text, paragraph_heights(content_text, width, CONTENT_FONT_MIN, BULLET_STYLE)
+    ):
+        pieces = [(point, point_height)]
+        if point_height > height:
+            split = split_text(point, width, height, CONTENT_FONT_MIN, BULLET_STYLE)
+            pieces = zip(split, paragraph_heights(split, width, CONTENT_FONT_MIN, BULLET_STYLE))
+        for piece, piece_height in pieces:
+            if pages[-1] and used + piece_height > height:
+                pages.append([])
+                used = 0.0
+            pages[-1].append(piece)
+            used += piece_height
+
+    title_text = slide_content.get("title")
+    slides = []
+    for n, page in enumerate(pages):
+        page_content = dict(slide_content, content=page)
+        if n and isinstance(title_text, str):
+            page_content["title"] = title_text + CONTINUATION_SUFFIX
+        slides.append(page_content)
+    return slides
+
+def layout_deck(content):
+    """The slide list as rendered, with continuation slides for overflowing content."""
+    return [page for slide_content in content for page in layout_slide(slide_content)]
+
+def _add_image_parts(slide, slide_content, i):
+    """
+    Add the slide's images to the package as python-pptx image parts, for
+    decks edited in place; python-pptx shares a part between slides showing
+    identical bytes. Returns (kind, rId, PreparedImage) for each picture.
+    """
+    pictures = []
+    for kind, ref in slide_pictures(slide_content):
         try:
-            # Add a semi-transparent rectangle for title background with proper margins
-            title_bg_left = MARGIN_LEFT
-            title_bg_top = TITLE_TOP
-            title_bg_width = available_width
-            title_bg_height = TITLE_HEIGHT
-            
-            title_bg = slide.shapes.add_shape(
-                MSO_SHAPE.ROUNDED_RECTANGLE, 
-                title_bg_left, title_bg_top, title_bg_width, title_bg_height
-            )
-            title_bg.fill.solid()
-            title_bg.fill.fore_color.rgb = RGBColor(0, 0, 0)
-            title_bg.fill.transparency = 0.3  # Semi-transparent
-            title_bg.line.fill.background()  # No border
-            
-            # Add title text box with proper padding inside the background
-            title_padding = Inches(0.3)
-            title_left = MARGIN_LEFT + title_padding
-            title_top = TITLE_TOP + Inches(0.1)
-            title_width = available_width - (title_padding * 2)
-            title_height = TITLE_HEIGHT - Inches(0.2)
-            
-            title_box = slide.shapes.add_textbox(title_left, title_top, title_width, title_height)
-            title_frame = title_box.text_frame
+            prepared = image_cache.prepare(ref, *picture_target(kind))
+            _, r_id = slide.part.get_or_add_image_part(prepared.path)
+        except Exception as e:
+            logging.warning(f"Error adding {kind} to slide {i+1}: {e}")
+            continue
+        pictures.append((kind, r_id, prepared))
+    return pictures
+
+def add_slide(prs, slide_content, i, pictures=None):
+    """
+    Add one styled slide (background, title and bullet content) to the presentation.
+    `i` is the zero-based slide index and selects the color palette. The slide
+    chrome is cloned from a cached skeleton, so only the text is built here.
+    `pictures` lists (kind, rId, PreparedImage) for images whose media parts
+    the caller has already linked to the slide (see ooxml_renderer.PackageWriter);
+    when None, the slide's images are added to the presentation here.
+    """
+    from pptx.util import Pt
+    from pptx.dml.color import RGBColor
+    from pptx.enum.text import PP_ALIGN
+
+    start = time.perf_counter()
+    slide = _add_chrome_slide(prs, i, has_image(slide_content))
+    title_box, content_box = slide.shapes[1], slide.shapes[2]
+    templates = _get_text_templates()
+    
+    title_text = slide_content.get("title", f"Slide {i+1}")
+    content_text = slide_content.get("content", [])
+    title_size, content_size = fit_slide(slide_content, i)
+    
+    try:
+        title_frame = title_box.text_frame
+        if is_single_line_title(title_text):
+            # Single-line title: clone the pre-styled paragraph and set its text
+            title_p = copy.deepcopy(templates["title_p"])
+            title_p.r_lst[0].text = title_text
+            if title_size != TITLE_FONT_SIZE:
+                title_p.r_lst[0].rPr.set("sz", str(title_size * 100))
+            tx_body = title_frame._txBody
+            for paragraph in tx_body.p_lst:
+                tx_body.remove(paragraph)
+            tx_body.append(title_p)
+        else:
             title_frame.text = title_text
-            title_frame.word_wrap = True
-            title_frame.vertical_anchor = MSO_ANCHOR.MIDDLE
-            title_frame.auto_size = None  # Disable auto-size to prevent overflow
             
             # Style the title
             title_paragraph = title_frame.paragraphs[0]
             title_paragraph.alignment = PP_ALIGN.LEFT
             title_run = title_paragraph.runs[0]
-            title_run.font.size = Pt(38)  # Slightly smaller to fit better
+            title_run.font.size = Pt(title_size)
             title_run.font.bold = True
             title_run.font.color.rgb = RGBColor(255, 255, 255)  # White text
             title_run.font.name = "Arial"
-        except Exception as e:
-            logging.warning(f"Error adding title to slide {i+1}: {e}")
+    except Exception as e:
+        logging.warning(f"Error adding title to slide {i+1}: {e}")
 
-        # Add content area with proper boundaries
-        try:
-            content_padding = Inches(0.3)
-            content_left = MARGIN_LEFT + content_padding
-            content_top = CONTENT_TOP
-            content_width = available_width - (content_padding * 2)
-            content_height = CONTENT_HEIGHT - Inches(0.2)  # Leave some bottom margin
-            
-            content_box = slide.shapes.add_textbox(content_left, content_top, content_width, content_height)
-            content_frame = content_box.text_frame
-            content_frame.word_wrap = True
-            content_frame.vertical_anchor = MSO_ANCHOR.TOP
-            content_frame.auto_size = None  # Disable auto-size to prevent overflow
-            content_frame.margin_left = Inches(0.2)
-            content_frame.margin_right = Inches(0.2)
-            content_frame.margin_top = Inches(0.1)
-            content_frame.margin_bottom = Inches(0.1)
-            
-            if isinstance(content_text, str):
-                # Single paragraph with markdown support
-                p = content_frame.paragraphs[0]
-                p.clear()  # Clear any default text
-                p.alignment = PP_ALIGN.LEFT
-                p.space_after = Pt(12)
-                add_formatted_text_to_paragraph(
-                    p, content_text, Pt(22), RGBColor(255, 255, 255)
-                )
-            elif isinstance(content_text, list):
-                # Multiple bullet points with beautiful styling and markdown support
-                for idx, point in enumerate(content_text):
-                    if idx == 0:
-                        p = content_frame.paragraphs[0]
-                        p.text = ""  # Clear default text
-                    else:
-                        p = content_frame.add_paragraph()
-                    
-                    # Truncate very long points to prevent overflow
-                    max_length = 150  # Maximum characters per bullet point
-                    display_point = point[:max_length] + "..." if len(point) > max_length else point
-                    
-                    # Add bullet symbol (•) before text
-                    bullet_run = p.add_run()
-                    bullet_run.text = "•  "
-                    bullet_run.font.size = Pt(24)
-                    bullet_run.font.color.rgb = RGBColor(255, 255, 255)
-                    bullet_run.font.name = "Arial"
-                    bullet_run.font.bold = True
-                    
-                    # Parse and add formatted text with markdown support
-                    segments = parse_markdown_text(display_point)
-                    for seg_idx, (segment_text, is_bold, is_italic) in enumerate(segments):
-                        text_run = p.add_run()
-                        text_run.text = segment_text
-                        text_run.font.size = Pt(20)
-                        text_run.font.color.rgb = RGBColor(255, 255, 255)
-                        text_run.font.name = "Arial"
-                        text_run.font.bold = is_bold
-                        text_run.font.italic = is_italic
-                    
-                    p.alignment = PP_ALIGN.LEFT
-                    p.space_after = Pt(14)  # Reduced spacing
-                    p.space_before = Pt(4)
-                    p.level = 0
-                    p.left_margin = Inches(0.1)
-                    
-            # Add a decorative accent shape within margins
-            accent_left = MARGIN_LEFT + Inches(0.1)
-            accent_top = CONTENT_TOP
-            accent_width = Inches(0.12)
-            accent_height = min(content_height, prs.slide_height - CONTENT_TOP - MARGIN_BOTTOM)
-            
-            accent = slide.shapes.add_shape(
-                MSO_SHAPE.ROUNDED_RECTANGLE, accent_left, accent_top, accent_width, accent_height
+    # Fill the content area
+    try:
+        content_frame = content_box.text_frame
+        
+        if isinstance(content_text, str):
+            # Single paragraph with markdown support
+            p = content_frame.paragraphs[0]
+            p.clear()  # Clear any default text
+            p.alignment = PP_ALIGN.LEFT
+            p.space_after = Pt(12)
+            add_formatted_text_to_paragraph(
+                p, content_text, Pt(content_size), RGBColor(255, 255, 255)
             )
-            accent.fill.solid()
-            accent.fill.fore_color.rgb = RGBColor(255, 255, 255)
-            accent.fill.transparency = 0.2
-            accent.line.fill.background()
-            
-            
-        except Exception as e:
-            logging.warning(f"Error adding content to slide {i+1}: {e}")
+        elif isinstance(content_text, list) and content_text:
+            # Multiple bullet points, cloned from pre-styled paragraph and run fragments
+            tx_body = content_frame._txBody
+            for paragraph in tx_body.p_lst:
+                tx_body.remove(paragraph)
+            resized = content_size != BULLET_FONT_SIZE
+            for point in content_text:
+                # Bullet symbol (•) and paragraph spacing come from the template
+                p = copy.deepcopy(templates["bullet_p"])
+                if resized:
+                    p.r_lst[0].rPr.set("sz", str(round(content_size * BULLET_SYMBOL_SCALE) * 100))
+                
+                # Parse and add formatted text with markdown support
+                for segment in tokenize_markdown(point):
+                    text_run = copy.deepcopy(templates["runs"][segment.style])
+                    text_run.text = segment.text
+                    if resized:
+                        text_run.rPr.set("sz", str(content_size * 100))
+                    p.append(text_run)
+                tx_body.append(p)
+    except Exception as e:
+        logging.warning(f"Error adding content to slide {i+1}: {e}")
+
+    if pictures is None:
+        pictures = _add_image_parts(slide, slide_content, i)
+    sp_tree = slide.shapes._spTree
+    for kind, r_id, prepared in pictures:
+        sp_tree.append(picture_element(slide.shapes._next_shape_id, kind, r_id, prepared))
+    
+    slide_render_latency.observe(time.perf_counter() - start, engine="pptx")
+    return slide
 
-    presentations_dir = os.path.join(os.getcwd(), "presentations")
-    os.makedirs(presentations_dir, exist_ok=True)
-    output_path = os.path.join(presentations_dir, f"{presentation_id}.pptx")
-    prs.save(output_path)
+def save_presentation_file(prs, presentation_id="presentation"):
+    """
+    Save the presentation under presentations/ and return the file path. The
+    file is replaced rather than overwritten, since it may be a hard link
+    shared with the render cache and other presentations.
+    """
+    output_path = presentation_file_path(presentation_id)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    start = time.perf_counter()
+    temp_path = temp_file_path(output_path)
+    try:
+        prs.save(temp_path)
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    save_latency.observe(time.perf_counter() - start, engine="pptx")
     logging.info(f"Presentation saved at '{output_path}'")
-    return output_path
\ No newline at end of file
+    return output_path
+
+def generate_slides(content, presentation_id="presentation", cancel=None):
+    """
+    Render the deck with python-pptx and save it under presentations/. Slides
+    are built one at a time and streamed into the package, so memory stays
+    flat however long the deck is (see ooxml_renderer.write_package).
+    """
+    from app.services.ooxml_renderer import save_package
+    return save_package(content, presentation_id, engine="pptx", cancel=cancel)
+
+
+def render_to_bytes(content, engine=None, cancel=None):
+    """
+    Render a deck entirely in memory and return the .pptx bytes.
+    Used instead of get_renderer() when presentation files are not persisted.
+    """
+    engine = engine or RENDER_ENGINE
+    stream = io.BytesIO()
+    if engine not in RENDER_ENGINES:
+        raise ValueError(f"Unknown render engine: {engine}")
+    from app.services.ooxml_renderer import write_package
+    write_package(content, stream, engine, cancel)
+    return stream.getvalue()
+
+
+def get_renderer(engine=None):
+    """
+    Return the render function for an engine name (defaults to RENDER_ENGINE).
+    Both engines take (content, presentation_id, cancel=None) and return the saved
+    file path; `cancel` is an optional CancelToken checked between slides.
+    """
+    engine = engine or RENDER_ENGINE
+    if engine == "pptx":
+        return generate_slides
+    if engine == "ooxml":
+        from app.services.ooxml_renderer import render_ooxml
+        return render_ooxml
+    raise ValueError(f"Unknown render engine: {engine}")
+
+def render_fingerprint(engine=None):
+    """Everything besides the slides that decides the rendered file, for keying the render cache."""
+    return [
+        RENDERER_VERSION, engine or RENDER_ENGINE, TEXT_FIT,
+        TITLE_FONT_MAX, TITLE_FONT_MIN, CONTENT_FONT_MAX, CONTENT_FONT_MIN,
+        IMAGE_DPI, IMAGE_JPEG_QUALITY,
+    ]
+
+def slide_hash(slide_content, i):
+    """
+    Hash of everything that affects how a slide renders: its title, content,
+    palette and the bytes of its pictures.
+    """
+    key = [
+        slide_content.get("title", f"Slide {i+1}"),
+        slide_content.get("content", []),
+        i % len(COLOR_PALETTES),
+    ]
+    pictures = slide_pictures(slide_content)
+    if pictures:
+        key.append([[kind, _picture_source(ref)] for kind, ref in pictures])
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+def compute_slide_hashes(content):
+    """Hashes of the slides as rendered, continuation slides included."""
+    return [slide_hash(slide_content, i) for i, slide_content in enumerate(layout_deck(content))]
+
+def update_slides(content, presentation_id, previous_hashes):
+    """
+    Re-render a deck in place, rebuilding only slides whose hash changed.
+
+    Slides from the previous render whose (title, content, palette) still appear
+    in the new content are kept as-is and moved into position; new or changed
+    slides are built, and slides that no longer appear are dropped from the package.
+    Falls back to a full render when there is no usable previous file.
+    """
+    output_path = presentation_file_path(presentation_id)
+    if not previous_hashes or not os.path.exists(output_path):
+        return generate_slides(content, presentation_id)
+    content = layout_deck(content)
+
+    from pptx import Presentation
+    prs = Presentation(output_path)
+    sld_id_lst = prs.slides._sldIdLst
+    old_ids = list(sld_id_lst)
+    if len(old_ids) != len(previous_hashes):
+        logging.warning(f"Stored slide hashes do not match '{output_path}', rendering in full")
+        return generate_slides(content, presentation_id)
+
+    # Map each old hash to the slide elements that rendered it
+    reusable = {}
+    for sld_id, old_hash in zip(old_ids, previous_hashes):
+        reusable.setdefault(old_hash, []).append(sld_id)
+
+    ordered = []
+    rebuilt = 0
+    for i, slide_content in enumerate(content):
+        matches = reusable.get(slide_hash(slide_content, i))
+        if matches:
+            ordered.append(matches.pop(0))
+        else:
+            add_slide(prs, slide_content, i)
+            ordered.append(sld_id_lst[-1])
+            rebuilt += 1
+
+    # Put the slide list in the new order and drop slides that were not reused
+    kept = set(id(sld_id) for sld_id in ordered)
+    for sld_id in list(sld_id_lst):
+        sld_id_lst.remove(sld_id)
+    for sld_id in ordered:
+        sld_id_lst.append(sld_id)
+    for sld_id in old_ids:
+        if id(sld_id) not in kept:
+            prs.part.drop_rel(sld_id.rId)
+
+    logging.info(f"Re-rendered {rebuilt} of {len(content)} slides for '{presentation_id}'")
+    return save_presentation_file(prs, presentation_id)
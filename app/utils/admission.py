@@ -0,0 +1,196 @@
+"""
+Admission control: an adaptive limit on generation work, and a reserved lane
+for cheap requests.
+
+AdaptiveLimiter caps how many requests may be generating content at once and
+moves that cap with the upstream's health (AIMD). Each model call reports its
+latency and whether it failed. While calls stay near the baseline latency
+(the fastest healthy calls seen lately) and the limit is in use, the limit
+grows by about one per limit's worth of calls. When recent latency drifts
+past `tolerance` times the baseline, or a call fails, the limit is multiplied
+by `backoff`, at most once per recent latency, so one slow burst counts once.
+Requests over the limit are refused at once with Overloaded (503 with
+Retry-After) instead of queueing inside the server. Work that is already
+queued by design (async jobs, batch items) waits for a slot instead.
+
+AdmissionMiddleware bounds all in-flight HTTP requests, but keeps the last
+`reserved` slots for GET/HEAD requests (downloads, health checks, metrics),
+so slow POSTs can never take every slot.
+"""
+import os
+import json
+import math
+import time
+import asyncio
+from collections import deque
+
+from app.utils.metrics import counter, gauge
+
+# Admission settings (override via environment)
+HTTP_MAX_IN_FLIGHT = int(os.getenv("HTTP_MAX_IN_FLIGHT", "512"))  # 0 disables the lane
+HTTP_RESERVED_CHEAP = int(os.getenv("HTTP_RESERVED_CHEAP", "32"))  # slots only GET/HEAD may use
+
+CHEAP_METHODS = ("GET", "HEAD", "OPTIONS")
+
+requests_shed = counter(
+    "pptgen_requests_shed_total", "Requests refused with 503 before doing any work, by reason.", ["reason"]
+)
+http_expensive_in_flight = gauge(
+    "pptgen_http_expensive_in_flight", "Non-GET requests in flight, bounded by the reserved lane."
+)
+
+
+class Overloaded(Exception):
+    """Raised when a request is refused to protect the server; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Server is overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class _Slot:
+    def __init__(self, limiter):
+        self._limiter = limiter
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._limiter.release()
+        return False
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit driven by observed latency and errors. Event-loop only."""
+
+    def __init__(self, initial: int = 16, min_limit: int = 2, max_limit: int = 256,
+                 tolerance: float = 2.0, backoff: float = 0.75, smoothing: float = 0.2,
+                 baseline_drift: float = 0.01, enabled: bool = True):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self.baseline_drift = baseline_drift
+        self.enabled = enabled
+        self.in_flight = 0
+        self.latency = None   # smoothed latency of recent calls
+        self.baseline = None  # fastest recent healthy latency, creeping up so a slower normal is learned
+        self._last_decrease = 0.0
+        self._waiters = deque()
+        self.shed = 0
+
+    def full(self) -> bool:
+        return self.enabled and self.in_flight >= int(self.limit)
+
+    def slot(self):
+        """Take a slot for one request (a context manager), or raise Overloaded."""
+        if self.full():
+            self.shed += 1
+            raise Overloaded(self.retry_after())
+        self.in_flight += 1
+        return _Slot(self)
+
+    async def wait_slot(self):
+        """Take a slot for queued work (a context manager), waiting while the limit is reached."""
+        while self.full():
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+        return _Slot(self)
+
+    def release(self):
+        self.in_flight -= 1
+        # Every waiter checks again; requests arriving meanwhile may take the slot first
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def retry_after(self) -> int:
+        # A slot frees up about once per call latency
+        return max(1, math.ceil(self.latency or 1))
+
+    def record(self, seconds: float, ok: bool = True):
+        """Feed one upstream call's latency, and whether it failed, into the limit."""
+        now = time.monotonic()
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += self.smoothing * (seconds - self.latency)
+        if ok:
+            if self.baseline is None:
+                self.baseline = seconds
+            else:
+                self.baseline = min(seconds, self.baseline * (1 + self.baseline_drift))
+
+        congested = not ok or (self.baseline is not None and self.latency > self.baseline * self.tolerance)
+        if congested:
+            if now - self._last_decrease >= self.latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        elif self.in_flight >= self.limit / 2:
+            # Only grow a limit that is actually being used
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "latency": round(self.latency, 4) if self.latency is not None else None,
+            "baseline": round(self.baseline, 4) if self.baseline is not None else None,
+            "shed": self.shed,
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware keeping `reserved` of `max_in_flight` request slots for
+    GET/HEAD/OPTIONS. Other requests over max_in_flight - reserved get 503.
+    """
+
+    def __init__(self, app, max_in_flight: int = HTTP_MAX_IN_FLIGHT, reserved: int = HTTP_RESERVED_CHEAP):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.reserved = min(max(0, reserved), max(0, max_in_flight - 1))
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.max_in_flight <= 0:
+            return await self.app(scope, receive, send)
+
+        cheap = scope["method"] in CHEAP_METHODS
+        if self.in_flight >= self.max_in_flight or (
+            not cheap and self.in_flight >= self.max_in_flight - self.reserved
+        ):
+            requests_shed.inc(reason="in_flight" if cheap else "reserved_lane")
+            body = json.dumps({"detail": "Server is busy. Please retry later."}).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", b"1"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        self.in_flight += 1
+        if not cheap:
+            http_expensive_in_flight.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            if not cheap:
+                http_expensive_in_flight.dec()
@@ -0,0 +1,59 @@
+"""
+Request-scoped cancellation.
+
+A CancelToken travels with one request into the render stage. Renders call
+check() between slides, which raises RenderCancelled once the request's
+deadline has passed or the request was cancelled (the client went away). The
+deadline is a wall-clock time so it means the same thing in process workers;
+the cancel flag only reaches thread workers, since a pickled token keeps just
+the deadline.
+"""
+import time
+import threading
+
+
+class RenderCancelled(Exception):
+    """Raised inside a render whose request was cancelled or ran out of time."""
+
+
+class CancelToken:
+    """Deadline plus cancel flag for one request."""
+
+    def __init__(self, budget: float = None):
+        self.deadline = time.time() + budget if budget is not None else None
+        self._cancelled = threading.Event()
+
+    def remaining(self):
+        """Seconds left before the deadline, or None without one."""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.time()
+
+    def monotonic_deadline(self):
+        """The deadline as a time.monotonic() value, for generate_content; None without one."""
+        remaining = self.remaining()
+        return time.monotonic() + remaining if remaining is not None else None
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check(self):
+        """Raise RenderCancelled if the work should stop now."""
+        if self.cancelled:
+            raise RenderCancelled("The request was cancelled")
+        if self.expired():
+            raise RenderCancelled("The request deadline passed during rendering")
+
+    def __getstate__(self):
+        return {"deadline": self.deadline}
+
+    def __setstate__(self, state):
+        self.deadline = state["deadline"]
+        self._cancelled = threading.Event()
@@ -0,0 +1,102 @@
+import io
+import os
+import time
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def describe_bytes(data: bytes, modified: float = None) -> dict:
+    """Content-hash ETag, size and modification time for an in-memory deck."""
+    return {
+        "etag": hashlib.sha256(data).hexdigest(),
+        "size": len(data),
+        "last_modified": modified if modified is not None else time.time(),
+    }
+
+
+def describe_file(path: str) -> dict:
+    """Content-hash ETag, size and modification time for a deck on disk."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    stat = os.stat(path)
+    return {"etag": digest.hexdigest(), "size": stat.st_size, "last_modified": stat.st_mtime}
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def is_not_modified(request_headers, etag: str, last_modified: float) -> bool:
+    """
+    True if a conditional GET can be answered with 304. If-None-Match wins
+    over If-Modified-Since, as required by RFC 9110.
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison: W/"x" matches "x"
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return f'"{etag}"' in tags or f'W/"{etag}"' in tags
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since
+    return False
+
+
+def parse_range(range_header: str, size: int):
+    """
+    Parse a single-range `bytes=` header into an inclusive (start, end) pair.
+
+    Returns None when the header should be ignored (malformed or multi-range,
+    so the full body is sent) and raises ValueError when it is unsatisfiable.
+    """
+    units, _, spec = range_header.partition("=")
+    if units.strip() != "bytes" or "," in spec:
+        return None
+    start_text, _, end_text = spec.strip().partition("-")
+    try:
+        if not start_text:
+            # Suffix range: the last N bytes
+            length = int(end_text)
+        else:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+    if not start_text:
+        if length <= 0 or size == 0:
+            raise ValueError("Range not satisfiable")
+        return max(0, size - length), size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+
+def if_range_matches(if_range: str, headers: dict) -> bool:
+    """True if a Range request should be honoured given its If-Range validator."""
+    if not if_range:
+        return True
+    return if_range in (headers.get("ETag"), headers.get("Last-Modified"))
+
+
+def stream_bytes(data: bytes, start: int, end: int, chunk_size: int = 64 * 1024):
+    """Yield data[start:end] in chunks, reading from a BytesIO that shares data's buffer."""
+    stream = io.BytesIO(data)
+    stream.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        chunk = stream.read(min(chunk_size, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
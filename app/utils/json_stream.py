@@ -0,0 +1,183 @@
+import json
+from typing import NamedTuple
+
+
+class IncrementalArrayParser:
+    """
+    Incrementally parses a JSON array of objects from text chunks.
+
+    Feed it text as it arrives and it returns each top-level element as soon as
+    that element's closing brace is seen. Anything before the opening '[' (such
+    as a ```json fence) and anything after the closing ']' is ignored.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item_start = None
+        self.started = False
+        self.finished = False
+
+    def feed(self, chunk: str) -> list:
+        """Add a chunk of text and return the list of elements completed by it."""
+        if self.finished or not chunk:
+            return []
+
+        self._buffer += chunk
+        items = []
+        buffer = self._buffer
+        i = self._pos
+
+        while i < len(buffer):
+            char = buffer[i]
+
+            if not self.started:
+                if char == "[":
+                    self.started = True
+                    self._depth = 1
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 1:
+                    self._item_start = i
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._item_start is not None:
+                    items.append(json.loads(buffer[self._item_start:i + 1]))
+                    self._item_start = None
+                elif self._depth == 0:
+                    self.finished = True
+                    break
+            i += 1
+
+        # Drop text that can no longer be part of an element
+        if self._item_start is not None:
+            self._buffer = buffer[self._item_start:]
+            self._pos = i - self._item_start
+            self._item_start = 0
+        else:
+            self._buffer = ""
+            self._pos = 0
+        return items
+
+
+class SalvagedArray(NamedTuple):
+    items: list      # parsed elements, None where an element could not be parsed
+    complete: bool   # False when the text ended before the array closed
+    repaired: bool   # True when the text was not valid JSON as-is
+
+
+def _strip_trailing_commas(text: str) -> str:
+    """Remove commas directly before a closing bracket or brace, outside strings."""
+    out = []
+    in_string = False
+    escape = False
+    pending_comma = None
+    for char in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            out.append(char)
+            continue
+        if pending_comma is not None:
+            if char.isspace():
+                pending_comma.append(char)
+                continue
+            if char not in "]}":
+                out.extend(pending_comma)
+            else:
+                out.extend(pending_comma[1:])
+            pending_comma = None
+        if char == ",":
+            pending_comma = [char]
+            continue
+        if char == '"':
+            in_string = True
+        out.append(char)
+    if pending_comma is not None:
+        out.extend(pending_comma)
+    return "".join(out)
+
+
+def salvage_array(text: str) -> SalvagedArray:
+    """
+    Parse a JSON array from model output as leniently as possible. Prose or a
+    ```json fence around the array is ignored, trailing commas are dropped, an
+    element that does not parse becomes None, and when the output was cut off
+    the complete leading elements are kept (complete=False).
+
+    Raises:
+        ValueError: The text contains no array at all.
+    """
+    start = text.find("[")
+    if start == -1:
+        raise ValueError("No JSON array in the model output.")
+    try:
+        value, _ = json.JSONDecoder().raw_decode(text, start)
+        if isinstance(value, list):
+            # Only fences or prose around an otherwise valid array
+            return SalvagedArray(value, True, bool(text[:start].strip("`json \n\r\t")))
+    except json.JSONDecodeError:
+        pass
+
+    text = _strip_trailing_commas(text[start + 1:])
+    elements = []
+    depth = 0
+    in_string = False
+    escape = False
+    element_start = 0
+    complete = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            if depth == 0:
+                elements.append(text[element_start:i])
+                complete = True
+                break
+            depth -= 1
+        elif char == "," and depth == 0:
+            elements.append(text[element_start:i])
+            element_start = i + 1
+    if not complete:
+        elements.append(text[element_start:])
+
+    items = []
+    for n, element in enumerate(elements):
+        element = element.strip()
+        if not element:
+            continue
+        try:
+            items.append(json.loads(element))
+        except json.JSONDecodeError:
+            if not complete and n == len(elements) - 1:
+                break  # the element the output was cut off in
+            items.append(None)
+    return SalvagedArray(items, complete, True)
@@ -0,0 +1,128 @@
+import os
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+# Markdown settings (override via environment)
+MARKDOWN_CACHE_SIZE = int(os.getenv("MARKDOWN_CACHE_SIZE", "4096"))
+
+# Span bodies in the unrolled-loop form `normal* (special normal*)*`: long runs of
+# ordinary characters are consumed in one step, and a missing closer fails in
+# linear time because the special branches never overlap with the normal class
+_BOLD_INNER = r"[^*\\]*(?:(?:\\.|\*(?!\*))[^*\\]*)*"
+_BOLD_BODY = r"(" + _BOLD_INNER + r")"
+_ITALIC_BODY = r"([^*\\]*(?:(?:\\.|\*\*(?!\*\*)" + _BOLD_INNER + r"\*\*)[^*\\]*)*)"
+_STRIKE_BODY = r"([^~\\]*(?:(?:\\.|~(?!~))[^~\\]*)*)"
+
+# One alternation finds every formatted span. Every branch starts with a marker
+# character, so the regex engine skips plain text between spans with a fast prefix scan
+_SPAN_RE = re.compile(
+    r"\\([\\`*~])"                                     # 1: escaped marker character
+    r"|`([^`]+)`"                                       # 2: `code` (no formatting inside)
+    r"|\*\*\*(?!\*)" + _BOLD_BODY + r"\*\*\*"               # 3: ***bold italic***
+    r"|\*\*(?!\*\*)" + _BOLD_BODY + r"\*\*"                # 4: **bold**, may contain *italic*
+    r"|\*(?<!\*\*)(?!\*)" + _ITALIC_BODY + r"\*(?!\*)"     # 5: *italic*, may contain **bold**
+    r"|~~(?!~~)" + _STRIKE_BODY + r"~~",                # 6: ~~strike~~
+    re.S,
+)
+_MARKERS = frozenset("\\`*~")
+
+
+class Segment(NamedTuple):
+    """A run of slide text with the same formatting."""
+
+    text: str
+    bold: bool = False
+    italic: bool = False
+    code: bool = False
+    strike: bool = False
+
+    @property
+    def style(self):
+        return (self.bold, self.italic, self.code, self.strike)
+
+
+_PLAIN = (False, False, False, False)
+
+
+def _scan(text, style, texts, styles):
+    """
+    Append the runs of text nested in `style` (bold, italic, code, strike) to
+    texts and their styles to styles, joining neighbours with the same style
+    (escapes split plain text).
+    """
+    bold, italic, _, strike = style
+    # split() returns the text before each span followed by the span's six groups
+    # (all None but the branch that matched), without building a match object per span
+    parts = _SPAN_RE.split(text)
+    plain = parts[0]
+    if plain:
+        if styles and styles[-1] == style:
+            texts[-1] += plain
+        else:
+            texts.append(plain)
+            styles.append(style)
+    for i in range(1, len(parts), 7):
+        escaped, code, bold_italic, bold_body, italic_body, strike_body, plain = parts[i:i + 7]
+        # Most frequent branches first
+        if bold_body is not None:
+            body, inner = bold_body, (True, italic, False, strike)
+        elif italic_body is not None:
+            body, inner = italic_body, (bold, True, False, strike)
+        elif escaped is not None:
+            body, inner = escaped, style
+        elif code is not None:
+            body, inner = code, (bold, italic, True, strike)
+        elif bold_italic is not None:
+            body, inner = bold_italic, (True, True, False, strike)
+        else:
+            body, inner = strike_body, (bold, italic, False, True)
+        if inner is style or inner[2] or _MARKERS.isdisjoint(body):
+            if styles and styles[-1] == inner:
+                texts[-1] += body
+            else:
+                texts.append(body)
+                styles.append(inner)
+        else:
+            _scan(body, inner, texts, styles)
+        if plain:
+            if styles[-1] == style:
+                texts[-1] += plain
+            else:
+                texts.append(plain)
+                styles.append(style)
+
+
+@lru_cache(maxsize=MARKDOWN_CACHE_SIZE)
+def tokenize_markdown(text: str) -> tuple:
+    """
+    Split slide text into formatted segments.
+
+    Supports **bold**, *italic*, ***bold italic*** and nesting of the two,
+    ~~strike~~, `code` (no formatting inside) and backslash-escaped markers.
+    Unmatched markers are kept as literal text. Each formatted span is found by
+    one compiled regex match. Uncached, it is about 4x faster than the old
+    character loop on long prose-like bullets, 1-1.5x on long markup-dense ones
+    and no faster on short ones (see benchmarks/bench_markdown.py). The main
+    gain is the cache, since the same bullets recur across regenerated and
+    reconfigured decks.
+    """
+    if not text:
+        return (Segment(""),)
+    if _MARKERS.isdisjoint(text):
+        return (Segment(text),)
+
+    texts = []
+    styles = []
+    _scan(text, _PLAIN, texts, styles)
+    return tuple([tuple.__new__(Segment, (run,) + style) for run, style in zip(texts, styles)])
+
+
+def formatted_spans(text: str) -> list:
+    """
+    Return (start, end) offsets of the top-level formatted spans and escapes in
+    text. Splitting the text only outside these ranges keeps every span intact.
+    """
+    if _MARKERS.isdisjoint(text):
+        return []
+    return [match.span() for match in _SPAN_RE.finditer(text)]
@@ -0,0 +1,425 @@
+"""
+On-demand profiles of single requests.
+
+A request is profiled when it carries the admin token (X-Admin-Token equal to
+PROFILE_ADMIN_TOKEN) or is picked by PROFILE_SAMPLE_RATE. While it runs, a
+sampler thread records its stacks every PROFILE_INTERVAL seconds:
+
+  - on the event loop, the stacks of every task the request created (its
+    model calls, chunk tasks and so on). A task that is running counts as
+    CPU and wall time; a task that is suspended contributes its await chain,
+    ending in a "(waiting)" frame, to wall time only;
+  - in the render worker, the render call itself (the per-slide loop,
+    parse_markdown_text, the package save), with the worker thread's CPU time.
+    With RENDER_EXECUTOR=process this runs in the worker process and the
+    result travels back with the render.
+
+With PROFILE_MEMORY on, tracemalloc also runs for the request and the profile
+reports peak traced memory and the allocation sites that grew most. tracemalloc
+is process-wide, so these include concurrent requests, and it slows Python
+down noticeably while it runs.
+
+Finished profiles are kept in a ring buffer of PROFILE_BUFFER_SIZE and served
+as JSON or as collapsed stacks ("frame;frame;frame count" lines), which
+flamegraph.pl, speedscope and similar tools read. When no request is being
+profiled nothing is installed, so the cost is one header lookup per request.
+"""
+import os
+import sys
+import hmac
+import time
+import uuid
+import random
+import asyncio
+import logging
+import threading
+import tracemalloc
+import contextvars
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+# Profiling settings (override via environment)
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")  # empty disables the header and the admin endpoints
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # 0..1 share of requests profiled
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))  # seconds between stack samples
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+PROFILE_MEMORY = os.getenv("PROFILE_MEMORY", "true").lower() not in ("0", "false", "no")
+PROFILE_MAX_DEPTH = 64
+PROFILE_TOP_ALLOCATIONS = 15
+
+ADMIN_HEADER = "X-Admin-Token"
+
+_current = contextvars.ContextVar("current_profile", default=None)
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _thread_stack(frame, root=None):
+    """Frame names from the outermost frame (or `root`, when it is on the stack) to `frame`."""
+    names = []
+    while frame is not None and len(names) < PROFILE_MAX_DEPTH:
+        names.append(_frame_name(frame))
+        if frame is root:
+            break
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+def _await_stack(task):
+    """Frame names of a suspended task, from its coroutine down the await chain."""
+    names = []
+    coro = task.get_coro()
+    while coro is not None and len(names) < PROFILE_MAX_DEPTH:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        names.append(_frame_name(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    names.append("(waiting)")
+    return names
+
+
+class _Memory:
+    """Reference-counted tracemalloc session, shared by overlapping profiles in one process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = 0
+        self._started_here = False
+
+    def begin(self):
+        with self._lock:
+            if self._users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_here = True
+            self._users += 1
+            if hasattr(tracemalloc, "reset_peak"):  # Python 3.9+
+                tracemalloc.reset_peak()
+        return tracemalloc.take_snapshot()
+
+    def end(self, before) -> dict:
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            self._users -= 1
+            if self._users == 0 and self._started_here:
+                tracemalloc.stop()
+                self._started_here = False
+        growth = after.compare_to(before, "lineno")
+        growth = [stat for stat in growth if stat.size_diff > 0 or stat.count_diff > 0]
+        return {
+            "peak_traced_bytes": peak,
+            "traced_bytes": current,
+            "allocated_blocks": sum(max(0, stat.count_diff) for stat in growth),
+            "allocated_bytes": sum(max(0, stat.size_diff) for stat in growth),
+            "top_allocations": [
+                {
+                    "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "bytes": stat.size_diff,
+                    "blocks": stat.count_diff,
+                }
+                for stat in growth[:PROFILE_TOP_ALLOCATIONS]
+            ],
+        }
+
+
+_memory = _Memory()
+
+
+class _Sampler:
+    """One daemon thread per process sampling whatever is registered, and only while something is."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._targets = set()
+        self._thread = None
+
+    def add(self, target):
+        with self._lock:
+            self._targets.add(target)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+
+    def remove(self, target):
+        with self._lock:
+            self._targets.discard(target)
+
+    def _run(self):
+        while True:
+            time.sleep(PROFILE_INTERVAL)
+            with self._lock:
+                targets = list(self._targets)
+                if not targets:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for target in targets:
+                try:
+                    target.sample(frames)
+                except Exception as e:
+                    # A failed sample is dropped, never the profile; the first one per target is logged
+                    target.dropped += 1
+                    if target.dropped == 1:
+                        logging.warning(f"Profile sampler dropped a sample: {e}", exc_info=True)
+
+
+_sampler = _Sampler()
+
+
+class _ThreadTarget:
+    """Samples one thread below `root` (the frame that started profiling)."""
+
+    def __init__(self, thread_id, root):
+        self.thread_id = thread_id
+        self.root = root
+        self.stacks = Counter()
+        self.dropped = 0
+
+    def sample(self, frames):
+        frame = frames.get(self.thread_id)
+        if frame is not None:
+            self.stacks[";".join(_thread_stack(frame, self.root))] += 1
+
+
+class _LoopTarget:
+    """
+    Samples the tasks one request created on the event loop. The task being
+    stepped is the one whose coroutine frame is on the loop thread's stack.
+    """
+
+    def __init__(self, profile, thread_id):
+        self.profile = profile
+        self.thread_id = thread_id
+        self.dropped = 0
+
+    def sample(self, frames):
+        frame = frames.get(self.thread_id)
+        on_stack = set()
+        outer = frame
+        while outer is not None:
+            on_stack.add(id(outer))
+            outer = outer.f_back
+        for task in list(self.profile.tasks):
+            if task.done():
+                continue
+            coro_frame = getattr(task.get_coro(), "cr_frame", None)
+            if coro_frame is not None and id(coro_frame) in on_stack:
+                stack = ";".join(_thread_stack(frame, coro_frame))
+                self.profile.wall[stack] += 1
+                self.profile.cpu[stack] += 1
+            else:
+                self.profile.wall[";".join(_await_stack(task))] += 1
+
+
+class Profile:
+    """The stacks, timings and memory of one profiled request."""
+
+    def __init__(self, kind: str, subject: str, trigger: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.subject = subject
+        self.trigger = trigger
+        self.status = "running"
+        self.started_at = time.time()
+        self.wall_seconds = None
+        self.tasks = set()
+        self.wall = Counter()
+        self.cpu = Counter()
+        self.renders = []
+        self.memory = None
+
+    def add_render(self, render: dict):
+        """Merge a worker's render profile (see ProfiledCall)."""
+        for stack, count in render.pop("stacks").items():
+            stack = "[render];" + stack
+            self.wall[stack] += count
+            self.cpu[stack] += count
+        self.renders.append(render)
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "subject": self.subject,
+            "trigger": self.trigger,
+            "status": self.status,
+            "started_at": self.started_at,
+            "wall_seconds": self.wall_seconds,
+        }
+
+    def to_dict(self) -> dict:
+        def top(stacks, limit=25):
+            # Self samples by leaf frame
+            leaves = Counter()
+            for stack, count in stacks.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+            return [{"frame": frame, "samples": count} for frame, count in leaves.most_common(limit)]
+
+        profile = self.summary()
+        profile.update({
+            "interval": PROFILE_INTERVAL,
+            "samples": {"wall": sum(self.wall.values()), "cpu": sum(self.cpu.values())},
+            "loop_cpu_seconds": round(
+                sum(count for stack, count in self.cpu.items() if not stack.startswith("[render]"))
+                * PROFILE_INTERVAL, 4
+            ),
+            "renders": self.renders,
+            "memory": self.memory,
+            "top_wall": top(self.wall),
+            "top_cpu": top(self.cpu),
+        })
+        return profile
+
+    def collapsed(self, kind: str = "wall") -> str:
+        stacks = self.cpu if kind == "cpu" else self.wall
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class ProfileStore:
+    """Ring buffer of finished profiles, newest last."""
+
+    def __init__(self, size: int = 50):
+        self.size = max(1, size)
+        self._profiles = OrderedDict()
+
+    def add(self, profile: Profile):
+        self._profiles[profile.id] = profile
+        while len(self._profiles) > self.size:
+            self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str):
+        return self._profiles.get(profile_id)
+
+    def list(self):
+        return [profile.summary() for profile in reversed(self._profiles.values())]
+
+
+profile_store = ProfileStore(PROFILE_BUFFER_SIZE)
+
+_factory_loops = set()
+
+
+def _install_task_factory(loop):
+    """Register tasks created under a profile with it. Installed on the first profile only."""
+    if loop in _factory_loops:
+        return
+    previous = loop.get_task_factory()
+
+    def factory(loop, coro, **kwargs):
+        if previous is not None:
+            task = previous(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        profile = _current.get()
+        if profile is not None and profile.status == "running":
+            profile.tasks.add(task)
+        return task
+
+    loop.set_task_factory(factory)
+    _factory_loops.add(loop)
+
+
+def is_admin(headers) -> bool:
+    """True when the request carries the configured admin token (compared in constant time)."""
+    token = headers.get(ADMIN_HEADER)
+    if not PROFILE_ADMIN_TOKEN or token is None:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), PROFILE_ADMIN_TOKEN.encode("utf-8"))
+
+
+def should_profile(headers):
+    """The trigger ("admin" or "sampled") when this request should be profiled, else None."""
+    if is_admin(headers):
+        return "admin"
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+
+def current_profile():
+    return _current.get()
+
+
+@contextmanager
+def profile_request(headers, kind: str, subject: str):
+    """
+    Profile the work started inside the block when the request asks for it (see
+    should_profile); yields the Profile, or None when not profiling. Tasks must
+    be created inside the block to be sampled.
+    """
+    trigger = should_profile(headers)
+    if trigger is None:
+        yield None
+        return
+
+    loop = asyncio.get_running_loop()
+    _install_task_factory(loop)
+    profile = Profile(kind, subject, trigger)
+    target = _LoopTarget(profile, threading.get_ident())
+    token = _current.set(profile)
+    snapshot = _memory.begin() if PROFILE_MEMORY else None
+    start = time.perf_counter()
+    _sampler.add(target)
+    try:
+        yield profile
+        profile.status = "ok"
+    except BaseException as e:
+        profile.status = type(e).__name__
+        raise
+    finally:
+        _sampler.remove(target)
+        profile.wall_seconds = round(time.perf_counter() - start, 4)
+        if snapshot is not None:
+            profile.memory = _memory.end(snapshot)
+        _current.reset(token)
+        profile.tasks.clear()
+        profile_store.add(profile)
+        logging.info(f"Profiled {kind} {subject} as {profile.id} ({profile.wall_seconds}s, {trigger})")
+
+
+class ProfiledCall:
+    """
+    Picklable wrapper running a render function under the sampler in the worker.
+    Calling it returns (result, render profile) for Profile.add_render.
+    """
+
+    def __init__(self, fn, memory: bool = PROFILE_MEMORY):
+        self.fn = fn
+        self.memory = memory
+        self.__name__ = getattr(fn, "__name__", "render")
+
+    def __call__(self, *args):
+        target = _ThreadTarget(threading.get_ident(), sys._getframe())
+        snapshot = _memory.begin() if self.memory else None
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        _sampler.add(target)
+        try:
+            result = self.fn(*args)
+        finally:
+            _sampler.remove(target)
+            memory = _memory.end(snapshot) if snapshot is not None else None
+        render = {
+            "function": self.__name__,
+            "pid": os.getpid(),
+            "wall_seconds": round(time.perf_counter() - start, 4),
+            "cpu_seconds": round(time.thread_time() - cpu_start, 4),
+            "stacks": dict(target.stacks),
+            "memory": memory,
+        }
+        return result, render
+
+
+async def profiled_submit(submit, fn, *args):
+    """submit(fn, *args) on the render pool, profiled in the worker when this request is profiled."""
+    profile = _current.get()
+    if profile is None:
+        return await submit(fn, *args)
+    result, render = await submit(ProfiledCall(fn), *args)
+    profile.add_render(render)
+    return result
@@ -0,0 +1,65 @@
+import os
+import time
+
+from app.utils.metrics import gauge, histogram, BYTES_BUCKETS
+from app.utils.tracing import span
+
+DOWNLOAD_ROUTE = "/api/v1/presentations/{presentation_id}/download"
+
+http_in_flight = gauge("pptgen_http_requests_in_flight", "HTTP requests currently being handled.")
+http_latency = histogram(
+    "pptgen_http_request_seconds", "HTTP request latency until the response body is sent.",
+    ["method", "route", "status"]
+)
+download_latency = histogram(
+    "pptgen_download_seconds", "Latency of presentation downloads, including the file transfer.", ["status"]
+)
+download_bytes = histogram(
+    "pptgen_download_bytes", "Response body size of presentation downloads.", ["status"], buckets=BYTES_BUCKETS
+)
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware recording in-flight requests, latency per route and download
+    bytes, with a span around each request. Plain ASGI (rather than
+    BaseHTTPMiddleware) so file responses keep their zero-copy path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        sent = 0
+
+        async def send_wrapper(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            elif message["type"] == "http.response.pathsend":
+                sent += os.path.getsize(message["path"])
+            await send(message)
+
+        http_in_flight.inc()
+        start = time.perf_counter()
+        with span("http.request", **{"http.method": scope["method"], "url.path": scope["path"]}) as request_span:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                elapsed = time.perf_counter() - start
+                http_in_flight.dec()
+                route = scope.get("route")
+                # Label by route template, never the raw path, to keep cardinality bounded
+                route_path = getattr(route, "path", "unmatched")
+                request_span.set_attribute("http.route", route_path)
+                request_span.set_attribute("http.status_code", status)
+                http_latency.observe(elapsed, method=scope["method"], route=route_path, status=str(status))
+                if route_path == DOWNLOAD_ROUTE:
+                    download_latency.observe(elapsed, status=str(status))
+                    download_bytes.observe(sent, status=str(status))
@@ -1,16 +1,283 @@
-presentations = {}
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
 
-def save_presentation(presentation_id: str, slides: list):
-    presentations[presentation_id] = {
+# Storage settings (override via environment)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite")  # "sqlite" or "memory"
+STORAGE_PATH = os.getenv("STORAGE_PATH", os.path.join(os.getcwd(), "data", "presentations.sqlite3"))
+STORAGE_MAX_ENTRIES = int(os.getenv("STORAGE_MAX_ENTRIES", "10000"))  # memory backend only
+STORAGE_TTL = float(os.getenv("STORAGE_TTL", "0"))  # seconds, 0 keeps records forever
+STORAGE_PURGE_INTERVAL = float(os.getenv("STORAGE_PURGE_INTERVAL", "300"))
+# When false, decks are rendered in memory and never written to presentations/
+PERSIST_FILES = os.getenv("PERSIST_FILES", "true").lower() not in ("0", "false", "no")
+FILE_MEMORY_LIMIT = int(os.getenv("FILE_MEMORY_LIMIT", str(256 * 1024 * 1024)))  # bytes
+
+PRESENTATIONS_DIR = os.path.join(os.getcwd(), "presentations")
+
+
+def presentation_file_path(presentation_id: str) -> str:
+    """Path of the rendered .pptx for a presentation."""
+    return os.path.join(PRESENTATIONS_DIR, f"{presentation_id}.pptx")
+
+
+def temp_file_path(path: str) -> str:
+    """
+    A temporary name next to path, unique to this process and thread, so
+    concurrent renders of one deck never write to the same file.
+    """
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _remove_file(presentation_id: str):
+    memory_files.delete(presentation_id)
+    try:
+        os.remove(presentation_file_path(presentation_id))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logging.warning(f"Could not remove file for presentation {presentation_id}: {e}")
+
+
+class MemoryFileStore:
+    """
+    LRU store of rendered .pptx bytes, bounded by total size. Holds the decks
+    when PERSIST_FILES is off; evicted decks are re-rendered on download.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._files = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def put(self, presentation_id: str, data: bytes):
+        with self._lock:
+            previous = self._files.pop(presentation_id, None)
+            if previous is not None:
+                self._size -= len(previous)
+            if len(data) > self.max_bytes:
+                return
+            self._files[presentation_id] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._files.popitem(last=False)
+                self._size -= len(evicted)
+
+    def get(self, presentation_id: str):
+        with self._lock:
+            data = self._files.get(presentation_id)
+            if data is not None:
+                self._files.move_to_end(presentation_id)
+            return data
+
+    def delete(self, presentation_id: str):
+        with self._lock:
+            data = self._files.pop(presentation_id, None)
+            if data is not None:
+                self._size -= len(data)
+
+    def stats(self) -> dict:
+        return {"files": len(self._files), "bytes": self._size, "max_bytes": self.max_bytes}
+
+
+memory_files = MemoryFileStore(FILE_MEMORY_LIMIT)
+
+
+class MemoryStorage:
+    """In-process LRU-bounded store. State is per worker and lost on restart; meant for tests."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._records = OrderedDict()
+        self._created = {}
+        self._lock = threading.Lock()
+
+    def save(self, presentation_id: str, record: dict):
+        self.save_many([(presentation_id, record)])
+
+    def save_many(self, items):
+        now = time.time()
+        with self._lock:
+            for presentation_id, record in items:
+                self._records[presentation_id] = record
+                self._records.move_to_end(presentation_id)
+                self._created[presentation_id] = now
+            while len(self._records) > self.max_entries:
+                evicted, _ = self._records.popitem(last=False)
+                self._created.pop(evicted, None)
+
+    def get(self, presentation_id: str):
+        with self._lock:
+            record = self._records.get(presentation_id)
+            if record is not None:
+                self._records.move_to_end(presentation_id)
+            return record
+
+    def update(self, presentation_id: str, updates: dict):
+        with self._lock:
+            record = self._records.get(presentation_id)
+            if record is None:
+                return None
+            record.update(updates)
+            return record
+
+    def delete_older_than(self, cutoff: float) -> list:
+        with self._lock:
+            expired = [pid for pid, created in self._created.items() if created < cutoff]
+            for presentation_id in expired:
+                self._records.pop(presentation_id, None)
+                del self._created[presentation_id]
+            return expired
+
+    def count(self) -> int:
+        return len(self._records)
+
+
+class SqliteStorage:
+    """
+    Durable store shared by all workers on a host.
+
+    Runs sqlite in WAL mode so readers never block the writer, keeps one
+    connection per thread, and indexes records by id and creation time.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS presentations ("
+            "id TEXT PRIMARY KEY, data TEXT NOT NULL, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_presentations_created_at ON presentations (created_at)"
+        )
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def save(self, presentation_id: str, record: dict):
+        self.save_many([(presentation_id, record)])
+
+    def save_many(self, items):
+        """Write several records in a single transaction."""
+        now = time.time()
+        rows = [(pid, json.dumps(record), now, now) for pid, record in items]
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO presentations (id, data, created_at, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, presentation_id: str):
+        row = self._connection().execute(
+            "SELECT data FROM presentations WHERE id = ?", (presentation_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, presentation_id: str, updates: dict):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT data FROM presentations WHERE id = ?", (presentation_id,)
+            ).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                return None
+            record = json.loads(row[0])
+            record.update(updates)
+            conn.execute(
+                "UPDATE presentations SET data = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(record), time.time(), presentation_id),
+            )
+            conn.execute("COMMIT")
+            return record
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete_older_than(self, cutoff: float) -> list:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = [row[0] for row in conn.execute(
+                "SELECT id FROM presentations WHERE created_at < ?", (cutoff,)
+            )]
+            conn.execute("DELETE FROM presentations WHERE created_at < ?", (cutoff,))
+            conn.execute("COMMIT")
+            return expired
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM presentations").fetchone()[0]
+
+
+def create_storage(kind: str = STORAGE_BACKEND):
+    if kind == "memory":
+        return MemoryStorage(STORAGE_MAX_ENTRIES)
+    if kind == "sqlite":
+        return SqliteStorage(STORAGE_PATH)
+    raise ValueError(f"Unknown storage backend: {kind}")
+
+
+storage = create_storage()
+
+
+def save_presentation(presentation_id: str, slides: list, **extra):
+    storage.save(presentation_id, {
         "id": presentation_id,
-        "slides": slides
-    }
+        "slides": slides,
+        **extra
+    })
+
+def save_presentations(items):
+    """Save several (presentation_id, slides, extra_fields) triples in one batch."""
+    storage.save_many([
+        (presentation_id, {"id": presentation_id, "slides": slides, **extra})
+        for presentation_id, slides, extra in items
+    ])
 
 def get_presentation(presentation_id: str):
-    return presentations.get(presentation_id)
+    return storage.get(presentation_id)
 
 def update_presentation(presentation_id: str, updates: dict):
-    if presentation_id in presentations:
-        presentations[presentation_id].update(updates)
-        return presentations[presentation_id]
-    return None
\ No newline at end of file
+    return storage.update(presentation_id, updates)
+
+def save_file_bytes(presentation_id: str, data: bytes):
+    memory_files.put(presentation_id, data)
+
+def get_file_bytes(presentation_id: str):
+    return memory_files.get(presentation_id)
+
+def purge_expired(ttl: float = STORAGE_TTL):
+    """Delete records older than ttl seconds along with their .pptx files."""
+    if ttl <= 0:
+        return 0
+    expired = storage.delete_older_than(time.time() - ttl)
+    for presentation_id in expired:
+        _remove_file(presentation_id)
+    if expired:
+        logging.info(f"Purged {len(expired)} expired presentations")
+    return len(expired)
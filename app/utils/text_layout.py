@@ -0,0 +1,256 @@
+"""
+Text measurement and fitting without rendering.
+
+Glyph advance widths come from static per-font tables (in 1/1000 em), so
+measuring a bullet is a table lookup per character and a greedy line wrap per
+candidate font size. Arial is metric-compatible with Helvetica, so the
+Helvetica AFM widths below are exact for the fonts the slides use; Consolas is
+monospaced. The tables are expanded once per process and word widths are
+cached, so fitting a whole deck costs milliseconds.
+"""
+import os
+import math
+import unicodedata
+from functools import lru_cache
+from typing import NamedTuple
+
+from app.utils.markdown import tokenize_markdown, formatted_spans
+
+# Layout settings (override via environment)
+TEXT_LAYOUT_CACHE_SIZE = int(os.getenv("TEXT_LAYOUT_CACHE_SIZE", "8192"))
+
+# Advance widths of printable ASCII (32..126), 1/1000 em
+_HELVETICA = (
+    "278 278 355 556 556 889 667 191 333 333 389 584 278 333 278 278 556 556 556 556 556 556 556 556 "
+    "556 556 278 278 584 584 584 556 1015 667 667 722 722 667 611 778 722 278 500 667 556 833 722 778 "
+    "667 778 722 667 611 722 667 944 667 667 611 278 278 278 469 556 333 556 556 500 556 556 278 556 "
+    "556 222 222 500 222 833 556 556 556 556 333 500 278 556 500 722 500 500 500 334 260 334 584"
+)
+_HELVETICA_BOLD = (
+    "278 333 474 556 556 889 722 238 333 333 389 584 278 333 278 278 556 556 556 556 556 556 556 556 "
+    "556 556 333 333 584 584 584 611 975 722 722 722 722 667 611 778 722 278 556 722 611 833 722 778 "
+    "667 778 722 667 611 722 667 944 667 667 611 333 278 333 584 556 333 556 611 556 611 556 333 611 "
+    "611 278 278 556 278 889 611 611 611 611 389 556 333 611 556 778 556 556 500 389 280 389 584"
+)
+_CONSOLAS = 0.55
+
+# Common punctuation outside ASCII: (regular, bold)
+_EXTRA = {
+    "\u00a0": (278, 278), "•": (350, 350), "–": (556, 556), "—": (1000, 1000),
+    "…": (1000, 1000), "‘": (222, 278), "’": (222, 278), "“": (333, 500),
+    "”": (333, 500), "€": (556, 556), "·": (278, 278), "«": (556, 556),
+    "»": (556, 556), "°": (400, 400), "©": (737, 737), "®": (737, 737),
+}
+
+# Characters below this code point are looked up in the expanded tables
+_TABLE_SIZE = 0x0250
+
+
+def _expand(ascii_widths, bold):
+    """Build a width list for code points 0.._TABLE_SIZE from the ASCII table."""
+    base = [int(width) / 1000 for width in ascii_widths.split()]
+    average = base[ord("n") - 32]
+    table = []
+    for code in range(_TABLE_SIZE):
+        char = chr(code)
+        if 32 <= code < 127:
+            table.append(base[code - 32])
+        elif char in _EXTRA:
+            table.append(_EXTRA[char][bold] / 1000)
+        elif unicodedata.category(char).startswith("C"):
+            table.append(0.0)
+        else:
+            # Accented letters are as wide as their base letter
+            letter = unicodedata.normalize("NFD", char)[0]
+            table.append(base[ord(letter) - 32] if 32 <= ord(letter) < 127 else average)
+    return table, average
+
+
+_REGULAR, _REGULAR_AVERAGE = _expand(_HELVETICA, bold=False)
+_BOLD, _BOLD_AVERAGE = _expand(_HELVETICA_BOLD, bold=True)
+SPACE_WIDTH = _REGULAR[32]
+
+
+@lru_cache(maxsize=4096)
+def _wide_char_width(char, average):
+    if unicodedata.combining(char):
+        return 0.0
+    if unicodedata.east_asian_width(char) in ("W", "F"):
+        return 1.0
+    return average
+
+
+def text_width(text: str, bold: bool = False, code: bool = False) -> float:
+    """Advance width of text in em (multiply by the font size for points)."""
+    if not text:
+        return 0.0
+    if code:
+        return sum(
+            _CONSOLAS if ord(char) < _TABLE_SIZE else _wide_char_width(char, _CONSOLAS) for char in text
+        )
+    table, average = (_BOLD, _BOLD_AVERAGE) if bold else (_REGULAR, _REGULAR_AVERAGE)
+    if ord(max(text)) < _TABLE_SIZE:
+        return sum(map(table.__getitem__, map(ord, text)))
+    return sum(
+        table[ord(char)] if ord(char) < _TABLE_SIZE else _wide_char_width(char, average) for char in text
+    )
+
+
+# Words recur across bullets and decks, so their widths are cached too
+_word_width = lru_cache(maxsize=TEXT_LAYOUT_CACHE_SIZE)(text_width)
+
+
+@lru_cache(maxsize=TEXT_LAYOUT_CACHE_SIZE)
+def word_widths(text: str, markdown: bool = True, bold: bool = False) -> tuple:
+    """
+    Widths (em) of the space-separated words of a paragraph. With markdown the
+    text is measured as rendered: markers removed, bold and code runs in their
+    own fonts. A word may span several formatted segments.
+    """
+    segments = tokenize_markdown(text) if markdown else ((text, bold, False, False),)
+    widths = []
+    current = 0.0
+    started = False
+    for segment in segments:
+        seg_text, seg_bold, _, seg_code = segment[:4]
+        for n, part in enumerate(seg_text.split(" ")):
+            if n and started:
+                widths.append(current)
+                current = 0.0
+                started = False
+            if part:
+                current += _word_width(part, seg_bold, seg_code)
+                started = True
+    if started:
+        widths.append(current)
+    return tuple(widths)
+
+
+def count_lines(words: tuple, width: float, indent: float = 0.0) -> int:
+    """
+    Lines taken by greedily wrapping words (em) into a line width (em), with the
+    first line starting after an indent such as a bullet symbol. Words longer
+    than a line are broken between characters, as PowerPoint does.
+    """
+    lines = 1
+    x = indent
+    started = False
+    for word in words:
+        if started and x + SPACE_WIDTH + word > width:
+            lines += 1
+            x = word
+        else:
+            x += SPACE_WIDTH + word if started else word
+        if x > width:
+            extra = math.ceil(x / width) - 1
+            lines += extra
+            x -= extra * width
+        started = True
+    return lines
+
+
+class ParagraphStyle(NamedTuple):
+    """How a paragraph is laid out: spacing in points, the rest relative to the font size."""
+
+    line_height: float = 1.2     # line pitch as a multiple of the font size
+    space_before: float = 0.0    # points
+    space_after: float = 0.0     # points
+    indent: float = 0.0          # em taken on the first line by a prefix such as a bullet
+    first_line: float = 1.0      # first line height relative to the others (larger bullet run)
+    markdown: bool = True
+    bold: bool = False           # base weight for text without markdown
+
+
+def paragraph_heights(paragraphs, width: float, size: float, style: ParagraphStyle) -> list:
+    """Height in points of each paragraph set at a font size in a box width (points)."""
+    width_em = width / size
+    line = size * style.line_height
+    spacing = style.space_before + style.space_after
+    return [
+        spacing + line * (count_lines(word_widths(text, style.markdown, style.bold), width_em, style.indent)
+                          - 1 + style.first_line)
+        for text in paragraphs
+    ]
+
+
+def text_height(paragraphs, width: float, size: float, style: ParagraphStyle) -> float:
+    """Height in points of the paragraphs set at a font size in a box width (points)."""
+    return sum(paragraph_heights(paragraphs, width, size, style))
+
+
+def fits(paragraphs, width: float, height: float, size: float, style: ParagraphStyle) -> bool:
+    return text_height(paragraphs, width, size, style) <= height
+
+
+def largest_fitting_size(paragraphs, width: float, height: float, min_size: int, max_size: int,
+                         style: ParagraphStyle):
+    """
+    Largest whole point size in min_size..max_size at which the paragraphs fit
+    the box, or None when they do not fit even at min_size. Wrapped text grows
+    roughly with the square of the font size, so the search starts from that
+    estimate and usually settles within two or three measurements.
+    """
+    min_height = text_height(paragraphs, width, min_size, style)
+    if min_height > height:
+        return None
+    size = max(min_size, min(max_size, int(min_size * math.sqrt(height / min_height)) if min_height else max_size))
+    if size == min_size or fits(paragraphs, width, height, size, style):
+        while size < max_size and fits(paragraphs, width, height, size + 1, style):
+            size += 1
+    else:
+        size -= 1
+        while size > min_size and not fits(paragraphs, width, height, size, style):
+            size -= 1
+    return size
+
+
+def split_text(text: str, width: float, height: float, size: float, style: ParagraphStyle) -> list:
+    """
+    Split one paragraph that is too tall for the box into pieces that each fit.
+    Breaks only at spaces outside formatted spans, so markup stays balanced; a
+    single unbreakable run longer than the box becomes its own piece. Each
+    piece is found by galloping then binary searching over the break points
+    from where the last one ended, so only text near the piece is measured.
+    """
+    spans = formatted_spans(text) if style.markdown else []
+    breaks = []
+    span_index = 0
+    for position, char in enumerate(text):
+        if char != " ":
+            continue
+        while span_index < len(spans) and spans[span_index][1] <= position:
+            span_index += 1
+        if span_index < len(spans) and spans[span_index][0] <= position:
+            continue
+        breaks.append(position)
+    # The end of the text closes the last piece
+    breaks.append(len(text))
+    last = len(breaks) - 1
+
+    pieces = []
+    start = 0
+    first = 0
+    while first <= last:
+        def fit(index):
+            return fits([text[start:breaks[index]]], width, height, size, style)
+
+        # Longest prefix ending at a break that still fits: double the step
+        # until a prefix is too tall, then binary search the last interval
+        good = first
+        if fit(first):
+            step = 1
+            while good + step <= last and fit(good + step):
+                good += step
+                step *= 2
+            low, high = good + 1, min(good + step, last + 1)
+            while low < high:
+                middle = (low + high) // 2
+                if fit(middle):
+                    good, low = middle, middle + 1
+                else:
+                    high = middle
+        end = breaks[good]
+        pieces.append(text[start:end].strip(" "))
+        start = end + 1
+        first = good + 1
+    return [piece for piece in pieces if piece] or [text]
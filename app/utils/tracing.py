@@ -0,0 +1,94 @@
+"""
+Timing spans around pipeline stages.
+
+TRACING selects where spans go:
+  off   no spans; span() returns a shared no-op object (the default)
+  log   each finished span is logged as one JSON line using OpenTelemetry
+        field names (trace_id, span_id, parent_span_id, *_unix_nano), so
+        no collector is needed
+  otel  spans are created through the opentelemetry-api package, for use
+        with whatever SDK/exporter the deployment configures
+"""
+import os
+import json
+import time
+import logging
+import contextvars
+
+# Tracing settings (override via environment)
+TRACING = os.getenv("TRACING", "off").lower()  # "off", "log" or "otel"
+
+span_logger = logging.getLogger("app.tracing")
+
+_current = contextvars.ContextVar("current_span", default=None)
+_otel_tracer = None
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _LogSpan:
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self._token = None
+
+    def __enter__(self):
+        parent = _current.get()
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.parent_span_id = parent.span_id if parent else None
+        self.span_id = os.urandom(8).hex()
+        self.start = time.time_ns()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.time_ns()
+        _current.reset(self._token)
+        record = {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "start_time_unix_nano": self.start,
+            "end_time_unix_nano": end,
+            "duration_ms": round((end - self.start) / 1e6, 3),
+            "status": "ERROR" if exc_type else "OK",
+            "attributes": self.attributes,
+        }
+        if exc_type:
+            record["exception"] = f"{exc_type.__name__}: {exc}"
+        span_logger.info(json.dumps(record, default=str))
+        return False
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+
+def _get_otel_tracer():
+    global _otel_tracer
+    if _otel_tracer is None:
+        from opentelemetry import trace
+        _otel_tracer = trace.get_tracer("pptgen")
+    return _otel_tracer
+
+
+def span(name: str, **attributes):
+    """Context manager timing one stage. Cheap no-op unless TRACING is enabled."""
+    if TRACING == "off":
+        return _NOOP_SPAN
+    if TRACING == "otel":
+        return _get_otel_tracer().start_as_current_span(name, attributes=attributes)
+    return _LogSpan(name, attributes)
+
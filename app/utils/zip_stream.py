@@ -0,0 +1,46 @@
+import zipfile
+
+
+class _ChunkBuffer:
+    """Write-only, unseekable sink that collects bytes until they are drained."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ZipStreamWriter:
+    """
+    Builds a zip archive incrementally for streaming responses.
+
+    Each add_* call returns the archive bytes produced so far, so at most one
+    member is buffered at a time. Members are stored without recompression
+    because .pptx files are already zip-compressed.
+    """
+
+    def __init__(self):
+        self._buffer = _ChunkBuffer()
+        self._zip = zipfile.ZipFile(self._buffer, "w", compression=zipfile.ZIP_STORED)
+
+    def add_file(self, path: str, arcname: str) -> bytes:
+        self._zip.write(path, arcname)
+        return self._buffer.drain()
+
+    def add_bytes(self, arcname: str, data: bytes) -> bytes:
+        self._zip.writestr(arcname, data)
+        return self._buffer.drain()
+
+    def close(self) -> bytes:
+        self._zip.close()
+        return self._buffer.drain()
@@ -0,0 +1,156 @@
+"""
+Slide images: time, file size and memory per deck, naive embedding vs the image cache.
+
+Every slide of --decks decks of --slides slides shows one of --photos large
+photos plus the same logo. The naive case adds the original files with
+python-pptx's add_picture, which reads each one whole into memory, and
+embeds them at full resolution. The cached case renders through the package
+writer: images are scaled to their slide size once, through the on-disk image
+cache, and every distinct one is streamed into the package once. The first
+cached deck decodes the photos (cold); the rest only hash them (warm). Each
+case runs in a fresh interpreter and reports how far peak RSS rose while
+rendering.
+
+Usage:
+    python -m benchmarks.bench_images [--decks 10] [--slides 20] [--photos 5]
+                                      [--output images.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import subprocess
+
+from benchmarks.environment import environment
+from benchmarks.load import peak_rss_mb
+
+
+def make_images(directory, photos):
+    """Write `photos` noisy 4000x3000 JPEGs (a few MB each, like camera output) and a PNG logo."""
+    from PIL import Image
+
+    for n in range(photos):
+        noise = [Image.effect_noise((4000, 3000), 40 + n) for _ in range(3)]
+        gradient = Image.linear_gradient("L").resize((4000, 3000))
+        channels = [Image.blend(channel, gradient, 0.5) for channel in noise]
+        Image.merge("RGB", channels).save(os.path.join(directory, f"photo{n}.jpg"), quality=90)
+    Image.new("RGBA", (1200, 400), (255, 255, 255, 160)).save(os.path.join(directory, "logo.png"))
+
+
+def deck(photos, logo, num_slides, n):
+    return [
+        {"title": f"Deck {n} slide {i + 1}", "content": ["A point", "Another point"],
+         "image": photos[i % len(photos)], "logo": logo}
+        for i in range(num_slides)
+    ]
+
+
+def render_naive(content, path, image_dir):
+    from app.services.slide_generator import create_presentation_object, add_slide, PICTURE_BOXES
+
+    prs = create_presentation_object()
+    for i, slide_content in enumerate(content):
+        slide = add_slide(prs, slide_content, i, pictures=[])
+        for kind in ("image", "logo"):
+            left, top, width, height = PICTURE_BOXES[kind]
+            slide.shapes.add_picture(os.path.join(image_dir, slide_content[kind]), left, top, height=height)
+    prs.save(path)
+
+
+def measure(case, image_dir, num_decks, num_slides):
+    """Runs in the child: render the decks and report times, sizes and peak RSS growth."""
+    from app.services import image_cache
+    from app.services.slide_generator import warm_up_renderer
+    from app.services.ooxml_renderer import write_package
+
+    photos = sorted(name for name in os.listdir(image_dir) if name.startswith("photo"))
+    logo = "logo.png"
+    workdir = tempfile.mkdtemp(prefix="bench_images_")
+    try:
+        image_cache.IMAGE_DIR = image_dir
+        image_cache.image_cache.directory = os.path.join(workdir, "cache")
+
+        logging.disable(logging.INFO)
+        warm_up_renderer()
+        write_package([{"title": "Warm-up", "content": ["text"]}], os.path.join(workdir, "warmup.pptx"))
+        baseline = peak_rss_mb()
+
+        times, sizes = [], []
+        for n in range(num_decks):
+            path = os.path.join(workdir, f"deck{n}.pptx")
+            content = deck(photos, logo, num_slides, n)
+            start = time.perf_counter()
+            if case == "naive":
+                render_naive(content, path, image_dir)
+            else:
+                with open(path, "wb") as fp:
+                    write_package(content, fp, "pptx")
+            times.append(time.perf_counter() - start)
+            sizes.append(os.path.getsize(path))
+            os.remove(path)
+
+        warm = sorted(times[1:]) or times
+        return {
+            "name": f"images_{case}", "decks": num_decks, "slides": num_slides, "photos": len(photos),
+            "total_s": round(sum(times), 3),
+            "first_deck_ms": round(times[0] * 1000, 1),
+            "warm_median_ms": round(warm[len(warm) // 2] * 1000, 1),
+            "deck_bytes": sizes[-1],
+            "rss_growth_mb": round(peak_rss_mb() - baseline, 1),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_case(case, image_dir, args):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_images", "--child", case, image_dir,
+         "--decks", str(args.decks), "--slides", str(args.slides)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--decks", type=int, default=10)
+    parser.add_argument("--slides", type=int, default=20)
+    parser.add_argument("--photos", type=int, default=5)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--child", nargs=2, metavar=("CASE", "IMAGE_DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(*args.child, args.decks, args.slides)))
+        return
+
+    # Made here, so building the sources does not count towards a case's peak RSS
+    image_dir = tempfile.mkdtemp(prefix="bench_images_sources_")
+    try:
+        make_images(image_dir, max(1, args.photos))
+        results = []
+        for case in ("naive", "cached"):
+            result = run_case(case, image_dir, args)
+            print(json.dumps(result), file=sys.stderr)
+            results.append(result)
+    finally:
+        shutil.rmtree(image_dir, ignore_errors=True)
+
+    report = {
+        "benchmark": "images", "environment": environment(),
+        "config": {name: value for name, value in vars(args).items() if name != "child"},
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
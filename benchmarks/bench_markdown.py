@@ -0,0 +1,96 @@
+"""
+Markdown tokenizer: equivalence check against the previous parser, and speed.
+
+Generates random bullets from the subset the previous character-by-character
+parser supported (plain text with balanced, non-nested **bold** and *italic*)
+and checks that parse_markdown_text still returns exactly the same segments.
+Then times both parsers on markup-dense and prose-like bullets of several
+lengths, with and without the segment cache. Uncached, the tokenizer is about
+4x faster on long prose-like bullets but only 1-1.5x on markup-dense ones; the
+large speedups come from the cache. The reference parser and the bullet
+generators live in tests/markdown_reference.py.
+Exits 1 on any mismatch.
+
+Usage:
+    python -m benchmarks.bench_markdown [--cases 5000] [--seed 0] [--length 150 2000]
+"""
+import sys
+import json
+import time
+import random
+import argparse
+
+from app.services.slide_generator import parse_markdown_text
+from app.utils.markdown import tokenize_markdown
+from tests.markdown_reference import CORPORA, legacy_parse_markdown_text, random_bullet
+
+
+def check_equivalence(cases, seed):
+    rng = random.Random(seed)
+    mismatches = []
+    for n in range(cases):
+        text = random_bullet(rng, **CORPORA["dense" if n % 2 else "prose"])
+        expected = legacy_parse_markdown_text(text)
+        actual = parse_markdown_text(text)
+        if actual != expected:
+            mismatches.append({"text": text, "expected": expected, "actual": actual})
+    return mismatches
+
+
+def per_call_us(fn, texts, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best / len(texts) * 1e6
+
+
+def bench_speed(corpus, length, seed):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(50):
+        text = ""
+        while len(text) < length:
+            text += random_bullet(rng, **CORPORA[corpus]) + " "
+        texts.append(text)
+
+    legacy = per_call_us(legacy_parse_markdown_text, texts)
+
+    tokenizer = per_call_us(tokenize_markdown.__wrapped__, texts)
+    tokenize_markdown.cache_clear()
+    cached = per_call_us(tokenize_markdown, texts)
+    return {
+        "corpus": corpus,
+        "bullet_length": length,
+        "legacy_us": round(legacy, 2),
+        "tokenizer_us": round(tokenizer, 2),
+        "tokenizer_cached_us": round(cached, 3),
+        "speedup": round(legacy / tokenizer, 1),
+        "speedup_cached": round(legacy / cached, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--length", type=int, nargs="+", default=[150, 2000])
+    args = parser.parse_args()
+
+    mismatches = check_equivalence(args.cases, args.seed)
+    report = {
+        "equivalence": {"cases": args.cases, "seed": args.seed, "mismatches": len(mismatches)},
+        "speed": [
+            bench_speed(corpus, length, args.seed) for corpus in CORPORA for length in args.length
+        ],
+    }
+    if mismatches:
+        report["equivalence"]["examples"] = mismatches[:5]
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
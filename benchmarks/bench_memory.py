@@ -0,0 +1,91 @@
+"""
+Peak memory of rendering a deck, as slide count grows.
+
+Each (engine, slides) case renders one deck to a file in a fresh interpreter
+and reports how far peak RSS rose above the warmed-up process, with the slide
+content already built. Slides are streamed into the package, so growth should
+stay roughly flat; any case above --max-growth-mb fails the run (exit 1), which
+makes this the memory regression check for large decks.
+
+Usage:
+    python -m benchmarks.bench_memory [--slides 100 1000 3000] [--engine pptx ooxml]
+                                      [--max-growth-mb 64] [--output memory.json]
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+import tempfile
+import subprocess
+
+from benchmarks.environment import environment
+from benchmarks.load import peak_rss_mb
+
+
+def measure(engine, num_slides):
+    """Runs in the child: render one deck and return (baseline, peak) RSS in MB."""
+    from app.utils import storage
+    from app.services.slide_generator import get_renderer, warm_up_renderer
+    from benchmarks.bench_render import sample_content
+
+    storage.PRESENTATIONS_DIR = tempfile.mkdtemp(prefix="bench_memory_")
+    logging.disable(logging.INFO)
+    warm_up_renderer()
+    render = get_renderer(engine)
+    render(sample_content(2), "warmup")
+    content = sample_content(num_slides)
+    baseline = peak_rss_mb()
+    render(content, "deck")
+    return baseline, peak_rss_mb()
+
+
+def run_case(engine, num_slides):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_memory", "--child", engine, str(num_slides)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    baseline, peak = json.loads(output)
+    return {
+        "name": f"render_{engine}", "slides": num_slides,
+        "peak_rss_mb": peak, "growth_mb": round(peak - baseline, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--slides", type=int, nargs="+", default=[100, 1000, 3000])
+    parser.add_argument("--engine", nargs="+", default=["pptx", "ooxml"])
+    parser.add_argument("--max-growth-mb", type=float, default=64.0,
+                        help="Fail when rendering one deck raises peak RSS by more than this")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--child", nargs=2, metavar=("ENGINE", "SLIDES"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child[0], int(args.child[1]))))
+        return
+
+    results = []
+    for engine in args.engine:
+        for num_slides in args.slides:
+            result = run_case(engine, num_slides)
+            result["within_limit"] = result["growth_mb"] <= args.max_growth_mb
+            print(json.dumps(result), file=sys.stderr)
+            results.append(result)
+
+    report = {
+        "benchmark": "memory", "environment": environment(),
+        "config": {"max_growth_mb": args.max_growth_mb}, "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    if not all(result["within_limit"] for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Micro-benchmarks for the render hot spots at several deck sizes.
+
+Times parse_markdown_text over every bullet of a deck, set_gradient_background
+on every slide, text fitting (layout_deck + fit_slide, with cold and warm
+metric caches), and a full generate_slides (build + save). Each measurement is
+repeated and reported as best and median milliseconds so runs on different
+commits can be compared with benchmarks.compare_results.
+
+Usage:
+    python -m benchmarks.bench_micro [--slides 5 50 500] [--repeat 5] [--output micro.json]
+"""
+import json
+import time
+import logging
+import argparse
+import tempfile
+import statistics
+
+from app.services.slide_generator import (
+    COLOR_PALETTES, create_presentation_object, parse_markdown_text,
+    set_gradient_background, generate_slides, layout_deck, fit_slide, _fit_sizes
+)
+from app.utils import storage, text_layout
+from benchmarks.bench_render import sample_content
+from benchmarks.environment import environment
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"best_ms": round(min(samples), 3), "median_ms": round(statistics.median(samples), 3)}
+
+
+def bench_parse_markdown(content, repeat):
+    points = [point for slide in content for point in slide["content"]]
+
+    def run():
+        for point in points:
+            parse_markdown_text(point)
+
+    return timed(run, repeat)
+
+
+def bench_gradient(num_slides, repeat):
+    prs = create_presentation_object()
+    slides = [prs.slides.add_slide(prs.slide_layouts[6]) for _ in range(num_slides)]
+
+    def run():
+        for i, slide in enumerate(slides):
+            color1, color2 = COLOR_PALETTES[i % len(COLOR_PALETTES)]
+            set_gradient_background(slide, color1, color2)
+
+    return timed(run, repeat)
+
+
+def bench_fit(content, repeat, cold):
+    def run():
+        if cold:
+            _fit_sizes.cache_clear()
+            text_layout.word_widths.cache_clear()
+            text_layout._word_width.cache_clear()
+        for i, slide_content in enumerate(layout_deck(content)):
+            fit_slide(slide_content, i)
+
+    return timed(run, repeat)
+
+
+def bench_generate_slides(content, repeat):
+    return timed(lambda: generate_slides(content, "bench_micro"), repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--slides", type=int, nargs="+", default=[5, 50, 500])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    # Keep rendered decks out of the repository's presentations/ directory
+    storage.PRESENTATIONS_DIR = tempfile.mkdtemp(prefix="bench_micro_")
+    logging.disable(logging.INFO)
+
+    # Warm the per-process template and skeleton caches before timing
+    generate_slides(sample_content(1), "bench_micro")
+
+    results = []
+    for num_slides in args.slides:
+        content = sample_content(num_slides)
+        results += [
+            {"name": "parse_markdown_text", "slides": num_slides, **bench_parse_markdown(content, args.repeat)},
+            {"name": "set_gradient_background", "slides": num_slides, **bench_gradient(num_slides, args.repeat)},
+            {"name": "fit_text_cold", "slides": num_slides, **bench_fit(content, args.repeat, cold=True)},
+            {"name": "fit_text_warm", "slides": num_slides, **bench_fit(content, args.repeat, cold=False)},
+            {"name": "generate_slides", "slides": num_slides, **bench_generate_slides(content, args.repeat)},
+        ]
+
+    report = {"benchmark": "micro", "environment": environment(), "results": results}
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
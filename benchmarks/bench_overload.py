@@ -0,0 +1,185 @@
+"""
+Overload behaviour: creates arriving faster than a slowed-down upstream can serve.
+
+Starts the API server against the fake model, which serves only
+FAKE_GEMINI_CAPACITY calls at once (the rest queue, as an overloaded upstream
+would) and slows down by FAKE_GEMINI_SPIKE_LATENCY for FAKE_GEMINI_SPIKE_DURATION
+seconds of every FAKE_GEMINI_SPIKE_PERIOD. Creates arrive open-loop at --rate
+per second while a probe calls GET /health every 50 ms. Each case runs once
+with the adaptive limit on and once with it off (ADMISSION_LIMIT). It reports
+created/shed counts, create latency, the most creates in flight at once,
+/health latency and the range the limit moved through.
+
+Usage:
+    python -m benchmarks.bench_overload [--rate 20] [--duration 40] [--output overload.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+import httpx
+
+from benchmarks.environment import environment
+from benchmarks.load import percentile
+
+SERVER_ENV = {
+    "GEMINI_BACKEND": "fake",
+    "FAKE_GEMINI_LATENCY": "0.2",
+    "FAKE_GEMINI_JITTER": "0.05",
+    "FAKE_GEMINI_SEED": "0",
+    "FAKE_GEMINI_CAPACITY": "8",
+    "FAKE_GEMINI_SPIKE_PERIOD": "20",
+    "FAKE_GEMINI_SPIKE_DURATION": "6",
+    "FAKE_GEMINI_SPIKE_LATENCY": "0.8",
+    "CONTENT_CACHE_BACKEND": "none",
+    "STORAGE_BACKEND": "memory",
+    "LLM_HEDGE": "false",
+}
+
+
+def start_server(port, admission, workdir):
+    env = dict(os.environ)
+    for name, value in SERVER_ENV.items():
+        env.setdefault(name, value)
+    env["ADMISSION_LIMIT"] = "true" if admission else "false"
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+async def wait_ready(client, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not become ready")
+
+
+def read_gauge(text, name):
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.split()[1])
+    return None
+
+
+async def run_case(admission, args, port):
+    workdir = tempfile.mkdtemp(prefix="bench_overload_")
+    server = start_server(port, admission, workdir)
+    limits = httpx.Limits(max_connections=2000, max_keepalive_connections=200)
+    created, shed, failed, create_latency, health_latency, limit_values = 0, 0, 0, [], [], []
+    in_flight = {"now": 0, "peak": 0}
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120, limits=limits) as client:
+            await wait_ready(client)
+            start = time.monotonic()
+            stop_at = start + args.duration
+
+            async def create(n):
+                nonlocal created, shed, failed
+                in_flight["now"] += 1
+                in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+                sent = time.perf_counter()
+                try:
+                    response = await client.post(
+                        "/api/v1/presentations", json={"topic": f"Overload {n}", "num_slides": args.slides}
+                    )
+                    if response.status_code == 201:
+                        created += 1
+                        create_latency.append(time.perf_counter() - sent)
+                    elif response.status_code == 503:
+                        shed += 1
+                    else:
+                        failed += 1
+                except httpx.HTTPError:
+                    failed += 1
+                finally:
+                    in_flight["now"] -= 1
+
+            async def probe():
+                while time.monotonic() < stop_at:
+                    sent = time.perf_counter()
+                    await client.get("/health")
+                    health_latency.append(time.perf_counter() - sent)
+                    await asyncio.sleep(0.05)
+
+            async def watch_limit():
+                while time.monotonic() < stop_at:
+                    value = read_gauge((await client.get("/metrics")).text, "pptgen_admission_limit")
+                    if value is not None:
+                        limit_values.append(value)
+                    await asyncio.sleep(0.5)
+
+            background = [asyncio.ensure_future(probe()), asyncio.ensure_future(watch_limit())]
+            tasks = []
+            n = 0
+            while time.monotonic() < stop_at:
+                tasks.append(asyncio.ensure_future(create(n)))
+                n += 1
+                # Open loop: arrivals keep their schedule however slow responses get
+                await asyncio.sleep(max(0.0, start + n / args.rate - time.monotonic()))
+            await asyncio.gather(*background)
+            await asyncio.gather(*tasks)
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    create_latency.sort()
+    health_latency.sort()
+    ms = lambda value: round(value * 1000, 1) if value is not None else None
+    return {
+        "name": "admission_on" if admission else "admission_off",
+        "sent": n, "created": created, "shed_503": shed, "failed": failed,
+        "create_p50_ms": ms(percentile(create_latency, 0.5)),
+        "create_p99_ms": ms(percentile(create_latency, 0.99)),
+        "create_max_ms": ms(create_latency[-1] if create_latency else None),
+        "peak_creates_in_flight": in_flight["peak"],
+        "health_p50_ms": ms(percentile(health_latency, 0.5)),
+        "health_p99_ms": ms(percentile(health_latency, 0.99)),
+        "limit_min": min(limit_values) if limit_values and admission else None,
+        "limit_max": max(limit_values) if limit_values and admission else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rate", type=float, default=20.0, help="Create requests per second")
+    parser.add_argument("--duration", type=float, default=40.0, help="Seconds of arrivals per case")
+    parser.add_argument("--slides", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--admission", nargs="+", choices=["on", "off"], default=["off", "on"])
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    results = []
+    for case in args.admission:
+        result = asyncio.run(run_case(case == "on", args, args.port))
+        print(json.dumps(result), file=sys.stderr)
+        results.append(result)
+
+    report = {
+        "benchmark": "overload", "environment": environment(),
+        "config": {**vars(args), "server_env": {name: os.getenv(name, value) for name, value in SERVER_ENV.items()}},
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Per-slide render cost of generate_slides.
+
+Usage:
+    python -m benchmarks.bench_render [--slides 5 50] [--repeat 5]
+"""
+import os
+import io
+import json
+import time
+import argparse
+import tempfile
+
+from app.services.slide_generator import create_presentation_object, add_slide
+
+
+def sample_content(num_slides):
+    return [
+        {
+            "title": f"Slide {i + 1}: Key Concepts",
+            "content": [
+                f"**Point {j + 1}:** an explanation with *emphasis* and some detail" for j in range(5)
+            ],
+        }
+        for i in range(num_slides)
+    ]
+
+
+def bench(num_slides, repeat):
+    content = sample_content(num_slides)
+    build, save = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        prs = create_presentation_object()
+        for i, slide_content in enumerate(content):
+            add_slide(prs, slide_content, i)
+        built = time.perf_counter()
+        prs.save(io.BytesIO())
+        build.append(built - start)
+        save.append(time.perf_counter() - built)
+    best_build = min(build)
+    return {
+        "slides": num_slides,
+        "build_ms": round(best_build * 1000, 2),
+        "per_slide_ms": round(best_build * 1000 / num_slides, 3),
+        "save_ms": round(min(save) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--slides", type=int, nargs="+", default=[5, 50])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Warm the per-process template and skeleton caches before timing
+    add_slide(create_presentation_object(), sample_content(1)[0], 0)
+    print(json.dumps([bench(n, args.repeat) for n in args.slides], indent=2))
+
+
+if __name__ == "__main__":
+    main()
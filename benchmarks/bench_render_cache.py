@@ -0,0 +1,101 @@
+"""
+Render cache: time per deck and disk used when many requests repeat few decks.
+
+Renders --requests presentations cycling through --unique distinct decks, the
+way render_deck does (look up the cache, render and store on a miss), once with
+the render cache and once without, each in a fresh directory. Disk is counted
+per inode, so hard-linked copies are counted once.
+
+Usage:
+    python -m benchmarks.bench_render_cache [--requests 200] [--unique 10] [--slides 20]
+                                            [--engine pptx] [--output render_cache.json]
+"""
+import os
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+
+from benchmarks.environment import environment
+from benchmarks.bench_render import sample_content
+
+
+def disk_bytes(*directories):
+    """Bytes on disk under directories, counting each inode once."""
+    seen = set()
+    total = 0
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                stat = os.stat(os.path.join(root, name))
+                if stat.st_ino not in seen:
+                    seen.add(stat.st_ino)
+                    total += stat.st_size
+    return total
+
+
+def run(cached, requests, unique, num_slides, engine):
+    from app.utils import storage
+    from app.services.render_cache import RenderCache
+    from app.services.slide_generator import get_renderer
+
+    workdir = tempfile.mkdtemp(prefix="bench_render_cache_")
+    storage.PRESENTATIONS_DIR = os.path.join(workdir, "presentations")
+    cache = RenderCache(os.path.join(workdir, "renders"), 1024 ** 3, enabled=cached)
+    render = get_renderer(engine)
+    decks = [sample_content(num_slides) for _ in range(unique)]
+    for i, deck in enumerate(decks):
+        deck[0]["title"] = f"Deck {i}"
+
+    times = []
+    try:
+        for n in range(requests):
+            content = decks[n % unique]
+            presentation_id = f"deck{n}"
+            start = time.perf_counter()
+            key = cache.key(content, engine)
+            if not cache.fetch(key, storage.presentation_file_path(presentation_id)):
+                cache.store(key, render(content, presentation_id))
+            times.append(time.perf_counter() - start)
+        times.sort()
+        return {
+            "name": "render_cached" if cached else "render_uncached",
+            "requests": requests, "unique": unique, "slides": num_slides,
+            "total_s": round(sum(times), 3),
+            "median_ms": round(times[len(times) // 2] * 1000, 3),
+            "disk_bytes": disk_bytes(workdir),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--unique", type=int, default=10)
+    parser.add_argument("--slides", type=int, default=20)
+    parser.add_argument("--engine", default="pptx")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    from app.services.slide_generator import warm_up_renderer
+    logging.disable(logging.INFO)
+    warm_up_renderer()
+    results = [
+        run(cached, args.requests, max(1, args.unique), args.slides, args.engine) for cached in (False, True)
+    ]
+    report = {
+        "benchmark": "render_cache", "environment": environment(),
+        "config": vars(args), "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
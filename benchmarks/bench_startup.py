@@ -0,0 +1,159 @@
+"""
+Cold-start benchmark: how long until a fresh server is useful.
+
+Measures, over --repeat fresh processes each:
+  import_app     importing app.main in a new interpreter
+  first_health   spawn until /health answers 200 (the server accepts requests)
+  first_ready    spawn until /ready answers 200 (workers and model client warmed up)
+  first_create   spawn until the first POST /api/v1/presentations completes
+  create         latency of that first create request on its own
+
+The server runs under uvicorn against the fake Gemini backend with in-memory
+metadata, from a scratch directory. With --importtime the slowest modules from
+`python -X importtime` are listed too.
+
+Usage:
+    python -m benchmarks.bench_startup [--repeat 5] [--slides 5] [--importtime] [--output startup.json]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+import httpx
+
+from benchmarks.environment import environment
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER_ENV = {
+    "GEMINI_BACKEND": "fake",
+    "FAKE_GEMINI_LATENCY": "0.05",
+    "FAKE_GEMINI_JITTER": "0",
+    "CONTENT_CACHE_BACKEND": "none",
+    "STORAGE_BACKEND": "memory",
+}
+
+
+def child_env():
+    env = dict(os.environ)
+    for key, value in SERVER_ENV.items():
+        env.setdefault(key, value)
+    env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def time_import(workdir):
+    """Seconds to import app.main in a fresh interpreter, measured inside it."""
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=workdir, env=child_env(),
+        capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def slowest_imports(workdir, top):
+    """(cumulative_ms, module) of the slowest imports below app.main."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=workdir, env=child_env(),
+        capture_output=True, text=True, check=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((round(int(cumulative) / 1000, 1), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(client, path, started, timeout):
+    """Poll path until it answers 200; return seconds since started, or None if it does not exist."""
+    while time.perf_counter() - started < timeout:
+        try:
+            status = client.get(path).status_code
+            if status == 200:
+                return time.perf_counter() - started
+            if status == 404:
+                return None
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(f"{path} did not answer 200 within {timeout}s")
+
+
+def time_server(workdir, args):
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=child_env()
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=args.timeout) as client:
+            health = wait_for(client, "/health", started, args.timeout)
+            # Builds without /ready count as ready once they answer /health
+            ready = wait_for(client, "/ready", started, args.timeout) or health
+            request_start = time.perf_counter()
+            response = client.post(
+                "/api/v1/presentations", json={"topic": "Startup benchmark", "num_slides": args.slides}
+            )
+            response.raise_for_status()
+            done = time.perf_counter()
+        return {
+            "first_health": health, "first_ready": ready,
+            "first_create": done - started, "create": done - request_start,
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def summarize(name, seconds):
+    millis = [s * 1000 for s in seconds]
+    return {"name": name, "best_ms": round(min(millis), 2), "median_ms": round(statistics.median(millis), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--slides", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--importtime", action="store_true", help="Also list the slowest imports")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    imports = [time_import(workdir) for _ in range(args.repeat)]
+    runs = [time_server(workdir, args) for _ in range(args.repeat)]
+
+    results = [summarize("import_app", imports)]
+    for name in ("first_health", "first_ready", "first_create", "create"):
+        results.append(summarize(name, [run[name] for run in runs]))
+
+    report = {"benchmark": "startup", "environment": environment(), "results": results}
+    if args.importtime:
+        report["slowest_imports"] = [
+            {"module": name, "cumulative_ms": ms} for ms, name in slowest_imports(workdir, 15)
+        ]
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
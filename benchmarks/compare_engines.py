@@ -0,0 +1,98 @@
+"""
+Compare the python-pptx and direct OOXML render engines.
+
+Renders a golden deck (covering markdown, escaping, control characters,
+multi-line titles, string content and slide images) with both engines and checks that every
+package part is byte-identical, then reports throughput for large decks.
+
+Usage:
+    python -m benchmarks.compare_engines [--slides 100 500]
+"""
+import io
+import json
+import time
+import base64
+import zipfile
+import argparse
+import tempfile
+
+from app.utils import storage
+from app.services.image_cache import image_cache
+from app.services.slide_generator import get_renderer
+from benchmarks.bench_render import sample_content
+
+
+def data_uri(size, mode="RGB", color=(30, 144, 255)):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new(mode, size, color).save(buffer, "PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+PHOTO = data_uri((1600, 900))
+LOGO = data_uri((600, 200), "RGBA", (255, 255, 255, 160))
+
+GOLDEN_DECK = [
+    {"title": "Plain title", "content": ["First point", "Second point"]},
+    {"title": "**Django:** & <Flask>", "content": ["**Bold** then *italic* text", "a & b < c > d"]},
+    {"title": "Ünïcödé ✓", "content": ["tab\there", "bell\x07 and carriage\rreturn", ""]},
+    {"title": "Long", "content": ["x" * 400]},
+    {"title": "two\nline title", "content": ["line\nbreak"]},
+    {"title": "", "content": "A single *string* paragraph"},
+    {"content": []},
+    {"title": "Image", "content": ["Beside the picture"], "image": PHOTO, "logo": LOGO},
+    {"title": "two\nline with image", "content": "String content", "image": PHOTO, "logo": LOGO},
+    {"title": "Logo only", "content": ["No image"], "logo": LOGO},
+] * 2
+
+
+def compare_parts(path_a, path_b):
+    """Return the names of package parts that differ between two .pptx files."""
+    with zipfile.ZipFile(path_a) as a, zipfile.ZipFile(path_b) as b:
+        names = set(a.namelist()) | set(b.namelist())
+        return sorted(
+            name for name in names
+            if name not in a.namelist() or name not in b.namelist() or a.read(name) != b.read(name)
+        )
+
+
+def throughput(engine, num_slides, repeat=3):
+    render = get_renderer(engine)
+    content = sample_content(num_slides)
+    render(content, f"bench_{engine}")  # warm per-process caches
+    best = min(_timed(render, content, f"bench_{engine}") for _ in range(repeat))
+    return {"engine": engine, "slides": num_slides, "seconds": round(best, 4),
+            "slides_per_second": round(num_slides / best, 1)}
+
+
+def _timed(render, content, presentation_id):
+    start = time.perf_counter()
+    render(content, presentation_id)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--slides", type=int, nargs="+", default=[100, 500])
+    args = parser.parse_args()
+
+    # Render into a scratch directory so benchmark decks never mix with real ones
+    storage.PRESENTATIONS_DIR = tempfile.mkdtemp(prefix="compare_engines_")
+    image_cache.directory = tempfile.mkdtemp(prefix="compare_engines_images_")
+    differing = compare_parts(
+        get_renderer("pptx")(GOLDEN_DECK, "golden_pptx"),
+        get_renderer("ooxml")(GOLDEN_DECK, "golden_ooxml"),
+    )
+    results = {
+        "identical": not differing,
+        "differing_parts": differing,
+        "throughput": [throughput(engine, n) for n in args.slides for engine in ("pptx", "ooxml")],
+    }
+    print(json.dumps(results, indent=2))
+    if differing:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compare two benchmark reports (from bench_micro or load) and flag regressions.
+
+Rows are matched on their identifying fields (name/scenario, slides,
+concurrency). A row regresses when a latency metric grows, or throughput
+drops, by more than --threshold percent. Exits 1 if anything regressed.
+
+Usage:
+    python -m benchmarks.compare_results baseline.json candidate.json [--threshold 10]
+"""
+import sys
+import json
+import argparse
+
+KEY_FIELDS = ("name", "scenario", "slides", "concurrency")
+LOWER_IS_BETTER = ("best_ms", "median_ms", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb")
+HIGHER_IS_BETTER = ("throughput_rps",)
+
+
+def row_key(row):
+    return tuple((field, row[field]) for field in KEY_FIELDS if field in row)
+
+
+def compare(baseline, candidate, threshold):
+    """Yield (key, metric, before, after, change_percent, regressed) for shared rows."""
+    before_rows = {row_key(row): row for row in baseline["results"]}
+    for row in candidate["results"]:
+        before = before_rows.get(row_key(row))
+        if before is None:
+            continue
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            if before.get(metric) is None or row.get(metric) is None or not before[metric]:
+                continue
+            change = (row[metric] - before[metric]) / before[metric] * 100
+            worse = change if metric in LOWER_IS_BETTER else -change
+            yield row_key(row), metric, before[metric], row[metric], change, worse > threshold
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed change in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline {baseline['environment'].get('commit')} -> candidate {candidate['environment'].get('commit')}")
+    regressions = 0
+    for key, metric, before, after, change, regressed in compare(baseline, candidate, args.threshold):
+        label = " ".join(f"{field}={value}" for field, value in key)
+        flag = "REGRESSION" if regressed else ""
+        print(f"{label:45} {metric:15} {before:>10} -> {after:>10} {change:+7.1f}% {flag}")
+        regressions += regressed
+
+    print(f"{regressions} regression(s) above {args.threshold}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Load driver for the API at fixed concurrency levels.
+
+By default the app runs in-process (through httpx's ASGI transport) against the
+fake Gemini backend, with the content cache off and in-memory metadata, so the
+numbers measure this service and not the network or the model. Pass --url to
+drive a running server instead (start it with GEMINI_BACKEND=fake for
+comparable results) and --server-pid to report that server's peak RSS.
+
+For each scenario and concurrency level, reports throughput, p50/p95/p99
+latency, error count and peak RSS as JSON.
+
+Usage:
+    python -m benchmarks.load [--scenario create download] [--concurrency 1 8 32]
+                              [--requests 200] [--slides 5] [--output load.json]
+"""
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+import tempfile
+
+import httpx
+
+from benchmarks.environment import environment
+
+SCENARIOS = ("create", "download", "health")
+
+# Defaults for the in-process app; anything already set in the environment wins
+IN_PROCESS_ENV = {
+    "GEMINI_BACKEND": "fake",
+    "FAKE_GEMINI_LATENCY": "0.05",
+    "FAKE_GEMINI_JITTER": "0.02",
+    "FAKE_GEMINI_SEED": "0",
+    "CONTENT_CACHE_BACKEND": "none",
+    "STORAGE_BACKEND": "memory",
+}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def peak_rss_mb(pid=None):
+    """Peak resident set size of this process, or of `pid` on Linux."""
+    if pid is not None:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return round(int(line.split()[1]) / 1024, 1)
+        except OSError:
+            return None
+        return None
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def build_request(scenario, n, args, state):
+    if scenario == "create":
+        return "POST", "/api/v1/presentations", {
+            "topic": f"Benchmark topic {n}", "num_slides": args.slides, "engine": args.engine
+        }
+    if scenario == "download":
+        return "GET", state["download_url"], None
+    return "GET", "/health", None
+
+
+async def run_level(client, scenario, concurrency, args, state):
+    latencies = []
+    errors = 0
+    counter = iter(range(args.requests))
+
+    async def worker():
+        nonlocal errors
+        for n in counter:
+            method, path, body = build_request(scenario, n, args, state)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                # Read the whole body so downloads are measured end to end
+                await response.aread()
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "peak_rss_mb": peak_rss_mb(args.server_pid) if args.url else peak_rss_mb(),
+    }
+
+
+async def prepare(client, args):
+    """Create one deck for the download scenario."""
+    response = await client.post(
+        "/api/v1/presentations",
+        json={"topic": "Benchmark download", "num_slides": args.slides, "engine": args.engine},
+    )
+    response.raise_for_status()
+    return {"download_url": response.json()["download_url"]}
+
+
+async def drive(args):
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits)
+        shutdown = None
+    else:
+        from app.main import app, render_pool
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=args.timeout
+        )
+        shutdown = render_pool.shutdown
+
+    results = []
+    try:
+        state = await prepare(client, args)
+        for scenario in args.scenario:
+            for concurrency in args.concurrency:
+                result = await run_level(client, scenario, concurrency, args, state)
+                print(json.dumps(result), file=sys.stderr)
+                results.append(result)
+    finally:
+        await client.aclose()
+        if shutdown:
+            shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenario", nargs="+", choices=SCENARIOS, default=["create", "download"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and level")
+    parser.add_argument("--slides", type=int, default=5)
+    parser.add_argument("--engine", default=None, help="Render engine for created decks")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--url", help="Base URL of a running server (default: run the app in-process)")
+    parser.add_argument("--server-pid", type=int, help="PID of the --url server, for its peak RSS")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    env = environment()
+    output_path = os.path.abspath(args.output) if args.output else None
+    if not args.url:
+        for key, value in IN_PROCESS_ENV.items():
+            os.environ.setdefault(key, value)
+        # Rendered decks and metadata go to a scratch directory, not the repository
+        os.chdir(tempfile.mkdtemp(prefix="bench_load_"))
+
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    if not args.url:
+        config["env"] = {key: os.environ[key] for key in IN_PROCESS_ENV}
+
+    results = asyncio.run(drive(args))
+    report = {"benchmark": "load", "environment": env, "config": config, "results": results}
+    output = json.dumps(report, indent=2)
+    print(output)
+    if output_path:
+        with open(output_path, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import os
+import sys
+
+# Tests run without a model key or shared state: fake model, in-memory storage, no content cache
+os.environ.setdefault("GEMINI_BACKEND", "fake")
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("CONTENT_CACHE_BACKEND", "none")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def render_dirs(tmp_path, monkeypatch):
+    """Render into scratch presentations/ and image cache directories."""
+    from app.utils import storage
+    from app.services.image_cache import image_cache
+
+    monkeypatch.setattr(storage, "PRESENTATIONS_DIR", str(tmp_path / "presentations"))
+    monkeypatch.setattr(image_cache, "directory", str(tmp_path / "images"))
+    return tmp_path
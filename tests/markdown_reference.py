@@ -0,0 +1,80 @@
+"""
+The markdown parser the tokenizer replaced, and generators for bullets in the
+subset it supported. Shared by tests/test_markdown.py and benchmarks/bench_markdown.py.
+"""
+
+WORDS = ["data", "Django:", "model", "a", "the", "API", "3.5%", "x", "<tag>", "&", "über", "-"]
+
+
+def legacy_parse_markdown_text(text):
+    """The parser the tokenizer replaced, kept verbatim for comparison."""
+    if not text:
+        return [("", False, False)]
+
+    segments = []
+    i = 0
+
+    while i < len(text):
+        # Check for bold **text**
+        if i < len(text) - 3 and text[i:i+2] == '**':
+            # Find closing **
+            end = text.find('**', i + 2)
+            if end != -1:
+                # Extract bold text
+                bold_text = text[i+2:end]
+                if bold_text:  # Only add if not empty
+                    segments.append((bold_text, True, False))
+                i = end + 2
+                continue
+
+        # Check for italic *text* (but not **)
+        if i < len(text) - 1 and text[i] == '*' and (i == 0 or text[i-1] != '*') and (i == len(text) - 1 or text[i+1] != '*'):
+            # Find closing *
+            end = text.find('*', i + 1)
+            if end != -1 and (end == len(text) - 1 or text[end+1] != '*'):  # Not part of **
+                # Extract italic text
+                italic_text = text[i+1:end]
+                if italic_text:  # Only add if not empty
+                    segments.append((italic_text, False, True))
+                i = end + 1
+                continue
+
+        # Regular text - collect until we hit a formatting marker
+        start = i
+        while i < len(text):
+            if text[i] == '*':
+                # Check if it's start of ** or *
+                if i < len(text) - 1 and text[i+1] == '*':
+                    break  # Start of bold
+                elif (i == 0 or text[i-1] != '*') and (i == len(text) - 1 or text[i+1] != '*'):
+                    break  # Start of italic
+            i += 1
+
+        # Add regular text segment
+        regular_text = text[start:i]
+        if regular_text:
+            segments.append((regular_text, False, False))
+
+    return segments if segments else [(text, False, False)]
+
+
+def random_bullet(rng, max_parts=8, max_words=4, formatted=0.45):
+    """Plain words with balanced bold/italic spans, separated by plain text."""
+    parts = []
+    for _ in range(rng.randint(1, max_parts)):
+        phrase = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, max_words)))
+        kind = rng.random()
+        if kind < formatted * 0.55:
+            phrase = f"**{phrase}**"
+        elif kind < formatted:
+            phrase = f"*{phrase}*"
+        parts.append(phrase)
+    return " ".join(parts)
+
+
+CORPORA = {
+    # A formatted span every few words
+    "dense": {"max_parts": 8, "max_words": 4, "formatted": 0.45},
+    # Typical model output: sentences of prose with the odd bold or italic phrase
+    "prose": {"max_parts": 8, "max_words": 30, "formatted": 0.1},
+}
@@ -0,0 +1,39 @@
+"""Queued work waits for a generation slot instead of being shed."""
+import asyncio
+
+import pytest
+
+from app.utils.admission import AdaptiveLimiter, Overloaded
+
+
+def test_wait_slot_waits_for_a_release():
+    async def scenario():
+        limiter = AdaptiveLimiter(initial=1, min_limit=1, max_limit=1)
+        held = limiter.slot()
+        with pytest.raises(Overloaded):
+            limiter.slot()
+
+        waiting = asyncio.ensure_future(limiter.wait_slot())
+        await asyncio.sleep(0.01)
+        assert not waiting.done() and limiter.stats()["waiting"] == 1
+
+        held.__exit__(None, None, None)
+        with await waiting:
+            assert limiter.in_flight == 1
+        assert limiter.in_flight == 0 and limiter.stats()["waiting"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_is_dropped():
+    async def scenario():
+        limiter = AdaptiveLimiter(initial=1, min_limit=1, max_limit=1)
+        with limiter.slot():
+            waiting = asyncio.ensure_future(limiter.wait_slot())
+            await asyncio.sleep(0.01)
+            waiting.cancel()
+            await asyncio.gather(waiting, return_exceptions=True)
+            assert limiter.stats()["waiting"] == 0
+        assert limiter.in_flight == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,61 @@
+"""Zip output of bulk renders survives an interrupted run and resumes from it."""
+import io
+import json
+import zipfile
+
+import pytest
+
+from app.bulk_render import Output, bulk_render
+
+
+def _decks(count):
+    lines = [
+        json.dumps({"id": f"deck-{i}", "slides": [{"title": f"Deck {i}", "content": ["One", "Two"]}]})
+        for i in range(count)
+    ]
+    return io.StringIO("\n".join(lines) + "\n")
+
+
+def test_interrupted_zip_run_resumes(tmp_path):
+    path = str(tmp_path / "decks.zip")
+
+    # A run killed before close() leaves only the staged decks behind
+    first = bulk_render(_decks(3), Output(path), workers=1, engine="ooxml", progress_every=0, log=io.StringIO())
+    assert first["rendered"] == 3
+    assert not (tmp_path / "decks.zip").exists()
+
+    output = Output(path)
+    try:
+        second = bulk_render(_decks(5), output, workers=1, engine="ooxml", progress_every=0, log=io.StringIO())
+    finally:
+        output.close()
+    assert (second["skipped"], second["rendered"]) == (3, 2)
+    assert not (tmp_path / "decks.zip.parts").exists()
+
+    with zipfile.ZipFile(path) as archive:
+        assert sorted(archive.namelist()) == [f"deck-{i}.pptx" for i in range(5)]
+        with zipfile.ZipFile(io.BytesIO(archive.read("deck-4.pptx"))) as deck:
+            assert "ppt/slides/slide1.xml" in deck.namelist()
+
+    output = Output(path)
+    try:
+        third = bulk_render(_decks(6), output, workers=1, engine="ooxml", progress_every=0, log=io.StringIO())
+    finally:
+        output.close()
+    assert (third["skipped"], third["rendered"]) == (5, 1)
+    with zipfile.ZipFile(path) as archive:
+        assert len(archive.namelist()) == 6
+
+
+def test_foreign_or_truncated_zip_is_refused(tmp_path):
+    foreign = tmp_path / "foreign.zip"
+    with zipfile.ZipFile(foreign, "w") as archive:
+        archive.writestr("deck-0.pptx", b"")
+        archive.writestr("ppt/slides/slide1.xml", b"<p:sld/>")
+    with pytest.raises(ValueError, match="holds more than"):
+        Output(str(foreign))
+
+    truncated = tmp_path / "truncated.zip"
+    truncated.write_bytes(foreign.read_bytes()[:40])
+    with pytest.raises(ValueError, match="not a readable zip"):
+        Output(str(truncated))
@@ -0,0 +1,69 @@
+"""Coalesced content generation: waiters share one call, but not its caller's deadline or cancellation."""
+import asyncio
+
+import pytest
+
+from app.services.content_cache import ContentCache, MemoryCacheBackend
+from app.services.llm_client import DeadlineExceeded
+
+
+def _cache():
+    return ContentCache(MemoryCacheBackend(ttl=60, max_entries=16))
+
+
+def test_waiters_share_one_call():
+    async def scenario():
+        cache = _cache()
+        calls = []
+
+        async def generate():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"slides": 3}
+
+        results = await asyncio.gather(*(cache.get_or_generate("k", generate) for _ in range(3)))
+        assert results == [{"slides": 3}] * 3 and len(calls) == 1 and cache.coalesced == 2
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("ending", ["deadline", "cancel"])
+def test_waiter_generates_again_when_the_leader_gives_up(ending):
+    async def scenario():
+        cache = _cache()
+
+        async def leader_generate():
+            await asyncio.sleep(0.02)
+            raise DeadlineExceeded("Deadline exceeded before the model answered")
+
+        async def waiter_generate():
+            return {"slides": 5}
+
+        leader = asyncio.ensure_future(cache.get_or_generate("k", leader_generate))
+        await asyncio.sleep(0.005)
+        waiter = asyncio.ensure_future(cache.get_or_generate("k", waiter_generate))
+        await asyncio.sleep(0.005)
+        if ending == "cancel":
+            leader.cancel()
+
+        assert await waiter == {"slides": 5}
+        with pytest.raises(DeadlineExceeded if ending == "deadline" else asyncio.CancelledError):
+            await leader
+
+    asyncio.run(scenario())
+
+
+def test_waiters_share_other_failures():
+    async def scenario():
+        cache = _cache()
+
+        async def generate():
+            await asyncio.sleep(0.01)
+            raise ValueError("bad model output")
+
+        results = await asyncio.gather(
+            *(cache.get_or_generate("k", generate) for _ in range(2)), return_exceptions=True
+        )
+        assert [type(r) for r in results] == [ValueError, ValueError]
+
+    asyncio.run(scenario())
@@ -0,0 +1,24 @@
+"""Image sources are identified by the hash of their decoded bytes."""
+import base64
+import hashlib
+
+import pytest
+
+from app.services.image_cache import source_digest, DATA_DIGEST_MEMO_BYTES
+
+
+def data_uri(data: bytes) -> str:
+    return "data:image/png;base64," + base64.b64encode(data).decode("ascii")
+
+
+@pytest.mark.parametrize("size", [3 * 1024, DATA_DIGEST_MEMO_BYTES])
+def test_same_length_uris_differing_in_the_middle(size):
+    first = bytearray(b"\x89PNG" + bytes(size))
+    second = bytearray(first)
+    second[len(second) // 2] = 0xFF
+    a, b = data_uri(bytes(first)), data_uri(bytes(second))
+    assert len(a) == len(b)
+
+    assert source_digest(a) == hashlib.sha256(first).hexdigest()
+    assert source_digest(b) == hashlib.sha256(second).hexdigest()
+    assert source_digest(a) != source_digest(b)
@@ -0,0 +1,114 @@
+"""Background job scheduler: job states, fair dispatch and shutdown."""
+import asyncio
+
+import pytest
+
+from app.services.job_scheduler import (
+    DONE, FAILED, GENERATING, QUEUED, RENDERING, JobQueueFull, JobScheduler
+)
+
+
+def test_shutdown_fails_running_and_queued_jobs():
+    async def scenario():
+        scheduler = JobScheduler(max_concurrency=1, per_client_limit=1)
+        started = []
+
+        async def runner(job):
+            started.append(job.id)
+            await asyncio.sleep(10)
+
+        running = scheduler.submit("a", runner)
+        queued = scheduler.submit("a", runner)
+        await asyncio.sleep(0.01)
+        assert queued.status == QUEUED
+
+        await scheduler.shutdown()
+        await asyncio.sleep(0.01)
+        assert started == [running.id]
+        assert (running.status, queued.status) == (FAILED, FAILED)
+        assert running.error == queued.error == "Server shutting down"
+        assert scheduler.stats()["running"] == scheduler.stats()["queued"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_job_moves_through_its_states():
+    async def scenario():
+        scheduler = JobScheduler()
+        release = asyncio.Event()
+        seen = []
+
+        async def runner(job):
+            seen.append(job.status)
+            job.set_status(GENERATING)
+            await release.wait()
+            job.set_status(RENDERING)
+            return {"presentation_id": "p1"}
+
+        async def failing(job):
+            raise RuntimeError("boom")
+
+        job = scheduler.submit("a", runner)
+        bad = scheduler.submit("a", failing)
+        assert job.status == QUEUED
+        await asyncio.sleep(0.01)
+        assert job.status == GENERATING and seen == [QUEUED]
+        release.set()
+        await asyncio.sleep(0.01)
+        assert (job.status, job.result, job.error) == (DONE, {"presentation_id": "p1"}, None)
+        assert (bad.status, bad.error) == (FAILED, "boom")
+        assert scheduler.get(job.id) is job and scheduler.stats()["running"] == 0
+
+    asyncio.run(scenario())
+
+
+def _start_order(scheduler, jobs_by_client):
+    """Submit the jobs (a client -> count dict, in that order) and return the order they start in."""
+    started = []
+    release = asyncio.Event()
+
+    def runner_for(client_id):
+        async def runner(job):
+            started.append(client_id)
+            await release.wait()
+        return runner
+
+    for client_id, count in jobs_by_client.items():
+        for _ in range(count):
+            scheduler.submit(client_id, runner_for(client_id))
+    return started, release
+
+
+def test_free_slots_go_round_robin_across_clients():
+    async def scenario():
+        scheduler = JobScheduler(max_concurrency=1, per_client_limit=5)
+        # The first job takes the only slot on submit, so the rest queue up behind it
+        started, release = _start_order(scheduler, {"first": 1, "big": 4, "small": 2, "other": 1})
+        for _ in range(8):
+            await asyncio.sleep(0)
+            release.set()
+            await asyncio.sleep(0.01)
+            release.clear()
+        assert started == ["first", "big", "small", "other", "big", "small", "big", "big"]
+
+    asyncio.run(scenario())
+
+
+def test_per_client_limits():
+    async def scenario():
+        scheduler = JobScheduler(max_concurrency=8, per_client_limit=2, max_queued_per_client=3)
+        started, release = _start_order(scheduler, {"big": 5, "small": 1})
+        await asyncio.sleep(0.01)
+        # A client never runs more than per_client_limit jobs, even with free slots
+        assert sorted(started) == ["big", "big", "small"]
+        assert scheduler.stats()["running"] == 3 and scheduler.stats()["queued"] == 3
+
+        with pytest.raises(JobQueueFull):
+            scheduler.submit("big", lambda job: None)
+        scheduler.submit("small", lambda job: asyncio.sleep(0))
+
+        release.set()
+        await asyncio.sleep(0.05)
+        assert started.count("big") == 5 and scheduler.stats()["queued"] == 0
+
+    asyncio.run(scenario())
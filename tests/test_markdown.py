@@ -0,0 +1,55 @@
+"""
+Property tests for the markdown tokenizer over generated inputs: it must give
+exactly the previous parser's segments on the subset that parser supported,
+and behave on any input at all.
+"""
+import random
+
+import pytest
+
+from app.services.slide_generator import parse_markdown_text
+from app.utils.markdown import tokenize_markdown, formatted_spans, Segment
+from tests.markdown_reference import CORPORA, legacy_parse_markdown_text, random_bullet
+
+# Marker-heavy alphabet, so generated text hits unbalanced and nested markers often
+ALPHABET = "ab *~`\\\n"
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("corpus", sorted(CORPORA))
+def test_matches_previous_parser_on_supported_subset(corpus, seed):
+    rng = random.Random(seed)
+    for _ in range(1000):
+        text = random_bullet(rng, **CORPORA[corpus])
+        assert parse_markdown_text(text) == legacy_parse_markdown_text(text), text
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_any_input_gives_well_formed_segments(seed):
+    rng = random.Random(seed)
+    for _ in range(2000):
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 40)))
+        segments = tokenize_markdown(text)
+        assert segments == tokenize_markdown.__wrapped__(text), text
+        assert all(isinstance(segment, Segment) for segment in segments)
+        if text:
+            assert all(segment.text for segment in segments), text
+            # Neighbouring segments never share a style (they are joined)
+            assert all(a.style != b.style for a, b in zip(segments, segments[1:])), text
+        # Markers are only ever removed, never invented
+        assert len("".join(segment.text for segment in segments)) <= len(text)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_formatted_spans_are_ordered_and_disjoint(seed):
+    rng = random.Random(seed)
+    for _ in range(2000):
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 40)))
+        spans = formatted_spans(text)
+        assert all(0 <= start < end <= len(text) for start, end in spans), text
+        assert all(a[1] <= b[0] for a, b in zip(spans, spans[1:])), text
+
+
+def test_plain_text_is_one_segment():
+    assert tokenize_markdown("no markers here") == (Segment("no markers here"),)
+    assert tokenize_markdown("") == (Segment(""),)
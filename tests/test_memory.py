@@ -0,0 +1,21 @@
+"""
+Memory ceiling for streamed rendering: a large deck is rendered in a fresh
+interpreter (benchmarks.bench_memory) and peak RSS may rise only a little over
+the warmed-up process, however many slides the deck has.
+"""
+import sys
+
+import pytest
+
+from benchmarks.bench_memory import run_case
+
+NUM_SLIDES = 2000
+MAX_GROWTH_MB = 32
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="peak RSS comes from the resource module")
+
+
+@pytest.mark.parametrize("engine", ["pptx", "ooxml"])
+def test_large_deck_stays_under_memory_ceiling(engine):
+    result = run_case(engine, NUM_SLIDES)
+    assert result["growth_mb"] <= MAX_GROWTH_MB, result
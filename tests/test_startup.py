@@ -0,0 +1,15 @@
+"""Importing the app must stay cheap: python-pptx, lxml and Pillow load on first render."""
+import os
+import sys
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_app_does_not_load_renderer_dependencies():
+    code = "import sys, app.main; print(sorted(m for m in ('pptx', 'lxml', 'PIL') if m in sys.modules))"
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=dict(os.environ, PYTHONPATH=ROOT),
+        capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == "[]"
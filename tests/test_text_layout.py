@@ -0,0 +1,35 @@
+"""Splitting a too-tall bullet: every piece fits, is as long as it can be, and keeps markup balanced."""
+import re
+import random
+
+import pytest
+
+from app.services.slide_generator import BULLET_STYLE, CONTENT_FONT_MIN
+from app.utils.text_layout import fits, split_text
+
+WORDS = ["alpha", "**beta gamma**", "delta", "*eps*", "zeta", "`eta`", "theta", "~~iota kappa~~"]
+_WORD = "(?:" + "|".join(re.escape(word) for word in WORDS) + ")"
+# Whole words only: a piece never starts or ends inside a formatted span
+_WHOLE_WORDS = re.compile(f"{_WORD}(?: {_WORD})*")
+
+
+@pytest.mark.parametrize("words", [1, 40, 3000])
+def test_pieces_fit_and_are_maximal(words):
+    rng = random.Random(words)
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    width, height, size = 400, 120, CONTENT_FONT_MIN
+    pieces = split_text(text, width, height, size, BULLET_STYLE)
+
+    assert " ".join(pieces) == text
+    for piece, following in zip(pieces, pieces[1:] + [None]):
+        assert _WHOLE_WORDS.fullmatch(piece), piece
+        assert fits([piece], width, height, size, BULLET_STYLE)
+        if following is not None:
+            next_word = re.match(_WORD, following).group()
+            assert not fits([f"{piece} {next_word}"], width, height, size, BULLET_STYLE)
+
+
+def test_unbreakable_run_is_its_own_piece():
+    long_word = "x" * 2000
+    pieces = split_text(f"short {long_word} tail", 200, 40, CONTENT_FONT_MIN, BULLET_STYLE)
+    assert long_word in pieces and " ".join(pieces) == f"short {long_word} tail"
@@ -0,0 +1,145 @@
+"""Job callback URLs: only http(s) on allowed, public hosts are accepted or called."""
+import json
+import socket
+import asyncio
+import threading
+import http.server
+
+import pytest
+
+from app.services import job_scheduler
+from app.services.job_scheduler import CallbackURLError, check_callback_url
+
+
+@pytest.mark.parametrize("url", [
+    "ftp://example.com/hook",
+    "file:///etc/passwd",
+    "http://",
+    "http://127.0.0.1:8000/hook",
+    "http://10.0.0.5/hook",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://[::1]/hook",
+    "http://[::ffff:127.0.0.1]/hook",
+    "http://0.0.0.0/hook",
+])
+def test_rejects_unsafe_urls(url):
+    with pytest.raises(CallbackURLError):
+        check_callback_url(url)
+
+
+def test_resolved_host_names_are_checked():
+    check_callback_url("http://localhost/hook")
+    with pytest.raises(CallbackURLError):
+        check_callback_url("http://localhost/hook", resolve=True)
+
+
+def test_allowed_hosts(monkeypatch):
+    monkeypatch.setattr(job_scheduler, "WEBHOOK_ALLOWED_HOSTS", ["hooks.example.com", "*.example.org"])
+    check_callback_url("https://hooks.example.com/done")
+    check_callback_url("https://api.example.org/done")
+    for url in ("https://example.com/done", "https://evil-example.org/done", "https://example.org.evil.com/"):
+        with pytest.raises(CallbackURLError):
+            check_callback_url(url)
+
+
+def test_private_addresses_can_be_allowed(monkeypatch):
+    monkeypatch.setattr(job_scheduler, "WEBHOOK_ALLOW_PRIVATE", True)
+    check_callback_url("http://127.0.0.1:8000/hook", resolve=True)
+
+
+@pytest.fixture
+def hook_server():
+    """A local HTTP server that records each POST and answers with the next queued status (default 204)."""
+    received, statuses = [], []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append((self.path, self.headers["Host"], self.rfile.read(int(self.headers["Content-Length"]))))
+            self.send_response(statuses.pop(0) if statuses else 204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.received, server.statuses = received, statuses
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_delivery_connects_to_the_checked_address(monkeypatch, hook_server):
+    # The name resolves to the local server once, then to another address:
+    # the POST must still go to the address that was checked
+    monkeypatch.setattr(job_scheduler, "WEBHOOK_ALLOW_PRIVATE", True)
+    real_getaddrinfo = socket.getaddrinfo
+    answers = ["127.0.0.1"]
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        if host == "hooks.test":
+            address = answers.pop(0) if answers else "192.0.2.1"
+            return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", (address, port))]
+        return real_getaddrinfo(host, port, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+    port = hook_server.server_port
+    assert job_scheduler._post_json(f"http://hooks.test:{port}/done?job=1", {"id": "1"}) == 204
+    assert hook_server.received == [("/done?job=1", f"hooks.test:{port}", b'{"id": "1"}')]
+
+
+def test_redirects_are_not_followed(monkeypatch, hook_server):
+    monkeypatch.setattr(job_scheduler, "WEBHOOK_ALLOW_PRIVATE", True)
+    hook_server.statuses.append(302)
+    with pytest.raises(OSError):
+        job_scheduler._post_json(f"http://127.0.0.1:{hook_server.server_port}/done", {})
+
+
+def test_webhook_is_retried_until_delivered(monkeypatch, hook_server):
+    monkeypatch.setattr(job_scheduler, "WEBHOOK_ALLOW_PRIVATE", True)
+    monkeypatch.setattr(job_scheduler, "WEBHOOK_RETRIES", 3)
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(job_scheduler.asyncio, "sleep", sleep)
+    url = f"http://127.0.0.1:{hook_server.server_port}/done"
+
+    hook_server.statuses.extend([500, 503])
+    assert asyncio.run(job_scheduler.send_webhook(url, {"id": "1"}))
+    assert len(hook_server.received) == 3 and delays == [0.5, 1.0]
+
+    hook_server.statuses.extend([500, 500, 500])
+    assert not asyncio.run(job_scheduler.send_webhook(url, {"id": "2"}))
+    assert len(hook_server.received) == 6
+
+
+def test_finished_job_is_posted_to_its_callback(monkeypatch, hook_server):
+    monkeypatch.setattr(job_scheduler, "WEBHOOK_ALLOW_PRIVATE", True)
+
+    async def scenario():
+        scheduler = job_scheduler.JobScheduler()
+
+        async def runner(job):
+            return {"presentation_id": "p1"}
+
+        job = scheduler.submit("a", runner, f"http://127.0.0.1:{hook_server.server_port}/jobs")
+        while not hook_server.received:
+            await asyncio.sleep(0.01)
+        return job
+
+    job = asyncio.run(asyncio.wait_for(scenario(), 10))
+    path, _, body = hook_server.received[0]
+    assert path == "/jobs"
+    assert json.loads(body) == dict(job.to_dict(), status="done", result={"presentation_id": "p1"})
+
+
+def test_create_rejects_bad_callback_url():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app)
+    for url in ("not a url", "gopher://example.com/", "http://192.168.1.1/hook"):
+        response = client.post("/api/v1/presentations", json={"topic": "Hooks", "callback_url": url})
+        assert response.status_code == 422, url